@@ -0,0 +1,89 @@
+"""baseline: the schema create_all made before migrations
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18 17:09:12.629993
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0000'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+deployment_status = sa.Enum('PENDING', 'RUNNING', 'FAILED', 'COMPLETED', name='deploymentstatus')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'organization',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('invite_code', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_organization_id', 'organization', ['id'])
+    op.create_index('ix_organization_invite_code', 'organization', ['invite_code'], unique=True)
+    op.create_index('ix_organization_name', 'organization', ['name'])
+
+    op.create_table(
+        'cluster',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('organization_id', sa.Integer(), nullable=True),
+        sa.Column('cpu_limit', sa.Float(), nullable=True),
+        sa.Column('ram_limit', sa.Float(), nullable=True),
+        sa.Column('gpu_limit', sa.Float(), nullable=True),
+        sa.Column('cpu_available', sa.Float(), nullable=True),
+        sa.Column('ram_available', sa.Float(), nullable=True),
+        sa.Column('gpu_available', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organization.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cluster_id', 'cluster', ['id'])
+    op.create_index('ix_cluster_name', 'cluster', ['name'])
+
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('organization_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organization.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_email', 'user', ['email'], unique=True)
+    op.create_index('ix_user_id', 'user', ['id'])
+    op.create_index('ix_user_username', 'user', ['username'], unique=True)
+
+    op.create_table(
+        'deployment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('cluster_id', sa.Integer(), nullable=True),
+        sa.Column('docker_image', sa.String(), nullable=True),
+        sa.Column('status', deployment_status, nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('cpu_required', sa.Float(), nullable=True),
+        sa.Column('ram_required', sa.Float(), nullable=True),
+        sa.Column('gpu_required', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['cluster_id'], ['cluster.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deployment_id', 'deployment', ['id'])
+    op.create_index('ix_deployment_name', 'deployment', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_table('deployment')
+    op.drop_table('user')
+    op.drop_table('cluster')
+    op.drop_table('organization')
+    deployment_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,53 @@
+"""scheduler schema: cluster version, PREEMPTED status and scheduling indexes
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18 17:09:12.629993
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = '0000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+original_status = sa.Enum('PENDING', 'RUNNING', 'FAILED', 'COMPLETED', name='deploymentstatus')
+deployment_status = sa.Enum('PENDING', 'RUNNING', 'FAILED', 'COMPLETED', 'PREEMPTED', name='deploymentstatus')
+
+
+def upgrade() -> None:
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    if postgresql:
+        # Statuses are stored by name
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE deploymentstatus ADD VALUE IF NOT EXISTS 'PREEMPTED'")
+
+    # Existing clusters start at version 1, as new ones do
+    with op.batch_alter_table('cluster') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.create_index('ix_cluster_organization_id', ['organization_id'])
+    with op.batch_alter_table('cluster') as batch_op:
+        batch_op.alter_column('version', existing_type=sa.Integer(), existing_nullable=False, server_default=None)
+
+    with op.batch_alter_table('deployment') as batch_op:
+        if not postgresql:
+            batch_op.alter_column('status', existing_type=original_status, type_=deployment_status,
+                                  existing_nullable=True)
+        batch_op.create_index('ix_deployment_cluster_status_priority', ['cluster_id', 'status', 'priority'])
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop a value from an enum type; PREEMPTED stays in deploymentstatus
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.drop_index('ix_deployment_cluster_status_priority')
+        if op.get_bind().dialect.name != 'postgresql':
+            batch_op.alter_column('status', existing_type=deployment_status, type_=original_status,
+                                  existing_nullable=True)
+    with op.batch_alter_table('cluster') as batch_op:
+        batch_op.drop_index('ix_cluster_organization_id')
+        batch_op.drop_column('version')
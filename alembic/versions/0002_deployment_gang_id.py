@@ -0,0 +1,29 @@
+"""deployment gang_id
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.add_column(sa.Column('gang_id', sa.String(), nullable=True))
+        batch_op.create_index('ix_deployment_gang_id', ['gang_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.drop_index('ix_deployment_gang_id')
+        batch_op.drop_column('gang_id')
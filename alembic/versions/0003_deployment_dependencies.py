@@ -0,0 +1,39 @@
+"""deployment dependencies
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:12:05.402117
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Statuses are stored by name
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE deploymentstatus ADD VALUE IF NOT EXISTS 'BLOCKED'")
+    op.create_table(
+        'deploymentdependency',
+        sa.Column('deployment_id', sa.Integer(), nullable=False),
+        sa.Column('depends_on_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['deployment_id'], ['deployment.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['depends_on_id'], ['deployment.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('deployment_id', 'depends_on_id')
+    )
+    op.create_index(op.f('ix_deploymentdependency_depends_on_id'), 'deploymentdependency', ['depends_on_id'], unique=False)
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop a value from an enum type; BLOCKED stays in deploymentstatus
+    op.drop_index(op.f('ix_deploymentdependency_depends_on_id'), table_name='deploymentdependency')
+    op.drop_table('deploymentdependency')
@@ -0,0 +1,39 @@
+"""deployment owner and fair share quotas
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:31:47.905512
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_deployment_user_id', ['user_id'])
+        batch_op.create_foreign_key('fk_deployment_user_id_user', 'user', ['user_id'], ['id'])
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('fair_share_quota', sa.Float(), nullable=True))
+    with op.batch_alter_table('organization') as batch_op:
+        batch_op.add_column(sa.Column('fair_share_quota', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('organization') as batch_op:
+        batch_op.drop_column('fair_share_quota')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('fair_share_quota')
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.drop_constraint('fk_deployment_user_id_user', type_='foreignkey')
+        batch_op.drop_index('ix_deployment_user_id')
+        batch_op.drop_column('user_id')
@@ -0,0 +1,29 @@
+"""deployment priority not null
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 22:14:05.318267
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Deployments created without a priority were scheduled as priority 0
+    op.execute("UPDATE deployment SET priority = 0 WHERE priority IS NULL")
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('deployment') as batch_op:
+        batch_op.alter_column('priority', existing_type=sa.Integer(), nullable=True)
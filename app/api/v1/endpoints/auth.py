@@ -1,8 +1,9 @@
 from fastapi import (APIRouter, Depends, HTTPException, Request, Response,
                      status)
-from sqlalchemy.orm import Session
 
 from app.core import deps, security
+from app.core.user_cache import user_cache
+from app.db.runner import SessionRunner
 from app.models.user import User as UserModel
 from app.schemas.auth import LoginRequest
 from app.schemas.user import User, UserCreate
@@ -14,7 +15,7 @@ router = APIRouter()
 async def login(request: Request,
                 response: Response,
                 body: LoginRequest,
-                db: Session = Depends(deps.get_db)):
+                db: SessionRunner = Depends(deps.get_session_runner)):
     """
     TODO: Implement login endpoint using session
     Example:
@@ -25,16 +26,27 @@ async def login(request: Request,
     """
     username = body.username
     password = body.password
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if not user or not security.verify_password(password, user.hashed_password):
+    def find_credentials(session):
+        credentials = session.query(UserModel.id, UserModel.hashed_password).filter(
+            UserModel.username == username
+        ).first()
+        # Hand the connection back to the pool before the slow password check
+        session.close()
+        return credentials
+
+    user = await db.run(find_credentials)
+    # Password hashing is CPU-bound; keep it off the event loop
+    if not user or not await security.password_hashing_pool.verify(password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid username or password")
     request.session["user_id"] = user.id
+    # Start the session from the current user row rather than a cached copy
+    user_cache.invalidate(user.id)
     return {"message": "Login successful"}
 
 
 @router.post("/register", response_model=User)
-async def register(*, db: Session = Depends(deps.get_db), user_in: UserCreate):
+async def register(*, db: SessionRunner = Depends(deps.get_session_runner), user_in: UserCreate):
     """
     TODO: Implement user registration
     Example:
@@ -43,27 +55,34 @@ async def register(*, db: Session = Depends(deps.get_db), user_in: UserCreate):
     - Create user in database
     - Return user data
     """
-    if db.query(UserModel).filter(
-        (UserModel.username == user_in.username) | (UserModel.email == user_in.email)
-    ).first():
+    def user_exists(session):
+        exists = session.query(UserModel.id).filter(
+            (UserModel.username == user_in.username) | (UserModel.email == user_in.email)
+        ).first() is not None
+        session.close()
+        return exists
+
+    if await db.run(user_exists):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already exists"
         )
 
-    hashed_password = security.get_password_hash(user_in.password)
+    hashed_password = await security.password_hashing_pool.hash(user_in.password)
 
-    new_user = UserModel(
-        username=user_in.username,
-        email=user_in.email,
-        hashed_password=hashed_password,
-        is_active=True
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    def create_user(session):
+        new_user = UserModel(
+            username=user_in.username,
+            email=user_in.email,
+            hashed_password=hashed_password,
+            is_active=True
+        )
+        session.add(new_user)
+        session.commit()
+        session.refresh(new_user)
+        return new_user
 
-    return new_user
+    return await db.run(create_user)
 
 @router.post("/logout")
 async def logout(request: Request):
@@ -73,5 +92,23 @@ async def logout(request: Request):
     request.session.clear()
     return {"message": "Successfully logged out"}
     """
+    user_id = request.session.get("user_id")
+    if user_id:
+        user_cache.invalidate(user_id)
     request.session.clear()
     return {"message": "Successfully logged out"}
+
+
+@router.post("/logout-all")
+async def logout_all(request: Request, current_user: User = Depends(deps.get_current_user)):
+    """
+    Revoke every session of the current user, including this one.
+    """
+    store = request.scope.get("session_store")
+    if store is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Session revocation requires a server-side session backend")
+    revoked = await store.revoke_user(current_user.id)
+    user_cache.invalidate(current_user.id)
+    request.session.clear()
+    return {"message": "Successfully logged out", "revoked_sessions": revoked}
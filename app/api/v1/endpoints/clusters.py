@@ -1,19 +1,26 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import sessionmaker
 
 from app.core import deps
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.scheduling.cluster_index import cluster_index
+from app.db.runner import SessionRunner
 from app.models.cluster import Cluster
 from app.models.user import User
-from app.schemas.clusterresponse import ClusterCreate, ClusterResponse
+from app.schemas.clusterresponse import (ClusterCreate, ClusterResponse,
+                                         ClusterUtilisation)
+from app.service.cluster_service import ClusterService
+from app.service.export_service import ExportService
 
 router = APIRouter()
 
 @router.post("/", response_model=ClusterResponse)
-def create_cluster(
+async def create_cluster(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_session_runner),
     cluster_in: ClusterCreate,
     current_user: User = Depends(deps.get_current_user)
 ):
@@ -34,23 +41,55 @@ def create_cluster(
         gpu_available=cluster_in.gpu_limit
     )
 
-    db.add(cluster)
-    db.commit()
-    db.refresh(cluster)
+    def create(session):
+        session.add(cluster)
+        session.commit()
+        session.refresh(cluster)
+        cluster_index.update(cluster)
+        return cluster
 
-    return cluster
+    return await db.run(create)
 
 @router.get("/", response_model=List[ClusterResponse])
-def list_clusters(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+async def list_clusters(
+    response: Response,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    current_user: User = Depends(deps.get_current_user),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    include: Optional[str] = None
 ):
     """
-    TODO: Implement cluster listing
+    List the organization's clusters. Passing `limit` (or a `cursor`) returns one
+    page; when more clusters follow, the cursor for the next page is returned in
+    the X-Next-Cursor header. Without either, every cluster is returned.
+    `include=utilisation` adds running/pending deployment counts and CPU/RAM/GPU
+    utilisation percentages to every cluster.
     """
-    if not current_user.organization_id:
-        raise HTTPException(status_code=400, detail="User must belong to an organization to view clusters.")
+    includes = {value.strip() for value in include.split(",") if value.strip()} if include else set()
+    if includes - {"utilisation"}:
+        raise HTTPException(status_code=400, detail="include must be one of: utilisation.")
 
-    clusters = db.query(Cluster).filter(Cluster.organization_id == current_user.organization_id).all()
+    rows, next_cursor = await db.run(lambda session: ClusterService(session, current_user).list_clusters(
+        cursor, limit, "utilisation" in includes
+    ))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        ClusterResponse.model_validate(cluster).model_copy(update={"utilisation": ClusterUtilisation(**utilisation)})
+        if utilisation is not None else cluster
+        for cluster, utilisation in rows
+    ]
 
-    return clusters
+@router.get("/export")
+async def export_clusters(
+    session_factory: sessionmaker = Depends(deps.get_session_factory),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Stream every cluster of the organization as NDJSON, one cluster per line.
+    """
+    if not current_user.organization_id:
+        raise HTTPException(status_code=400, detail="User must belong to an organization to export clusters.")
+    return StreamingResponse(ExportService(session_factory).export_clusters(current_user.organization_id),
+                             media_type="application/x-ndjson")
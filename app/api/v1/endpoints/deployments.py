@@ -1,57 +1,261 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import sessionmaker
 
 from app.core import deps
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.core.scheduling.preemption_factory import PreemptionSchedulingFactory
-from app.models.cluster import Cluster
-from app.models.deployment import Deployment
+from app.db.runner import SessionRunner
+from app.models.deployment import DeploymentStatus
 from app.models.user import User
-from app.schemas.deploymentresponse import DeploymentCreate, DeploymentResponse
+from app.schemas.deploymentresponse import (DeploymentBatchResponse,
+                                           DeploymentCreate,
+                                           DeploymentDependenciesUpdate,
+                                           DeploymentPlanResponse,
+                                           DeploymentReleaseResponse,
+                                           DeploymentResponse,
+                                           GangDeploymentCreate,
+                                           GangDeploymentResponse,
+                                           PlannedPreemption)
 from app.service.deployment_service import DeploymentService
+from app.service.export_service import ExportService
+from app.service.pending_scheduler import pending_scheduler
 
 router = APIRouter()
 
+
+async def run_service(db: SessionRunner, current_user: User, operation):
+    """
+    Run `operation` on a DeploymentService, then wake the pending scheduler for
+    the clusters the committed work freed capacity on.
+    """
+    def run(session):
+        service = DeploymentService(session, current_user)
+        return operation(service), service.retry_clusters
+
+    result, retry_clusters = await db.offload(run)
+    for cluster_id in sorted(retry_clusters):
+        pending_scheduler.notify(cluster_id)
+    return result
+
 @router.post("/", response_model=DeploymentResponse)
-def create_deployment(
+async def create_deployment(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_session_runner),
     deployment_in: DeploymentCreate,
     current_user: User = Depends(deps.get_current_user),
-    preemption_strategy: str = "priority"
+    preemption_strategy: str = "priority",
+    placement_policy: str = "best_fit",
+    wait: bool = True
 ):
     """
     TODO: Implement deployment creation and scheduling
+    When `cluster_id` is omitted the cluster is chosen using `placement_policy`.
+    With `wait`, a deployment that cannot be placed yet is queued as pending.
     """
-    deployment_service = DeploymentService(db, current_user)
-    deployment = deployment_service.handle_deployment(deployment_in, preemption_strategy, deployment_in.cluster_id)
+    deployment = await run_service(db, current_user, lambda service: service.handle_deployment(
+        deployment_in, preemption_strategy, deployment_in.cluster_id, placement_policy, wait
+    ))
     return deployment
 
-@router.get("/", response_model=List[DeploymentResponse])
-def list_deployments(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+@router.post("/batch", response_model=DeploymentBatchResponse)
+async def create_deployment_batch(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployments_in: List[DeploymentCreate],
+    current_user: User = Depends(deps.get_current_user),
+    preemption_strategy: str = "priority",
+    placement_policy: str = "best_fit",
+    wait: bool = True
 ):
     """
-    TODO: Implement deployment listing
+    Schedule a list of deployments together and persist them in one transaction.
+    Each item is reported as scheduled, queued (with `wait`) or rejected.
     """
-    clusters = db.query(Cluster).filter(Cluster.organization_id == current_user.organization_id).all()
-
-    if not clusters:
+    if len(deployments_in) > settings.MAX_DEPLOYMENT_BATCH_SIZE:
         raise HTTPException(
-            status_code=404,
-            detail="No clusters found for the user's organization."
+            status_code=413,
+            detail=f"A batch may contain at most {settings.MAX_DEPLOYMENT_BATCH_SIZE} deployments."
         )
-    clusters = db.query(Cluster).filter(Cluster.organization_id == current_user.organization_id).all()
+    if any(deployment_in.depends_on for deployment_in in deployments_in):
+        raise HTTPException(status_code=400, detail="Deployments with dependencies must be created one at a time.")
 
-    deployments = db.query(Deployment).filter(Deployment.cluster_id.in_([cluster.id for cluster in clusters])).all()
+    results = await run_service(db, current_user, lambda service: service.handle_batch(
+        deployments_in, preemption_strategy, placement_policy, wait
+    ))
+    return DeploymentBatchResponse(
+        scheduled=sum(1 for result in results if result["status"] == "scheduled"),
+        queued=sum(1 for result in results if result["status"] == "queued"),
+        rejected=sum(1 for result in results if result["status"] == "rejected"),
+        results=results
+    )
 
-
-    if not deployments:
+@router.post("/gang", response_model=GangDeploymentResponse)
+async def create_gang_deployment(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    gang_in: GangDeploymentCreate,
+    current_user: User = Depends(deps.get_current_user),
+    preemption_strategy: str = "priority",
+    placement_policy: str = "best_fit",
+    wait: bool = True
+):
+    """
+    Schedule `replicas` copies of a deployment all-or-nothing, across one or more
+    of the organization's clusters. With `wait`, a gang that cannot be placed yet
+    is queued as a whole.
+    """
+    if gang_in.replicas > settings.MAX_DEPLOYMENT_BATCH_SIZE:
         raise HTTPException(
-            status_code=404,
-            detail="No deployments found for the user's organization."
+            status_code=413,
+            detail=f"A gang may contain at most {settings.MAX_DEPLOYMENT_BATCH_SIZE} replicas."
         )
 
+    return await run_service(db, current_user, lambda service: service.handle_gang(
+        gang_in, preemption_strategy, placement_policy, wait
+    ))
+
+@router.post("/plan", response_model=DeploymentPlanResponse)
+async def plan_deployment(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployment_in: DeploymentCreate,
+    current_user: User = Depends(deps.get_current_user),
+    preemption_strategy: str = "priority",
+    placement_policy: str = "best_fit"
+):
+    """
+    Dry run of deployment scheduling: report which deployments would be preempted
+    and the resources left afterwards, without changing anything.
+    """
+    schedule = await db.offload(lambda session: DeploymentService(session, current_user).plan_deployment(
+        deployment_in, preemption_strategy, deployment_in.cluster_id, placement_policy
+    ))
+    if schedule is None:
+        return DeploymentPlanResponse(cluster_id=None, feasible=False, preempted_deployments=[])
+    return DeploymentPlanResponse(
+        cluster_id=schedule["cluster_id"],
+        feasible=schedule["feasible"],
+        preempted_deployments=[
+            PlannedPreemption(
+                id=victim.deployment_id,
+                priority=victim.priority,
+                cpu_required=victim.cpu,
+                ram_required=victim.ram,
+                gpu_required=victim.gpu
+            )
+            for victim in schedule["preempted_deployments"]
+        ],
+        remaining_resources=schedule["remaining_resources"],
+        fairness=schedule.get("fairness")
+    )
+
+@router.get("/", response_model=List[DeploymentResponse])
+async def list_deployments(
+    response: Response,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    current_user: User = Depends(deps.get_current_user),
+    status: Optional[DeploymentStatus] = None,
+    cluster_id: Optional[int] = None,
+    min_priority: Optional[int] = None,
+    max_priority: Optional[int] = None,
+    docker_image: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    List the organization's deployments, ordered by id or by priority
+    (`sort=priority`, highest first). Passing `limit` (or a `cursor`) returns one
+    page; when more deployments follow, the cursor for the next page is returned
+    in the X-Next-Cursor header. Without either, every deployment is returned.
+    """
+    deployments, next_cursor = await db.run(lambda session: DeploymentService(session, current_user).list_deployments(
+        status, cluster_id, min_priority, max_priority, docker_image, sort, cursor, limit
+    ))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return deployments
+
+
+@router.get("/export")
+async def export_deployments(
+    session_factory: sessionmaker = Depends(deps.get_session_factory),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Stream every deployment of the organization as NDJSON, one deployment per line.
+    """
+    if not current_user.organization_id:
+        raise HTTPException(status_code=400, detail="User must belong to an organization to export deployments.")
+    return StreamingResponse(ExportService(session_factory).export_deployments(current_user.organization_id),
+                             media_type="application/x-ndjson")
+
+
+@router.post("/{deployment_id}/complete", response_model=DeploymentReleaseResponse)
+async def complete_deployment(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployment_id: int,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Mark a deployment as completed and release its resources. Pending deployments
+    that fit into the freed space, including dependents it was the last blocker
+    of, are scheduled immediately and returned.
+    """
+    deployment, scheduled = await run_service(
+        db, current_user, lambda service: service.release_deployment(deployment_id, DeploymentStatus.COMPLETED)
+    )
+    return DeploymentReleaseResponse(deployment=deployment, scheduled=scheduled)
+
+@router.post("/{deployment_id}/fail", response_model=DeploymentReleaseResponse)
+async def fail_deployment(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployment_id: int,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Mark a deployment as failed and release its resources. Pending deployments
+    that fit into the freed space are scheduled immediately and returned.
+    """
+    deployment, scheduled = await run_service(
+        db, current_user, lambda service: service.release_deployment(deployment_id, DeploymentStatus.FAILED)
+    )
+    return DeploymentReleaseResponse(deployment=deployment, scheduled=scheduled)
+
+@router.post("/{deployment_id}/dependencies", response_model=DeploymentResponse)
+async def add_deployment_dependencies(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployment_id: int,
+    dependencies_in: DeploymentDependenciesUpdate,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Make a blocked or pending deployment wait for more deployments to complete.
+    Dependencies that would create a cycle are rejected.
+    """
+    return await db.run(lambda session: DeploymentService(session, current_user).add_dependencies(
+        deployment_id, dependencies_in.depends_on
+    ))
+
+@router.delete("/{deployment_id}", response_model=DeploymentReleaseResponse)
+async def delete_deployment(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    deployment_id: int,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Delete a deployment, releasing its resources if it was running. Pending
+    deployments that fit into the freed space are scheduled immediately and returned.
+    """
+    deployment, scheduled = await run_service(
+        db, current_user, lambda service: service.release_deployment(deployment_id)
+    )
+    return DeploymentReleaseResponse(deployment=deployment, scheduled=scheduled)
@@ -2,61 +2,102 @@ import secrets
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
 from app.core import deps
+from app.core.user_cache import user_cache
+from app.db.runner import SessionRunner
 from app.models.organization import Organization
 from app.models.user import User
-from app.schemas.organizationresponse import (OrganizationCreate,
+from app.schemas.organizationresponse import (FairShareQuotas,
+                                              OrganizationCreate,
                                               OrganizationResponse)
 
 router = APIRouter()
 
 
 @router.post("/", response_model=OrganizationResponse)
-def create_organization(
+async def create_organization(
         *,
-        db: Session = Depends(deps.get_db),
+        db: SessionRunner = Depends(deps.get_session_runner),
         organization_in: OrganizationCreate,
         current_user: User = Depends(deps.get_current_user)
 ):
     """
     Create a new organization.
     """
-    name = organization_in.name
-    existing_org = db.query(Organization).filter(Organization.name == name).first()
+    def create(session):
+        name = organization_in.name
+        existing_org = session.query(Organization).filter(Organization.name == name).first()
 
-    if existing_org:
-        raise HTTPException(status_code=400, detail="Organization with this name already exists.")
-    invite_code = secrets.token_urlsafe(8)
-    organization = Organization(name=name,invite_code=invite_code)
-    db.add(organization)
-    db.commit()
-    db.refresh(organization)
+        if existing_org:
+            raise HTTPException(status_code=400, detail="Organization with this name already exists.")
+        invite_code = secrets.token_urlsafe(8)
+        organization = Organization(name=name,invite_code=invite_code)
+        session.add(organization)
+        session.commit()
+        session.refresh(organization)
+        return organization
 
     # Ensure you're returning a valid OrganizationResponse object
-    return organization
+    return await db.run(create)
 
 
 @router.post("/{invite_code}/join")
-def join_organization(
+async def join_organization(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_session_runner),
     invite_code: str,
     current_user: User = Depends(deps.get_current_user)
 ):
     """
     TODO: Implement organization joining logic
     """
-    organization = db.query(Organization).filter(Organization.invite_code == invite_code).first()
+    def join(session):
+        organization = session.query(Organization).filter(Organization.invite_code == invite_code).first()
+
+        if not organization:
+            raise HTTPException(status_code=404, detail="Organization not found")
+
+        user = session.get(User, current_user.id)
+        if user.organization_id is not None:
+            raise HTTPException(status_code=400, detail="User is already a member of an organization")
+
+        user.organization_id = organization.id
+        session.commit()
+        user_cache.invalidate(user.id)
+        session.refresh(organization)
+        return organization
+
+    return await db.run(join)
+
 
-    if not organization:
-        raise HTTPException(status_code=404, detail="Organization not found")
+@router.put("/fair-share", response_model=FairShareQuotas, dependencies=[Depends(deps.require_admin)])
+async def set_fair_share_quotas(
+    *,
+    db: SessionRunner = Depends(deps.get_session_runner),
+    quotas_in: FairShareQuotas,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Set the fair_share quotas of the user's organization: the default for every
+    member and overrides for the listed members. Returns the quotas now in effect.
+    Quotas bound what members may use, so this takes the ADMIN_TOKEN as well.
+    """
+    def update(session):
+        if not current_user.organization_id:
+            raise HTTPException(status_code=400, detail="User must belong to an organization to set quotas.")
+        organization = session.get(Organization, current_user.organization_id)
+        members = {user.id: user for user in session.query(User).filter(User.organization_id == organization.id)}
+        missing = set(quotas_in.user_quotas) - set(members)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"User with id {min(missing)} not found in the organization.")
 
-    if current_user.organization_id is not None:
-        raise HTTPException(status_code=400, detail="User is already a member of an organization")
+        organization.fair_share_quota = quotas_in.fair_share_quota
+        for user_id, quota in quotas_in.user_quotas.items():
+            members[user_id].fair_share_quota = quota
+        session.commit()
+        return FairShareQuotas(
+            fair_share_quota=organization.fair_share_quota,
+            user_quotas={user.id: user.fair_share_quota for user in members.values() if user.fair_share_quota is not None}
+        )
 
-    current_user.organization_id = organization.id
-    db.commit()
-    db.refresh(current_user)
-    return organization
+    return await db.run(update)
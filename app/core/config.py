@@ -19,12 +19,60 @@ class Settings(BaseSettings):
     # Session configuration
     SECRET_KEY: str = "TODO_CHANGE_THIS_SECRET_KEY"  # TODO: Change in production
     SESSION_COOKIE_NAME: str = "session"
-    SESSION_MAX_AGE: int = 1800  # 30 minutes in seconds
+    SESSION_MAX_AGE: int = 1800  # 30 minutes in seconds, extended on every request
+    SESSION_BACKEND: str = "cookie"  # "cookie" (signed cookie, no server-side state), "redis" or "memory" (one process)
+    SESSION_REDIS_URL: str = "redis://localhost:6379/0"
+    SESSION_STORE_MAX_SIZE: int = 100000  # Sessions kept by the memory backend before evicting the least recently used
+    SESSION_SWEEP_BATCH_SIZE: int = 256  # Expired sessions removed per sweep of the memory backend
+    ADMIN_TOKEN: str = ""  # Bearer token for operator endpoints (quotas, /metrics, /health/caches); empty disables them
+    USER_CACHE_TTL_SECONDS: float = 30  # How long an authenticated user is served from memory
+    USER_CACHE_MAX_SIZE: int = 10000  # 0 disables the cache
+
+    # Password hashing
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # Operations allowed to wait for a worker before answering 503
+
+    # Startup
+    WEB_CONCURRENCY: int = 1  # Worker processes, as passed to uvicorn/gunicorn through the same variable
+    PRIME_CACHES_ON_STARTUP: bool = True  # Load the cluster index before serving
+
+    # Observability
+    METRICS_ENABLED: bool = True  # Per-request timing and database metrics served at /metrics
+    SERVER_TIMING_HEADER: bool = False  # Also report them in a Server-Timing response header
+
+    # Scheduling configuration
+    PREEMPTION_SOLVER_TIME_LIMIT_MS: float = 50  # Upper bound on victim search per request
+    PREEMPTION_SOLVER_MAX_CANDIDATES: int = 256  # Lowest priority deployments the min_cost solver picks from
+    MAX_DEPLOYMENT_BATCH_SIZE: int = 1000
+    PLACEMENT_MAX_CANDIDATES: int = 8  # Clusters re-read and planned on per placement
+    VECTORIZED_PLACEMENT_MIN_CLUSTERS: int = 48  # Rank with NumPy from this many clusters; slower below
+    CLUSTER_INDEX_TTL_SECONDS: float = 30
+    DEPLOYMENT_PAGE_SIZE: int = 100
+    DEPLOYMENT_PAGE_MAX_SIZE: int = 1000
+    CLUSTER_PAGE_SIZE: int = 100
+    CLUSTER_PAGE_MAX_SIZE: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched and written per chunk by the NDJSON exports
+
+    # Cluster resource accounting under concurrency
+    CLUSTER_ROW_LOCKING: bool = False  # SELECT ... FOR UPDATE the cluster row (Postgres); versioning is always on
+    CLUSTER_UPDATE_MAX_RETRIES: int = 5  # Retries after a concurrent cluster update was detected
+    CLUSTER_UPDATE_RETRY_BACKOFF_MS: float = 10  # Base of the jittered exponential backoff between retries
+
+    # Pending deployment scheduler
+    PENDING_SCHEDULER_ENABLED: bool = True
+    PENDING_SCHEDULER_TICK_SECONDS: float = 5
+    PENDING_SCHEDULER_MAX_PER_TICK: int = 100  # Pending deployments considered per cluster per pass
+    PENDING_SCHEDULER_PREEMPTION_STRATEGY: str = "priority"
+    RESCHEDULE_ON_RELEASE_LIMIT: int = 10  # Pending deployments tried inline when capacity is released
     
     # Database URL
     DATABASE_URL: str = os.getenv(
         "DATABASE_URL",
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
+    DATABASE_POOL_WARMUP: int = 2  # Connections opened at startup so the first requests do not connect
+    DATABASE_ASYNC: bool = False  # Serve requests through an AsyncSession (asyncpg / aiosqlite); scheduling still runs on the threadpool over DATABASE_URL
+    ASYNC_DATABASE_URL: str = ""  # Defaults to DATABASE_URL with the dialect's async driver
 
 settings = Settings()
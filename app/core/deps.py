@@ -1,9 +1,13 @@
-from typing import Generator, Optional, Type
+import secrets
+from typing import AsyncGenerator, Generator, Optional
 
 from fastapi import Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.core.user_cache import UserSnapshot, user_cache
+from app.db.runner import AsyncSessionRunner, SessionRunner, SyncSessionRunner
+from app.db.session import SessionLocal, get_async_session_factory
 from app.models.user import User
 
 
@@ -14,10 +18,33 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+def get_session_factory() -> sessionmaker:
+    """Session factory for work that outlives the request's own session, such as streamed responses."""
+    return SessionLocal
+
+async def get_async_db() -> AsyncGenerator:
+    async with get_async_session_factory()() as db:
+        yield db
+
+async def get_session_runner() -> AsyncGenerator[SessionRunner, None]:
+    """
+    Database access for the request path: an AsyncSession when DATABASE_ASYNC is
+    set, otherwise a blocking Session driven from the threadpool. Scheduling work
+    offloaded from the async stack uses a blocking Session on the threadpool.
+    """
+    if settings.DATABASE_ASYNC:
+        runner = AsyncSessionRunner(get_async_session_factory()(), SessionLocal)
+    else:
+        runner = SyncSessionRunner(SessionLocal())
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
-) -> Type[User]:
+    db: SessionRunner = Depends(get_session_runner)
+) -> UserSnapshot:
     """
     TODO: Implement current user validation from session
     Example:
@@ -42,10 +69,31 @@ async def get_current_user(
             detail="Not authenticated"
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+
+    user = await db.run(lambda session: session.query(User).filter(User.id == user_id).first())
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    return user
+    return user_cache.put(user)
+
+def require_admin(request: Request):
+    """
+    Allow operator endpoints only to requests carrying `Authorization: Bearer <ADMIN_TOKEN>`.
+    Without an ADMIN_TOKEN configured, they are disabled.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled"
+        )
+    authorization = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {settings.ADMIN_TOKEN}".encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
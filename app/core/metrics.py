@@ -0,0 +1,253 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LabelValues = Tuple[str, ...]
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+COMMIT_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Base class of the metrics rendered by /metrics in the Prometheus text format.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (the last one is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels: str) -> float:
+        entry = self._values.get(self._key(labels))
+        return entry[1] if entry else 0.0
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics. Each name is registered once; asking for
+    it again returns the existing metric.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Wall time of HTTP requests.", ("method", "route"))
+http_request_db_statements = metrics.histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request.", ("method", "route"),
+    STATEMENT_BUCKETS)
+http_request_db_duration_seconds = metrics.histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per HTTP request.", ("method", "route"))
+http_request_db_commits = metrics.histogram(
+    "http_request_db_commits", "Database commits per HTTP request.", ("method", "route"), COMMIT_BUCKETS)
+
+
+class RequestTimings:
+    """Database work attributed to the request being served."""
+
+    __slots__ = ("statements", "db_seconds", "commits")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.commits = 0
+
+
+# Set by RequestMetricsMiddleware. Context variables are copied into the threadpool
+# that runs sync database work, so the engine hooks see the request they serve.
+current_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_request_timings", default=None)
+
+
+def record_statement(seconds: float):
+    timings = current_request_timings.get()
+    if timings is not None:
+        timings.statements += 1
+        timings.db_seconds += seconds
+
+
+def record_commit():
+    timings = current_request_timings.get()
+    if timings is not None:
+        timings.commits += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, SQL statements, database time and commits of every HTTP
+    request, labelled by route template. With `server_timing` the figures known
+    when the response starts are also sent in a Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", (
+                        f"app;dur={(time.perf_counter() - start) * 1000:.1f}, "
+                        f"db;dur={timings.db_seconds * 1000:.1f};"
+                        f"desc=\"{timings.statements} statements, {timings.commits} commits\""
+                    ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_timings.reset(token)
+            # Unmatched paths share one label to keep the number of series bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            labels = {"method": scope["method"], "route": route}
+            http_requests_total.inc(status=str(status), **labels)
+            http_request_duration_seconds.observe(time.perf_counter() - start, **labels)
+            http_request_db_statements.observe(timings.statements, **labels)
+            http_request_db_duration_seconds.observe(timings.db_seconds, **labels)
+            http_request_db_commits.observe(timings.commits, **labels)
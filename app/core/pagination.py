@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Opaque keyset cursor for the position of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], *keys: str) -> Optional[Dict[str, Any]]:
+    """The position in a cursor made by `encode_cursor`; every key must hold an integer."""
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        position = None
+    # Exact type check: a tampered cursor holding a string, float or bool must not reach the query
+    if not isinstance(position, dict) or any(type(position.get(key)) is not int for key in keys):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    return position
@@ -0,0 +1,466 @@
+import bisect
+import random
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.cluster import Cluster
+from app.models.deployment import ACTIVE_STATUSES, Deployment
+
+
+class IndexedDeployment:
+	"""
+	Resource footprint of a deployment that currently holds capacity on a cluster.
+	`tenant` is the id of the user who submitted it, 0 when unknown.
+	"""
+
+	__slots__ = ("deployment_id", "priority", "cpu", "ram", "gpu", "tenant")
+
+	def __init__(self, deployment_id: int, priority: int, cpu: float, ram: float, gpu: float,
+				 user_id: Optional[int] = None):
+		self.deployment_id = deployment_id
+		self.priority = priority or 0
+		self.cpu = cpu or 0.0
+		self.ram = ram or 0.0
+		self.gpu = gpu or 0.0
+		self.tenant = user_id or 0
+
+	@property
+	def key(self) -> Tuple[int, int]:
+		return self.priority, self.deployment_id
+
+	@classmethod
+	def from_deployment(cls, deployment: Deployment) -> "IndexedDeployment":
+		return cls(deployment.id, deployment.priority, deployment.cpu_required,
+				   deployment.ram_required, deployment.gpu_required, deployment.user_id)
+
+	def __repr__(self):
+		return f"<IndexedDeployment(id={self.deployment_id}, priority={self.priority}, cpu={self.cpu}, ram={self.ram}, gpu={self.gpu})>"
+
+
+class _Node:
+	"""
+	Treap node ordered by (priority, deployment_id) and augmented with the size
+	and the per-dimension maximum and sum of its subtree.
+	"""
+
+	__slots__ = ("entry", "weight", "left", "right", "size",
+				 "max_cpu", "max_ram", "max_gpu", "sum_cpu", "sum_ram", "sum_gpu")
+
+	def __init__(self, entry: IndexedDeployment):
+		self.entry = entry
+		self.weight = random.random()
+		self.left = None
+		self.right = None
+		self.update()
+
+	def update(self):
+		entry = self.entry
+		max_cpu, max_ram, max_gpu = entry.cpu, entry.ram, entry.gpu
+		sum_cpu, sum_ram, sum_gpu = entry.cpu, entry.ram, entry.gpu
+		size = 1
+		for child in (self.left, self.right):
+			if child is not None:
+				size += child.size
+				max_cpu = max(max_cpu, child.max_cpu)
+				max_ram = max(max_ram, child.max_ram)
+				max_gpu = max(max_gpu, child.max_gpu)
+				sum_cpu += child.sum_cpu
+				sum_ram += child.sum_ram
+				sum_gpu += child.sum_gpu
+		self.max_cpu, self.max_ram, self.max_gpu = max_cpu, max_ram, max_gpu
+		self.sum_cpu, self.sum_ram, self.sum_gpu = sum_cpu, sum_ram, sum_gpu
+		self.size = size
+
+
+def _split(node: Optional[_Node], key: Tuple[int, int]) -> Tuple[Optional[_Node], Optional[_Node]]:
+	"""Split into (< key, >= key)."""
+	if node is None:
+		return None, None
+	if node.entry.key < key:
+		left, right = _split(node.right, key)
+		node.right = left
+		node.update()
+		return node, right
+	left, right = _split(node.left, key)
+	node.left = right
+	node.update()
+	return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+	if left is None:
+		return right
+	if right is None:
+		return left
+	if left.weight > right.weight:
+		left.right = _merge(left.right, right)
+		left.update()
+		return left
+	right.left = _merge(left, right.left)
+	right.update()
+	return right
+
+
+def _first_covering(node: Optional[_Node], cpu: float, ram: float, gpu: float,
+					below_priority: Optional[int]) -> Optional[IndexedDeployment]:
+	if node is None or node.max_cpu < cpu or node.max_ram < ram or node.max_gpu < gpu:
+		return None
+	found = _first_covering(node.left, cpu, ram, gpu, below_priority)
+	if found is not None:
+		return found
+	entry = node.entry
+	if below_priority is not None and entry.priority >= below_priority:
+		return None
+	if entry.cpu >= cpu and entry.ram >= ram and entry.gpu >= gpu:
+		return entry
+	return _first_covering(node.right, cpu, ram, gpu, below_priority)
+
+
+def _in_order(node: Optional[_Node]) -> Iterator[IndexedDeployment]:
+	"""Lazily iterate a treap lowest key first."""
+	stack = []
+	while stack or node is not None:
+		while node is not None:
+			stack.append(node)
+			node = node.left
+		node = stack.pop()
+		yield node.entry
+		node = node.right
+
+
+class TenantShares:
+	"""
+	Resources held on a cluster per tenant (the user who submitted the
+	deployments), for Dominant Resource Fairness. A tenant's dominant share is
+	the largest fraction of any one resource limit its deployments hold.
+
+	Tenants are kept sorted by dominant share, highest first, and each tenant's
+	deployments in a treap ordered lowest priority first, so an update costs
+	O(log tenants + log n).
+	"""
+
+	def __init__(self, limits: Tuple[float, float, float]):
+		self.limits = limits
+		self._usage: Dict[int, Tuple[float, float, float]] = {}
+		self._roots: Dict[int, _Node] = {}
+		self._order: List[Tuple[float, int]] = []  # (-dominant share, tenant)
+
+	def __len__(self):
+		return len(self._usage)
+
+	def share_of(self, usage: Tuple[float, float, float]) -> float:
+		return max((used / limit for used, limit in zip(usage, self.limits) if limit > 0), default=0.0)
+
+	def usage(self, tenant: int) -> Tuple[float, float, float]:
+		return self._usage.get(tenant, (0.0, 0.0, 0.0))
+
+	def dominant_share(self, tenant: int) -> float:
+		return self.share_of(self.usage(tenant))
+
+	def add(self, entry: IndexedDeployment):
+		left, right = _split(self._roots.get(entry.tenant), entry.key)
+		self._roots[entry.tenant] = _merge(_merge(left, _Node(entry)), right)
+		self._shift(entry.tenant, entry.cpu, entry.ram, entry.gpu)
+
+	def remove(self, entry: IndexedDeployment):
+		left, rest = _split(self._roots.get(entry.tenant), entry.key)
+		_, right = _split(rest, (entry.priority, entry.deployment_id + 1))
+		root = _merge(left, right)
+		if root is None:
+			self._roots.pop(entry.tenant, None)
+		else:
+			self._roots[entry.tenant] = root
+		self._shift(entry.tenant, -entry.cpu, -entry.ram, -entry.gpu)
+
+	def _shift(self, tenant: int, cpu: float, ram: float, gpu: float):
+		usage = self._usage.get(tenant)
+		if usage is not None:
+			del self._order[bisect.bisect_left(self._order, (-self.share_of(usage), tenant))]
+			cpu, ram, gpu = usage[0] + cpu, usage[1] + ram, usage[2] + gpu
+		if tenant not in self._roots:
+			self._usage.pop(tenant, None)
+			return
+		self._usage[tenant] = (cpu, ram, gpu)
+		bisect.insort(self._order, (-self.share_of(self._usage[tenant]), tenant))
+
+	def by_share(self) -> Iterator[Tuple[float, int]]:
+		"""Iterate (dominant share, tenant), highest share first."""
+		for negative_share, tenant in self._order:
+			yield -negative_share, tenant
+
+	def deployments(self, tenant: int) -> Iterator[IndexedDeployment]:
+		"""Iterate a tenant's deployments lowest priority first."""
+		return _in_order(self._roots.get(tenant))
+
+
+class ClusterCapacity:
+	"""
+	In-memory view of a single cluster: its limits, free capacity and the
+	deployments holding resources on it, ordered lowest priority first.
+
+	Insertions and removals are O(log n). Lookups of the lowest priority
+	deployment that can cover a shortfall on its own prune whole subtrees by
+	their per-dimension maximum. When every subtree has one deployment holding
+	all of its maxima, as with deployments sized from one shape, a subtree that
+	is not pruned is sure to contain a match, so a lookup never backtracks and
+	visits at most two nodes per level: O(log n) expected. The maxima of
+	different dimensions may however come from different deployments: with
+	CPU-heavy and RAM-heavy deployments and a shortfall in both, no subtree is
+	pruned and a lookup is O(n).
+	"""
+
+	def __init__(self, cluster_id: int, limits: Tuple[float, float, float], available: Tuple[float, float, float]):
+		self.cluster_id = cluster_id
+		self.cpu_limit, self.ram_limit, self.gpu_limit = limits
+		self.cpu_available, self.ram_available, self.gpu_available = available
+		self.lock = threading.RLock()
+		self._root: Optional[_Node] = None
+		self._entries: Dict[int, IndexedDeployment] = {}
+		# Built on first use by a fair share plan, then maintained by add and remove
+		self._tenants: Optional[TenantShares] = None
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, deployment_id: int):
+		return deployment_id in self._entries
+
+	def get(self, deployment_id: int) -> Optional[IndexedDeployment]:
+		return self._entries.get(deployment_id)
+
+	def add(self, entry: IndexedDeployment):
+		with self.lock:
+			if entry.deployment_id in self._entries:
+				self.remove(entry.deployment_id)
+			left, right = _split(self._root, entry.key)
+			self._root = _merge(_merge(left, _Node(entry)), right)
+			self._entries[entry.deployment_id] = entry
+			if self._tenants is not None:
+				self._tenants.add(entry)
+
+	def remove(self, deployment_id: int) -> Optional[IndexedDeployment]:
+		with self.lock:
+			entry = self._entries.pop(deployment_id, None)
+			if entry is None:
+				return None
+			left, rest = _split(self._root, entry.key)
+			_, right = _split(rest, (entry.priority, entry.deployment_id + 1))
+			self._root = _merge(left, right)
+			if self._tenants is not None:
+				self._tenants.remove(entry)
+			return entry
+
+	def set_available(self, cpu: float, ram: float, gpu: float):
+		with self.lock:
+			self.cpu_available, self.ram_available, self.gpu_available = cpu, ram, gpu
+
+	def first_covering(self, cpu: float, ram: float, gpu: float,
+					   below_priority: Optional[int] = None) -> Optional[IndexedDeployment]:
+		"""
+		Return the lowest priority deployment whose resources are at least
+		(cpu, ram, gpu) in every dimension, or None. With `below_priority`, only
+		deployments with a strictly lower priority are considered. O(n) in the
+		worst case, see the class docstring.
+		"""
+		with self.lock:
+			return _first_covering(self._root, cpu, ram, gpu, below_priority)
+
+	def totals_below(self, priority: int) -> Tuple[float, float, float]:
+		"""Sum of the resources held by deployments with a priority strictly below `priority`."""
+		with self.lock:
+			cpu = ram = gpu = 0.0
+			node = self._root
+			while node is not None:
+				if node.entry.priority < priority:
+					entry = node.entry
+					cpu += entry.cpu
+					ram += entry.ram
+					gpu += entry.gpu
+					if node.left is not None:
+						cpu += node.left.sum_cpu
+						ram += node.left.sum_ram
+						gpu += node.left.sum_gpu
+					node = node.right
+				else:
+					node = node.left
+			return cpu, ram, gpu
+
+	def count_below(self, priority: int) -> int:
+		"""Number of deployments with a priority strictly below `priority`."""
+		with self.lock:
+			count = 0
+			node = self._root
+			while node is not None:
+				if node.entry.priority < priority:
+					count += 1 + (node.left.size if node.left is not None else 0)
+					node = node.right
+				else:
+					node = node.left
+			return count
+
+	def totals(self) -> Tuple[float, float, float]:
+		"""Sum of the resources held by every indexed deployment."""
+		with self.lock:
+			if self._root is None:
+				return 0.0, 0.0, 0.0
+			return self._root.sum_cpu, self._root.sum_ram, self._root.sum_gpu
+
+	def lowest(self, priority: int, count: int) -> List[IndexedDeployment]:
+		"""The first `count` deployments with a priority strictly below `priority`, lowest first; O(log n + count)."""
+		with self.lock:
+			entries = []
+			for entry in _in_order(self._root):
+				if entry.priority >= priority or len(entries) == count:
+					break
+				entries.append(entry)
+			return entries
+
+	def by_priority(self) -> Iterator[IndexedDeployment]:
+		"""Iterate deployments lowest priority first (ties broken by id)."""
+		with self.lock:
+			entries = list(_in_order(self._root))
+		return iter(entries)
+
+	def tenants(self) -> TenantShares:
+		"""Usage per tenant; callers iterating it should hold `lock`."""
+		with self.lock:
+			if self._tenants is None:
+				tenants = TenantShares((self.cpu_limit, self.ram_limit, self.gpu_limit))
+				for entry in self._entries.values():
+					tenants.add(entry)
+				self._tenants = tenants
+			return self._tenants
+
+	def copy(self) -> "ClusterCapacity":
+		"""Independent working copy, e.g. to plan several deployments before committing."""
+		with self.lock:
+			clone = ClusterCapacity(
+				self.cluster_id,
+				(self.cpu_limit, self.ram_limit, self.gpu_limit),
+				(self.cpu_available, self.ram_available, self.gpu_available)
+			)
+			for entry in self.by_priority():
+				clone.add(entry)
+			return clone
+
+	def matches(self, cluster: Cluster) -> bool:
+		"""Cheap staleness check against an already loaded cluster row."""
+		return (self.cpu_limit == cluster.cpu_limit and
+				self.ram_limit == cluster.ram_limit and
+				self.gpu_limit == cluster.gpu_limit and
+				self.cpu_available == cluster.cpu_available and
+				self.ram_available == cluster.ram_available and
+				self.gpu_available == cluster.gpu_available)
+
+	@classmethod
+	def load(cls, db: Session, cluster: Cluster) -> "ClusterCapacity":
+		"""Build the capacity view of a cluster from the `deployment` table."""
+		capacity = cls(
+			cluster.id,
+			(cluster.cpu_limit, cluster.ram_limit, cluster.gpu_limit),
+			(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+		)
+		rows = db.query(
+			Deployment.id, Deployment.priority,
+			Deployment.cpu_required, Deployment.ram_required, Deployment.gpu_required, Deployment.user_id
+		).filter(
+			Deployment.cluster_id == cluster.id,
+			Deployment.status.in_(ACTIVE_STATUSES)
+		).all()
+		for row in rows:
+			capacity.add(IndexedDeployment(*row))
+		return capacity
+
+
+class CapacityIndex:
+	"""
+	Process-wide registry of ClusterCapacity views.
+
+	A cluster is loaded from the database the first time it is scheduled on and
+	is then kept up to date by DeploymentService. Every lookup compares the view
+	with the cluster row the caller already holds and reloads it on mismatch, so
+	changes made by other workers are picked up without an extra query.
+	"""
+
+	def __init__(self):
+		self._clusters: Dict[int, ClusterCapacity] = {}
+		self._lock = threading.RLock()
+
+	def get(self, db: Session, cluster: Cluster) -> ClusterCapacity:
+		with self._lock:
+			capacity = self._clusters.get(cluster.id)
+			if capacity is None or not capacity.matches(cluster):
+				capacity = self.resync(db, cluster)
+			return capacity
+
+	def peek(self, cluster_id: int) -> Optional[ClusterCapacity]:
+		return self._clusters.get(cluster_id)
+
+	def resync(self, db: Session, cluster: Cluster) -> ClusterCapacity:
+		"""Rebuild the view of a cluster from the database."""
+		capacity = ClusterCapacity.load(db, cluster)
+		with self._lock:
+			self._clusters[cluster.id] = capacity
+		return capacity
+
+	def record(self, cluster_id: int, available: Tuple[float, float, float],
+			   admitted: List[Deployment] = (), released_ids: List[int] = ()):
+		"""
+		Apply committed scheduling changes to an already loaded cluster view.
+
+		`available` is the cluster's free capacity as committed.
+		"""
+		with self._lock:
+			capacity = self._clusters.get(cluster_id)
+			if capacity is None:
+				return
+			with capacity.lock:
+				for deployment_id in released_ids:
+					capacity.remove(deployment_id)
+				for deployment in admitted:
+					capacity.add(IndexedDeployment.from_deployment(deployment))
+				capacity.set_available(*available)
+
+	def invalidate(self, cluster_id: int):
+		with self._lock:
+			self._clusters.pop(cluster_id, None)
+
+	def clear(self):
+		with self._lock:
+			self._clusters.clear()
+
+	def check(self, db: Session, cluster: Cluster) -> List[str]:
+		"""
+		Compare the in-memory view of a cluster with the database.
+
+		Returns a list of human readable discrepancies; an empty list means the
+		view is consistent (or the cluster is not loaded).
+		"""
+		capacity = self.peek(cluster.id)
+		if capacity is None:
+			return []
+		expected = ClusterCapacity.load(db, cluster)
+		problems = []
+		if not capacity.matches(cluster):
+			problems.append(
+				f"cluster {cluster.id}: indexed free capacity "
+				f"({capacity.cpu_available}, {capacity.ram_available}, {capacity.gpu_available}) "
+				f"differs from database ({cluster.cpu_available}, {cluster.ram_available}, {cluster.gpu_available})"
+			)
+		with capacity.lock:
+			indexed = {entry.deployment_id: entry for entry in capacity.by_priority()}
+		stored = {entry.deployment_id: entry for entry in expected.by_priority()}
+		for deployment_id in sorted(stored.keys() - indexed.keys()):
+			problems.append(f"cluster {cluster.id}: deployment {deployment_id} missing from index")
+		for deployment_id in sorted(indexed.keys() - stored.keys()):
+			problems.append(f"cluster {cluster.id}: deployment {deployment_id} is indexed but not active")
+		for deployment_id in sorted(indexed.keys() & stored.keys()):
+			a, b = indexed[deployment_id], stored[deployment_id]
+			if (a.priority, a.cpu, a.ram, a.gpu, a.tenant) != (b.priority, b.cpu, b.ram, b.gpu, b.tenant):
+				problems.append(f"cluster {cluster.id}: deployment {deployment_id} differs from database")
+		return problems
+
+
+capacity_index = CapacityIndex()
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.scheduling.metrics import record_free_capacity
+from app.models.cluster import Cluster
+
+
+class ClusterSnapshot:
+	"""
+	Limits and free capacity of a cluster. Has the same resource attributes as
+	the `Cluster` model so either can be handed to a placement policy.
+	"""
+
+	__slots__ = ("id", "organization_id", "cpu_limit", "ram_limit", "gpu_limit",
+				 "cpu_available", "ram_available", "gpu_available")
+
+	def __init__(self, cluster_id: int, organization_id: int,
+				 limits: Tuple[float, float, float], available: Tuple[float, float, float]):
+		self.id = cluster_id
+		self.organization_id = organization_id
+		self.cpu_limit, self.ram_limit, self.gpu_limit = limits
+		self.cpu_available, self.ram_available, self.gpu_available = available
+
+	@classmethod
+	def from_cluster(cls, cluster: Cluster) -> "ClusterSnapshot":
+		return cls(cluster.id, cluster.organization_id,
+				   (cluster.cpu_limit, cluster.ram_limit, cluster.gpu_limit),
+				   (cluster.cpu_available, cluster.ram_available, cluster.gpu_available))
+
+	def __repr__(self):
+		return f"<ClusterSnapshot(id={self.id}, cpu_available={self.cpu_available}, ram_available={self.ram_available}, gpu_available={self.gpu_available})>"
+
+
+class ClusterIndex:
+	"""
+	Process-wide, per-organization map of cluster free capacity used to rank
+	clusters for placement without reading every cluster row.
+
+	An organization is loaded with one query on first use and reloaded once it
+	is older than CLUSTER_INDEX_TTL_SECONDS, which bounds how long clusters
+	created or changed by other workers stay invisible. Placement always
+	re-reads the chosen clusters before committing, so a stale entry only costs
+	a worse ranking.
+	"""
+
+	def __init__(self, ttl_seconds: Optional[float] = None):
+		self.ttl_seconds = settings.CLUSTER_INDEX_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+		self._organizations: Dict[int, Dict[int, ClusterSnapshot]] = {}
+		self._loaded_at: Dict[int, float] = {}
+		self._cluster_organization: Dict[int, int] = {}
+		self._lock = threading.RLock()
+
+	def clusters(self, db: Session, organization_id: int) -> List[ClusterSnapshot]:
+		with self._lock:
+			loaded_at = self._loaded_at.get(organization_id)
+			if loaded_at is None or time.monotonic() - loaded_at > self.ttl_seconds:
+				self.reload(db, organization_id)
+			return list(self._organizations[organization_id].values())
+
+	@staticmethod
+	def _query(db: Session):
+		return db.query(
+			Cluster.id, Cluster.organization_id,
+			Cluster.cpu_limit, Cluster.ram_limit, Cluster.gpu_limit,
+			Cluster.cpu_available, Cluster.ram_available, Cluster.gpu_available
+		)
+
+	def reload(self, db: Session, organization_id: int):
+		rows = self._query(db).filter(Cluster.organization_id == organization_id).all()
+		self._store({organization_id: rows})
+
+	def prime(self, db: Session):
+		"""Load the clusters of every organization with one query, e.g. at startup."""
+		by_organization: Dict[int, list] = {}
+		for row in self._query(db).all():
+			by_organization.setdefault(row[1], []).append(row)
+		self._store(by_organization)
+
+	def _store(self, rows_by_organization: Dict[int, list]):
+		loaded_at = time.monotonic()
+		for organization_id, rows in rows_by_organization.items():
+			snapshots = {row[0]: ClusterSnapshot(row[0], row[1], row[2:5], row[5:8]) for row in rows}
+			with self._lock:
+				self._organizations[organization_id] = snapshots
+				self._loaded_at[organization_id] = loaded_at
+				for cluster_id in snapshots:
+					self._cluster_organization[cluster_id] = organization_id
+			for snapshot in snapshots.values():
+				record_free_capacity(snapshot.id, (snapshot.cpu_available, snapshot.ram_available, snapshot.gpu_available))
+
+	def update(self, cluster: Cluster):
+		"""Store the current limits and free capacity of a cluster row."""
+		self.record(ClusterSnapshot.from_cluster(cluster))
+
+	def record(self, snapshot: ClusterSnapshot):
+		with self._lock:
+			organization = self._organizations.get(snapshot.organization_id)
+			if organization is not None:
+				organization[snapshot.id] = snapshot
+				self._cluster_organization[snapshot.id] = snapshot.organization_id
+
+	def set_available(self, cluster_id: int, available: Tuple[float, float, float]):
+		with self._lock:
+			organization_id = self._cluster_organization.get(cluster_id)
+			snapshot = self._organizations.get(organization_id, {}).get(cluster_id)
+			if snapshot is not None:
+				snapshot.cpu_available, snapshot.ram_available, snapshot.gpu_available = available
+
+	def clear(self):
+		with self._lock:
+			self._organizations.clear()
+			self._loaded_at.clear()
+			self._cluster_organization.clear()
+
+
+cluster_index = ClusterIndex()
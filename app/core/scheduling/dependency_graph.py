@@ -0,0 +1,141 @@
+import threading
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy.orm import Session, aliased
+
+from app.models.deployment import Deployment, DeploymentStatus
+from app.models.deployment_dependency import DeploymentDependency
+
+
+class DependencyGraph:
+	"""
+	In-memory view of the dependency DAG of blocked deployments.
+
+	Every blocked deployment keeps a count of its upstream deployments that have
+	not completed yet, and every upstream the list of blocked deployments waiting
+	on it. Completing a deployment decrements the counts of its dependents, so
+	releasing a node costs O(out-degree); dependents reaching zero move to the
+	ready set, which the pending scheduler drains into the pending queue.
+
+	The database is the source of truth: `load` rebuilds the graph from it and
+	the pending scheduler reloads it on every full scan to pick up changes made
+	by other processes.
+	"""
+
+	# Upstream states a blocked deployment can never get past
+	DEAD_STATUSES = (DeploymentStatus.FAILED, DeploymentStatus.PREEMPTED)
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._loaded = False
+		self._unmet: Dict[int, int] = {}
+		self._dependents: Dict[int, List[int]] = {}
+		self._ready: Set[int] = set()
+
+	def load(self, db: Session):
+		"""
+		Rebuild the graph from the database. Blocked deployments waiting on a failed
+		or preempted deployment, e.g. ones a crashed worker never got to, are failed
+		and committed, together with their own blocked dependents.
+		"""
+		upstream = aliased(Deployment)
+		rows = db.query(Deployment.id, DeploymentDependency.depends_on_id, upstream.status).outerjoin(
+			DeploymentDependency, DeploymentDependency.deployment_id == Deployment.id
+		).outerjoin(
+			upstream, upstream.id == DeploymentDependency.depends_on_id
+		).filter(Deployment.status == DeploymentStatus.BLOCKED).all()
+
+		unmet, dependents, dead = {}, {}, []
+		for deployment_id, depends_on_id, status in rows:
+			unmet.setdefault(deployment_id, 0)
+			if status in self.DEAD_STATUSES:
+				dead.append(deployment_id)
+			# A dependency on a deployment that no longer exists cannot hold anything back
+			elif depends_on_id is not None and status is not None and status != DeploymentStatus.COMPLETED:
+				unmet[deployment_id] += 1
+				dependents.setdefault(depends_on_id, []).append(deployment_id)
+
+		doomed, stack = set(dead), list(dead)
+		while stack:
+			for dependent_id in dependents.get(stack.pop(), ()):
+				if dependent_id not in doomed:
+					doomed.add(dependent_id)
+					stack.append(dependent_id)
+		if doomed:
+			db.query(Deployment).filter(
+				Deployment.id.in_(doomed),
+				Deployment.status == DeploymentStatus.BLOCKED
+			).update({Deployment.status: DeploymentStatus.FAILED.name}, synchronize_session=False)
+			db.commit()
+			for deployment_id in doomed:
+				unmet.pop(deployment_id)
+				dependents.pop(deployment_id, None)
+			for upstream_id in dependents:
+				dependents[upstream_id] = [dependent_id for dependent_id in dependents[upstream_id]
+										   if dependent_id not in doomed]
+		with self._lock:
+			self._unmet = {deployment_id: count for deployment_id, count in unmet.items() if count}
+			self._dependents = dependents
+			self._ready = {deployment_id for deployment_id, count in unmet.items() if not count}
+			self._loaded = True
+
+	def ensure_loaded(self, db: Session):
+		if not self._loaded:
+			self.load(db)
+
+	def add(self, deployment_id: int, upstream_ids: Iterable[int]):
+		"""
+		Make a blocked deployment wait on the given uncompleted upstream deployments.
+		Edges already known (e.g. picked up by a concurrent `load`) are ignored.
+		"""
+		with self._lock:
+			for upstream_id in set(upstream_ids):
+				dependents = self._dependents.setdefault(upstream_id, [])
+				if deployment_id not in dependents:
+					dependents.append(deployment_id)
+					self._unmet[deployment_id] = self._unmet.get(deployment_id, 0) + 1
+			if deployment_id in self._unmet:
+				self._ready.discard(deployment_id)
+			else:
+				self._ready.add(deployment_id)
+
+	def complete(self, deployment_id: int) -> List[int]:
+		"""Record that a deployment completed; returns the dependents that became ready."""
+		ready = []
+		with self._lock:
+			self._discard(deployment_id)
+			for dependent_id in self._dependents.pop(deployment_id, ()):
+				if dependent_id not in self._unmet:
+					continue
+				self._unmet[dependent_id] -= 1
+				if not self._unmet[dependent_id]:
+					del self._unmet[dependent_id]
+					self._ready.add(dependent_id)
+					ready.append(dependent_id)
+		return ready
+
+	def discard(self, deployment_ids: Iterable[int]):
+		"""Forget deployments that will never run or complete, and the edges out of them."""
+		with self._lock:
+			for deployment_id in deployment_ids:
+				self._discard(deployment_id)
+				self._dependents.pop(deployment_id, None)
+
+	def _discard(self, deployment_id: int):
+		self._unmet.pop(deployment_id, None)
+		self._ready.discard(deployment_id)
+
+	def pop_ready(self) -> List[int]:
+		with self._lock:
+			ready, self._ready = self._ready, set()
+		return sorted(ready)
+
+	def clear(self):
+		with self._lock:
+			self._unmet.clear()
+			self._dependents.clear()
+			self._ready.clear()
+			self._loaded = False
+
+
+dependency_graph = DependencyGraph()
@@ -0,0 +1,172 @@
+import heapq
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy.orm import Session
+
+from app.core.scheduling.capacity_index import (ClusterCapacity,
+                                                IndexedDeployment,
+                                                capacity_index)
+from app.core.scheduling.metrics import observe_plan
+from app.core.scheduling.preemption_strategy import PreemptionStrategy
+from app.models.cluster import Cluster
+from app.models.organization import Organization
+from app.models.user import User
+from app.schemas.deploymentresponse import DeploymentCreate
+
+EPSILON = 1e-6  # Tolerance for floating-point comparisons
+
+
+class FairSharePreemptionStrategy(PreemptionStrategy):
+	"""
+	Dominant Resource Fairness between the users sharing a cluster.
+
+	A user's dominant share is the largest fraction of the cluster's CPU, RAM or
+	GPU their running deployments hold. A new deployment may preempt the
+	deployments of users whose dominant share is above the one its own user
+	reaches with it, most over-served user first and, within a user, lowest
+	priority first; priority does not protect a deployment from another user.
+	Once no other user is above that share, the requester's own lower priority
+	deployments are preempted as the priority strategy would. A deployment that
+	would take its user past their quota (a maximum dominant share, see
+	`quota`) is infeasible.
+
+	Deployments without an owner (created before deployments recorded their
+	user) are pooled as tenant 0. That pool is not a user whose share means
+	anything, so other users never preempt it; only the priority strategies do.
+
+	Tenants are visited from the cluster's TenantShares, kept sorted by dominant
+	share, so a decision costs O(log tenants) per user it touches.
+	"""
+
+	name = "fair_share"
+
+	def __init__(self):
+		self._quotas: Dict[int, Optional[float]] = {}
+
+	def set_quota(self, tenant: int, quota: Optional[float]):
+		"""Preset a user's quota instead of reading it from the database."""
+		self._quotas[tenant] = quota
+
+	def quota(self, db: Optional[Session], tenant: int) -> Optional[float]:
+		"""
+		The user's quota, else their organization's default; None means no limit.
+		Without a session (the simulator) only preset quotas apply.
+		"""
+		if not tenant or (db is None and tenant not in self._quotas):
+			return None
+		if tenant not in self._quotas:
+			row = db.query(User.fair_share_quota, Organization.fair_share_quota).outerjoin(
+				Organization, User.organization_id == Organization.id
+			).filter(User.id == tenant).first()
+			self._quotas[tenant] = None if row is None else (row[0] if row[0] is not None else row[1])
+		return self._quotas[tenant]
+
+	@observe_plan
+	def plan(self, db: Session, cluster: Type[Cluster], deployment_in: DeploymentCreate,
+			 capacity: Optional[ClusterCapacity] = None) -> Dict[str, Any]:
+		"""
+		Plan the preemptions that make room for the deployment without letting
+		any user take more than their fair share. The schedule carries a
+		`fairness` report: the requester's dominant share before and after, their
+		quota and the dominant share every preempted user is left with.
+		"""
+		tenant = getattr(deployment_in, "user_id", None) or 0
+		quota = self.quota(db, tenant)
+		required = (deployment_in.cpu_required, deployment_in.ram_required, deployment_in.gpu_required)
+		if capacity is None:
+			capacity = capacity_index.get(db, cluster)
+
+		with capacity.lock:
+			tenants = capacity.tenants()
+			usage = tenants.usage(tenant)
+			share_after = tenants.share_of(tuple(used + extra for used, extra in zip(usage, required)))
+			fairness = {
+				"user_id": tenant or None,
+				"quota": quota,
+				"dominant_share_before": tenants.share_of(usage),
+				"dominant_share_after": share_after,
+				"victim_dominant_shares": {},
+				"tenants": len(tenants),
+			}
+			if quota is not None and share_after > quota + EPSILON:
+				return self.schedule(cluster, deployment_in, [], fairness, feasible=False)
+			if self.fits(cluster, deployment_in):
+				return self.schedule(cluster, deployment_in, [], fairness)
+
+			shortfall = [
+				deployment_in.cpu_required - cluster.cpu_available,
+				deployment_in.ram_required - cluster.ram_available,
+				deployment_in.gpu_required - cluster.gpu_available,
+			]
+			victims, considered = [], 0
+			remaining = {}  # Usage of the users preempted so far, as planned
+			queue = []  # Their (-dominant share, tenant) as planned
+			ranked = tenants.by_share()
+			upcoming = next(ranked, None)
+			cursors = {}
+
+			while any(short > EPSILON for short in shortfall):
+				# Next most over-served user, taking planned preemptions into account
+				while upcoming is not None and (upcoming[1] in remaining or upcoming[1] in (tenant, 0)):
+					upcoming = next(ranked, None)
+				if queue and (upcoming is None or -queue[0][0] >= upcoming[0]):
+					share, victim_tenant = -queue[0][0], queue[0][1]
+					heapq.heappop(queue)
+				elif upcoming is not None:
+					share, victim_tenant = upcoming
+					upcoming = next(ranked, None)
+				else:
+					break
+				if share <= share_after + EPSILON:
+					break
+
+				cursor = cursors.setdefault(victim_tenant, tenants.deployments(victim_tenant))
+				victim = next(cursor, None)
+				if victim is None:
+					continue
+				considered += 1
+				victims.append(victim)
+				used = remaining.get(victim_tenant, tenants.usage(victim_tenant))
+				used = (used[0] - victim.cpu, used[1] - victim.ram, used[2] - victim.gpu)
+				remaining[victim_tenant] = used
+				heapq.heappush(queue, (-tenants.share_of(used), victim_tenant))
+				shortfall = [short - freed for short, freed in zip(shortfall, (victim.cpu, victim.ram, victim.gpu))]
+
+			# Then the requester's own lower priority deployments
+			for victim in tenants.deployments(tenant):
+				if not any(short > EPSILON for short in shortfall) or victim.priority >= deployment_in.priority:
+					break
+				considered += 1
+				victims.append(victim)
+				shortfall = [short - freed for short, freed in zip(shortfall, (victim.cpu, victim.ram, victim.gpu))]
+
+			if any(short > EPSILON for short in shortfall):
+				return self.schedule(cluster, deployment_in, [], fairness, feasible=False, considered=considered)
+
+			victims = self.drop_unneeded(victims, shortfall)
+			for victim_tenant in {victim.tenant for victim in victims}:
+				used = list(tenants.usage(victim_tenant))
+				for victim in victims:
+					if victim.tenant == victim_tenant:
+						used = [used[0] - victim.cpu, used[1] - victim.ram, used[2] - victim.gpu]
+				fairness["victim_dominant_shares"][victim_tenant] = tenants.share_of(tuple(used))
+			return self.schedule(cluster, deployment_in, victims, fairness, considered=considered)
+
+	@staticmethod
+	def drop_unneeded(victims: List[IndexedDeployment], surplus: List[float]) -> List[IndexedDeployment]:
+		"""Spare victims, latest picked first, whose resources are not needed to cover the shortfall."""
+		surplus = [-short for short in surplus]
+		kept = []
+		for victim in reversed(victims):
+			resources = (victim.cpu, victim.ram, victim.gpu)
+			if all(spare - used >= -EPSILON for spare, used in zip(surplus, resources)):
+				surplus = [spare - used for spare, used in zip(surplus, resources)]
+			else:
+				kept.append(victim)
+		return kept[::-1]
+
+	def schedule(self, cluster: Type[Cluster], deployment_in: DeploymentCreate, victims: List[IndexedDeployment],
+				 fairness: Dict[str, Any], feasible: bool = True, considered: int = 0) -> Dict[str, Any]:
+		schedule = self.build_schedule(cluster, deployment_in, victims, feasible=feasible, considered=considered)
+		schedule["fairness"] = fairness
+		return schedule
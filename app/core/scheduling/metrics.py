@@ -0,0 +1,95 @@
+import functools
+import time
+from typing import Dict, Iterable, Tuple
+
+from app.core.metrics import metrics
+
+PLAN_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+CANDIDATE_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+VICTIM_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 100)
+SHARE_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1)
+
+plan_duration_seconds = metrics.histogram(
+	"scheduler_plan_duration_seconds", "Time taken by a preemption strategy to plan one deployment.",
+	("strategy", "outcome"), PLAN_BUCKETS)
+victims_considered = metrics.histogram(
+	"scheduler_victims_considered", "Lower priority deployments eligible for preemption per plan that needed it.",
+	("strategy",), CANDIDATE_BUCKETS)
+victims_chosen = metrics.histogram(
+	"scheduler_victims_chosen", "Deployments picked for preemption per feasible plan that needed it.",
+	("strategy",), VICTIM_BUCKETS)
+dominant_share = metrics.histogram(
+	"scheduler_dominant_share", "Dominant share of the cluster the requesting user would hold, per fair share plan.",
+	("strategy", "outcome"), SHARE_BUCKETS)
+placements_total = metrics.counter(
+	"scheduler_placements_total", "Committed placements; outcome is fit, preempted or queued.", ("outcome",))
+preemptions_total = metrics.counter(
+	"scheduler_preemptions_total", "Committed preemptions by priority class of the victim.", ("priority_class",))
+cluster_free_capacity = metrics.gauge(
+	"scheduler_cluster_free_capacity", "Free capacity of a cluster as last committed or read by this process.",
+	("cluster_id", "resource"))
+pending_deployments = metrics.gauge(
+	"scheduler_pending_deployments", "Pending deployments waiting for capacity on a cluster.", ("cluster_id",))
+
+
+def priority_class(priority: int) -> str:
+	"""Bounded label for a priority: 0 to 9 as is, anything else as "<0" or "10+"."""
+	if priority < 0:
+		return "<0"
+	return str(priority) if priority < 10 else "10+"
+
+
+def observe_plan(plan):
+	"""
+	Decorator for `PreemptionStrategy.plan` implementations recording the planning
+	time, whether the deployment fit, needed preemption or was infeasible, and the
+	number of victims considered and chosen. Label values come from the strategy's
+	`name`. Plans carrying a `fairness` report also record the requester's
+	dominant share.
+	"""
+	@functools.wraps(plan)
+	def wrapper(self, db, cluster, deployment_in, capacity=None):
+		start = time.perf_counter()
+		schedule = plan(self, db, cluster, deployment_in, capacity)
+		elapsed = time.perf_counter() - start
+		victims = schedule["preempted_deployments"]
+		if not schedule["feasible"]:
+			outcome = "infeasible"
+		else:
+			outcome = "preempts" if victims else "fits"
+		plan_duration_seconds.observe(elapsed, strategy=self.name, outcome=outcome)
+		if outcome != "fits":
+			victims_considered.observe(schedule.get("candidates_considered", 0), strategy=self.name)
+		if victims:
+			victims_chosen.observe(len(victims), strategy=self.name)
+		fairness = schedule.get("fairness")
+		if fairness is not None:
+			dominant_share.observe(fairness["dominant_share_after"], strategy=self.name, outcome=outcome)
+		return schedule
+	return wrapper
+
+
+def record_placements(preempted_priorities: Iterable[Iterable[int]]):
+	"""Count committed placements, one iterable of victim priorities per placed deployment."""
+	for priorities in preempted_priorities:
+		priorities = list(priorities)
+		placements_total.inc(outcome="preempted" if priorities else "fit")
+		for priority in priorities:
+			preemptions_total.inc(priority_class=priority_class(priority))
+
+
+def record_queued(cluster_id: int, count: int = 1):
+	placements_total.inc(count, outcome="queued")
+	pending_deployments.inc(count, cluster_id=str(cluster_id))
+
+
+def record_free_capacity(cluster_id: int, available: Tuple[float, float, float]):
+	for resource, value in zip(("cpu", "ram", "gpu"), available):
+		cluster_free_capacity.set(value, cluster_id=str(cluster_id), resource=resource)
+
+
+def set_pending_counts(counts: Dict[int, int]):
+	"""Replace the queue depth gauges with counts read from the database."""
+	pending_deployments.clear()
+	for cluster_id, count in counts.items():
+		pending_deployments.set(count, cluster_id=str(cluster_id))
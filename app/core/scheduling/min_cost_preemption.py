@@ -0,0 +1,210 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.scheduling.capacity_index import (ClusterCapacity,
+                                                IndexedDeployment,
+                                                capacity_index)
+from app.core.scheduling.metrics import observe_plan
+from app.core.scheduling.preemption_strategy import PreemptionStrategy
+from app.models.cluster import Cluster
+from app.schemas.deploymentresponse import DeploymentCreate
+
+EPSILON = 1e-6  # Tolerance for floating-point comparisons
+SOLVER_TIME_RESERVE = 0.25  # Share of the time limit kept for the linear work after the search deadline
+
+
+def _covers(freed: Sequence[float], shortfall: Sequence[float]) -> bool:
+	return all(f + EPSILON >= s for f, s in zip(freed, shortfall))
+
+
+def _resources(entry: IndexedDeployment) -> Tuple[float, float, float]:
+	return entry.cpu, entry.ram, entry.gpu
+
+
+def _total(entries: Sequence[IndexedDeployment]) -> List[float]:
+	return [sum(values) for values in zip(*(_resources(entry) for entry in entries))] or [0.0, 0.0, 0.0]
+
+
+def select_victims(candidates: List[IndexedDeployment], shortfall: Tuple[float, float, float],
+				   limits: Tuple[float, float, float], deadline: float,
+				   max_branch_candidates: int = 64) -> Tuple[Optional[List[IndexedDeployment]], bool]:
+	"""
+	Pick the cheapest set of candidates whose combined cpu/ram/gpu covers `shortfall`.
+
+	The cost of a victim is its priority (relative to the lowest candidate) times
+	the share of the cluster it occupies, so low priority and small deployments
+	are preferred. A greedy cover gives an initial answer, which a depth-first
+	branch and bound over the most cost-effective candidates then tries to
+	improve until `deadline` (a time.perf_counter() value) passes. When the
+	deadline passes during the greedy cover, it is completed in candidate order
+	in one linear pass, so the work after the deadline is O(len(candidates)).
+
+	Returns:
+		(victims, optimal): victims is None when no subset covers the shortfall;
+		optimal tells whether the search finished before the deadline.
+	"""
+	if not candidates:
+		return None, True
+	base_priority = min(entry.priority for entry in candidates)
+	scale = [limit if limit and limit > 0 else 1.0 for limit in limits]
+
+	def cost(entry: IndexedDeployment) -> float:
+		share = sum(r / s for r, s in zip(_resources(entry), scale))
+		return (entry.priority - base_priority + 1) * max(share, EPSILON)
+
+	costs = {entry.deployment_id: cost(entry) for entry in candidates}
+
+	def gain(entry: IndexedDeployment, remaining: Sequence[float]) -> float:
+		return sum(min(r, need) / need for r, need in zip(_resources(entry), remaining) if need > EPSILON)
+
+	if not _covers(_total(candidates), shortfall):
+		return None, True
+
+	# Greedy cover: best marginal coverage per unit of cost first.
+	remaining = list(shortfall)
+	chosen: List[IndexedDeployment] = []
+	pool = list(candidates)
+	timed_out = False
+	while not _covers([0.0, 0.0, 0.0], remaining):
+		if time.perf_counter() > deadline:
+			timed_out = True
+			break
+		best, best_ratio = None, 0.0
+		for position, entry in enumerate(pool):
+			ratio = gain(entry, remaining) / costs[entry.deployment_id]
+			if ratio > best_ratio:
+				best, best_ratio = position, ratio
+		if best is None:
+			break
+		entry = pool[best]
+		# Swap-remove: the pool's order does not matter
+		pool[best] = pool[-1]
+		pool.pop()
+		chosen.append(entry)
+		remaining = [need - r for need, r in zip(remaining, _resources(entry))]
+	if not _covers([0.0, 0.0, 0.0], remaining):
+		# Out of time: cover the rest with the candidates in the order given
+		picked = {entry.deployment_id for entry in chosen}
+		cpu, ram, gpu = remaining
+		for entry in candidates:
+			if cpu <= EPSILON and ram <= EPSILON and gpu <= EPSILON:
+				break
+			if entry.deployment_id not in picked and (
+					(cpu > EPSILON and entry.cpu > 0) or (ram > EPSILON and entry.ram > 0) or
+					(gpu > EPSILON and entry.gpu > 0)):
+				chosen.append(entry)
+				cpu, ram, gpu = cpu - entry.cpu, ram - entry.ram, gpu - entry.gpu
+
+	# Drop victims that turned out to be redundant, most expensive first.
+	cpu, ram, gpu = _total(chosen)
+	cpu_short, ram_short, gpu_short = (short - EPSILON for short in shortfall)
+	kept = {entry.deployment_id for entry in chosen}
+	for entry in sorted(chosen, key=lambda e: costs[e.deployment_id], reverse=True):
+		if cpu - entry.cpu >= cpu_short and ram - entry.ram >= ram_short and gpu - entry.gpu >= gpu_short:
+			cpu, ram, gpu = cpu - entry.cpu, ram - entry.ram, gpu - entry.gpu
+			kept.discard(entry.deployment_id)
+	best_set = [entry for entry in chosen if entry.deployment_id in kept]
+	best_cost = sum(costs[entry.deployment_id] for entry in best_set)
+	if timed_out or time.perf_counter() > deadline:
+		return best_set, False
+
+	# Branch and bound over the most cost-effective candidates.
+	ranked = sorted(candidates, key=lambda e: gain(e, shortfall) / costs[e.deployment_id], reverse=True)
+	ranked = ranked[:max_branch_candidates]
+	suffix = [[0.0, 0.0, 0.0] for _ in range(len(ranked) + 1)]
+	for i in range(len(ranked) - 1, -1, -1):
+		suffix[i] = [a + b for a, b in zip(suffix[i + 1], _resources(ranked[i]))]
+
+	finished = True
+	stack = [(0, (0.0, 0.0, 0.0), 0.0, ())]
+	while stack:
+		if time.perf_counter() > deadline:
+			finished = False
+			break
+		i, freed, spent, picked = stack.pop()
+		if spent >= best_cost - EPSILON:
+			continue
+		if _covers(freed, shortfall):
+			best_cost, best_set = spent, [ranked[j] for j in picked]
+			continue
+		if i == len(ranked) or not _covers([f + s for f, s in zip(freed, suffix[i])], shortfall):
+			continue
+		entry = ranked[i]
+		stack.append((i + 1, freed, spent, picked))
+		stack.append((i + 1, tuple(f + r for f, r in zip(freed, _resources(entry))),
+					  spent + costs[entry.deployment_id], picked + (i,)))
+
+	return best_set, finished and len(ranked) == len(candidates)
+
+
+class MinCostPreemptionStrategy(PreemptionStrategy):
+	"""
+	Preempt the cheapest set of lower priority deployments that together free
+	enough resources, instead of a single victim.
+	"""
+
+	name = "min_cost"
+
+	def __init__(self, time_limit_ms: Optional[float] = None, max_candidates: Optional[int] = None):
+		if time_limit_ms is None:
+			time_limit_ms = settings.PREEMPTION_SOLVER_TIME_LIMIT_MS
+		if max_candidates is None:
+			max_candidates = settings.PREEMPTION_SOLVER_MAX_CANDIDATES
+		self.time_limit_ms = time_limit_ms
+		self.max_candidates = max_candidates
+
+	@observe_plan
+	def plan(self, db: Session, cluster: Type[Cluster], deployment_in: DeploymentCreate,
+			 capacity: Optional[ClusterCapacity] = None) -> Dict[str, Any]:
+		"""
+		Plan the preemption of the minimum cost set of deployments with a priority
+		below the new one.
+
+		Returns a schedule indicating which deployments to preempt and the remaining resources.
+		"""
+		if self.fits(cluster, deployment_in):
+			return self.build_schedule(cluster, deployment_in, [])
+
+		shortfall = (
+			deployment_in.cpu_required - cluster.cpu_available,
+			deployment_in.ram_required - cluster.ram_available,
+			deployment_in.gpu_required - cluster.gpu_available
+		)
+		# The search stops early enough to leave time for completing its answer
+		deadline = time.perf_counter() + self.time_limit_ms * (1 - SOLVER_TIME_RESERVE) / 1000.0
+		if capacity is None:
+			capacity = capacity_index.get(db, cluster)
+		victims = None
+		considered = 0
+		if _covers(capacity.totals_below(deployment_in.priority), shortfall):
+			considered = capacity.count_below(deployment_in.priority)
+			candidates = self.candidates(capacity, deployment_in.priority, shortfall)
+			victims, _ = select_victims(
+				candidates, shortfall,
+				(cluster.cpu_limit, cluster.ram_limit, cluster.gpu_limit), deadline
+			)
+
+		if not victims:
+			return self.build_schedule(cluster, deployment_in, [], feasible=False, considered=considered)
+		return self.build_schedule(cluster, deployment_in, victims, considered=considered)
+
+	def candidates(self, capacity: ClusterCapacity, priority: int,
+				   shortfall: Tuple[float, float, float]) -> List[IndexedDeployment]:
+		"""
+		The deployments the solver chooses from: the max_candidates lowest priority
+		ones below `priority` (the cheapest, as cost grows with priority), widened
+		until they can cover the shortfall together, plus the lowest priority one
+		that covers it alone.
+		"""
+		limit = self.max_candidates
+		candidates = capacity.lowest(priority, limit)
+		while len(candidates) == limit and not _covers(_total(candidates), shortfall):
+			limit *= 2
+			candidates = capacity.lowest(priority, limit)
+		single = capacity.first_covering(*(short - EPSILON for short in shortfall), below_priority=priority)
+		if single is not None and all(entry.deployment_id != single.deployment_id for entry in candidates):
+			candidates.append(single)
+		return candidates
@@ -0,0 +1,26 @@
+from app.core.scheduling.placement_policy import (BestFitPlacementPolicy,
+                                                  GpuAffinityPlacementPolicy,
+                                                  PlacementPolicy,
+                                                  WorstFitPlacementPolicy)
+
+
+class PlacementPolicyFactory:
+
+	@staticmethod
+	def get_placement_policy(policy_type: str) -> PlacementPolicy:
+		"""
+		Factory function to return the appropriate placement policy class.
+
+		Args:
+			policy_type: The type of placement policy (e.g., "best_fit", "worst_fit", "gpu_affinity").
+
+		Returns:
+			PlacementPolicy class.
+		"""
+		policies = {
+			"best_fit": BestFitPlacementPolicy,
+			"worst_fit": WorstFitPlacementPolicy,
+			"gpu_affinity": GpuAffinityPlacementPolicy,
+		}
+		policy_class = policies.get(policy_type, BestFitPlacementPolicy)
+		return policy_class()
@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from typing import List, Sequence, Tuple
+
+from app.core.config import settings
+from app.schemas.deploymentresponse import DeploymentCreate
+
+
+def _leftover(cluster, deployment_in: DeploymentCreate) -> Tuple[float, float, float]:
+	"""Free capacity left after placing the deployment, as a fraction of each limit."""
+	return tuple(
+		(available - required) / limit if limit else 0.0
+		for available, required, limit in (
+			(cluster.cpu_available, deployment_in.cpu_required, cluster.cpu_limit),
+			(cluster.ram_available, deployment_in.ram_required, cluster.ram_limit),
+			(cluster.gpu_available, deployment_in.gpu_required, cluster.gpu_limit)
+		)
+	)
+
+
+class PlacementPolicy(ABC):
+	"""
+	Abstract base class for placement policies, which choose the cluster of an
+	organization a deployment should run on. Clusters are anything exposing the
+	`Cluster` resource attributes (ORM rows or ClusterSnapshot).
+	"""
+
+	name = "base"
+	vectorized = False  # Whether scoring.SCORE_KEYS has a NumPy version of `score`
+
+	@abstractmethod
+	def score(self, cluster, deployment_in: DeploymentCreate) -> Tuple:
+		"""
+		Score a cluster the deployment fits on; higher is better.
+		"""
+		pass
+
+	@staticmethod
+	def can_hold(cluster, deployment_in: DeploymentCreate) -> bool:
+		"""Whether the cluster could hold the deployment if it were empty."""
+		return (cluster.cpu_limit >= deployment_in.cpu_required and
+				cluster.ram_limit >= deployment_in.ram_required and
+				cluster.gpu_limit >= deployment_in.gpu_required)
+
+	@staticmethod
+	def replicas_held(cluster, deployment_in: DeploymentCreate) -> int:
+		"""How many copies of the deployment the cluster could hold if it were empty."""
+		counts = [
+			int(limit / required + 1e-9) if required > 0 else None
+			for limit, required in (
+				(cluster.cpu_limit, deployment_in.cpu_required),
+				(cluster.ram_limit, deployment_in.ram_required),
+				(cluster.gpu_limit, deployment_in.gpu_required)
+			)
+		]
+		counts = [count for count in counts if count is not None]
+		return min(counts) if counts else 2 ** 31
+
+	@staticmethod
+	def fits(cluster, deployment_in: DeploymentCreate) -> bool:
+		return (cluster.cpu_available >= deployment_in.cpu_required and
+				cluster.ram_available >= deployment_in.ram_required and
+				cluster.gpu_available >= deployment_in.gpu_required)
+
+	def rank(self, clusters: Sequence, deployment_in: DeploymentCreate) -> List:
+		"""
+		Order the clusters that could hold the deployment: clusters it fits on right
+		now come first, each group sorted by score. From
+		VECTORIZED_PLACEMENT_MIN_CLUSTERS clusters on, they are scored with NumPy.
+		"""
+		if self.vectorized and len(clusters) >= settings.VECTORIZED_PLACEMENT_MIN_CLUSTERS:
+			# Imported on first use, so small organizations never pay for loading NumPy
+			from app.core.scheduling.scoring import ScoringEngine
+			return ScoringEngine(clusters).rank(self.name, deployment_in)
+		return self.rank_scalar(clusters, deployment_in)
+
+	def rank_scalar(self, clusters: Sequence, deployment_in: DeploymentCreate) -> List:
+		"""`rank`, one cluster at a time."""
+		candidates = [cluster for cluster in clusters if self.can_hold(cluster, deployment_in)]
+		fitting = [cluster for cluster in candidates if self.fits(cluster, deployment_in)]
+		others = [cluster for cluster in candidates if not self.fits(cluster, deployment_in)]
+		fitting.sort(key=lambda cluster: self.score(cluster, deployment_in), reverse=True)
+		others.sort(key=lambda cluster: _leftover(cluster, deployment_in), reverse=True)
+		return fitting + others
+
+
+class BestFitPlacementPolicy(PlacementPolicy):
+	"""
+	Place on the cluster with the least free capacity left afterwards, keeping
+	large holes available for large deployments.
+	"""
+
+	name = "best_fit"
+	vectorized = True
+
+	def score(self, cluster, deployment_in: DeploymentCreate) -> Tuple:
+		return (-sum(_leftover(cluster, deployment_in)), -cluster.id)
+
+
+class WorstFitPlacementPolicy(PlacementPolicy):
+	"""
+	Place on the cluster with the most free capacity left in its tightest
+	resource, spreading load across clusters.
+	"""
+
+	name = "worst_fit"
+	vectorized = True
+
+	def score(self, cluster, deployment_in: DeploymentCreate) -> Tuple:
+		leftover = _leftover(cluster, deployment_in)
+		limits = (cluster.cpu_limit, cluster.ram_limit, cluster.gpu_limit)
+		tightest = min((value for value, limit in zip(leftover, limits) if limit), default=0.0)
+		return (tightest, sum(leftover), -cluster.id)
+
+
+class GpuAffinityPlacementPolicy(PlacementPolicy):
+	"""
+	Pack GPU deployments tightly onto GPU clusters and keep CPU-only deployments
+	off clusters with GPUs, so GPUs are not stranded behind CPU work.
+	"""
+
+	name = "gpu_affinity"
+	vectorized = True
+
+	def score(self, cluster, deployment_in: DeploymentCreate) -> Tuple:
+		leftover = _leftover(cluster, deployment_in)
+		if deployment_in.gpu_required > 0:
+			return (-leftover[2], -sum(leftover), -cluster.id)
+		return (-cluster.gpu_limit, -sum(leftover), -cluster.id)
@@ -1,24 +1,30 @@
 from typing import Type
 
+from app.core.scheduling.fair_share_preemption import \
+    FairSharePreemptionStrategy
+from app.core.scheduling.min_cost_preemption import MinCostPreemptionStrategy
 from app.core.scheduling.preemption_strategy import PreemptionStrategy
 from app.core.scheduling.priority_preemption import PriorityPreemptionStrategy
 
 
 class PreemptionSchedulingFactory:
 
+	strategies = {
+		"priority": PriorityPreemptionStrategy,
+		"min_cost": MinCostPreemptionStrategy,
+		"fair_share": FairSharePreemptionStrategy,
+	}
+
 	@staticmethod
-	def get_preemption_strategy(strategy_type: str) -> PriorityPreemptionStrategy:
+	def get_preemption_strategy(strategy_type: str) -> PreemptionStrategy:
 		"""
 		Factory function to return the appropriate preemption strategy class.
 
 		Args:
-			strategy_type: The type of preemption strategy (e.g., "priority", "resource", "time").
+			strategy_type: The type of preemption strategy (e.g., "priority", "min_cost", "fair_share").
 
 		Returns:
 			PreemptionStrategy class.
 		"""
-		strategies = {
-			"priority": PriorityPreemptionStrategy,
-		}
-		strategy_class = strategies.get(strategy_type, PriorityPreemptionStrategy)
+		strategy_class = PreemptionSchedulingFactory.strategies.get(strategy_type, PriorityPreemptionStrategy)
 		return strategy_class()
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from app.core.scheduling.capacity_index import (ClusterCapacity,
+                                                IndexedDeployment)
 from app.models.cluster import Cluster
 from app.schemas.deploymentresponse import DeploymentCreate
 
@@ -10,20 +13,79 @@ from app.schemas.deploymentresponse import DeploymentCreate
 class PreemptionStrategy(ABC):
 	"""
 	Abstract base class for preemption strategies. Different algorithms can inherit
-	from this class and implement the `preempt` method.
+	from this class and implement the `plan` method, decorated with `observe_plan`.
 	"""
 
+	name = "base"  # Metric label; matches the key in PreemptionSchedulingFactory.strategies
+
 	@abstractmethod
-	def preempt(self, db: Session, cluster: Cluster, deployment_in: DeploymentCreate)-> Dict[str, Any]:
+	def plan(self, db: Session, cluster: Cluster, deployment_in: DeploymentCreate,
+			 capacity: Optional[ClusterCapacity] = None) -> Dict[str, Any]:
 		"""
-		Preempt lower priority deployments to make room for the new deployment.
+		Work out which deployments would have to be preempted to make room for the
+		new deployment. Must not modify the database or the capacity index.
 
 		Args:
-			db: The database session.
+			db: The database session (read only).
 			cluster: The cluster where the deployment is to be scheduled.
 			deployment_in: The new deployment to be scheduled.
+			capacity: Capacity view to plan against; defaults to the cluster's view in
+				the process-wide capacity index.
+
+		Returns:
+			A schedule, see `build_schedule`.
+		"""
+		pass
+
+	def preempt(self, db: Session, cluster: Cluster, deployment_in: DeploymentCreate,
+				capacity: Optional[ClusterCapacity] = None) -> Dict[str, Any]:
+		"""
+		Plan the preemption of lower priority deployments for the new deployment.
 
 		Raises:
 			HTTPException: If no resources are available after preemption.
 		"""
-		pass
+		schedule = self.plan(db, cluster, deployment_in, capacity)
+		if not schedule["feasible"]:
+			raise HTTPException(
+				status_code=400,
+				detail=(
+					f"Unable to find deployable resources for the request. "
+					f"Requested: CPU={deployment_in.cpu_required}, RAM={deployment_in.ram_required}, GPU={deployment_in.gpu_required}. "
+					f"Available: CPU={cluster.cpu_available}, RAM={cluster.ram_available}, GPU={cluster.gpu_available}."
+				)
+			)
+		return schedule
+
+	@staticmethod
+	def fits(cluster: Cluster, deployment_in: DeploymentCreate) -> bool:
+		return (cluster.cpu_available >= deployment_in.cpu_required and
+				cluster.ram_available >= deployment_in.ram_required and
+				cluster.gpu_available >= deployment_in.gpu_required)
+
+	@staticmethod
+	def build_schedule(cluster: Cluster, deployment_in: DeploymentCreate,
+					   victims: List[IndexedDeployment], feasible: bool = True,
+					   considered: int = 0) -> Dict[str, Any]:
+		"""
+		Build the schedule returned by `plan`.
+
+		`preempted_deployments` holds the capacity index entries of the victims and
+		`remaining_resources` the cluster's free capacity once they are preempted and
+		the new deployment is placed (only meaningful when `feasible`).
+		`candidates_considered` is the number of deployments that were eligible
+		for preemption.
+		"""
+		victims = victims if feasible else []
+		return {
+			"cluster_id": cluster.id,
+			"feasible": feasible,
+			"preempted_deployments": victims,
+			"candidates_considered": considered,
+			"remaining_resources": {
+				"cpu": cluster.cpu_available + sum(v.cpu for v in victims) - deployment_in.cpu_required,
+				"ram": cluster.ram_available + sum(v.ram for v in victims) - deployment_in.ram_required,
+				"gpu": cluster.gpu_available + sum(v.gpu for v in victims) - deployment_in.gpu_required
+			},
+			"deployment_in": deployment_in
+		}
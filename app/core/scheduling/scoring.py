@@ -0,0 +1,141 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.schemas.deploymentresponse import DeploymentCreate
+
+# Vectorized counterparts of PlacementPolicy.score, by policy name. Each takes
+# the engine, the (D, 3) requirements and the (D, C, 3) leftover fractions and
+# returns the score's components as (D, C) arrays, most significant first.
+ScoreKeys = Callable[["ScoringEngine", np.ndarray, np.ndarray], List[np.ndarray]]
+
+
+def _total(leftover: np.ndarray) -> np.ndarray:
+	# Same summation order as the scalar `sum(_leftover(...))`
+	return leftover[..., 0] + leftover[..., 1] + leftover[..., 2]
+
+
+def _best_fit_keys(engine: "ScoringEngine", required: np.ndarray, leftover: np.ndarray) -> List[np.ndarray]:
+	return [-_total(leftover), np.broadcast_to(-engine.ids, leftover.shape[:2])]
+
+
+def _worst_fit_keys(engine: "ScoringEngine", required: np.ndarray, leftover: np.ndarray) -> List[np.ndarray]:
+	limited = engine.limits[None, :, :] != 0
+	tightest = np.where(limited, leftover, np.inf).min(axis=2)
+	tightest = np.where(limited.any(axis=2), tightest, 0.0)
+	return [tightest, _total(leftover), np.broadcast_to(-engine.ids, leftover.shape[:2])]
+
+
+def _gpu_affinity_keys(engine: "ScoringEngine", required: np.ndarray, leftover: np.ndarray) -> List[np.ndarray]:
+	wants_gpu = required[:, 2:3] > 0
+	return [
+		np.where(wants_gpu, -leftover[..., 2], -engine.limits[None, :, 2]),
+		-_total(leftover),
+		np.broadcast_to(-engine.ids, leftover.shape[:2])
+	]
+
+
+SCORE_KEYS: Dict[str, ScoreKeys] = {
+	"best_fit": _best_fit_keys,
+	"worst_fit": _worst_fit_keys,
+	"gpu_affinity": _gpu_affinity_keys,
+}
+
+
+class ScoringEngine:
+	"""
+	Limits and free capacity of a set of clusters held in NumPy arrays, so that
+	many deployments can be checked and scored against every cluster in one
+	vectorized pass instead of one (deployment, cluster) pair at a time.
+
+	Rankings are identical to PlacementPolicy.rank for the policies in
+	SCORE_KEYS. `update` refreshes one cluster's free capacity, so a batch can
+	keep ranking against the capacity it has staged so far.
+	"""
+
+	def __init__(self, clusters: Sequence):
+		self.clusters = list(clusters)
+		self._rows = {cluster.id: row for row, cluster in enumerate(self.clusters)}
+		self.ids = np.array([cluster.id for cluster in self.clusters], dtype=np.float64)
+		self.limits = np.array(
+			[(cluster.cpu_limit, cluster.ram_limit, cluster.gpu_limit) for cluster in self.clusters],
+			dtype=np.float64
+		).reshape(-1, 3)
+		self.available = np.array(
+			[(cluster.cpu_available, cluster.ram_available, cluster.gpu_available) for cluster in self.clusters],
+			dtype=np.float64
+		).reshape(-1, 3)
+
+	def __len__(self):
+		return len(self.clusters)
+
+	def update(self, cluster):
+		"""Refresh the free capacity of one cluster, e.g. after staging a placement on it."""
+		row = self._rows.get(cluster.id)
+		if row is not None:
+			self.available[row] = (cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+
+	@staticmethod
+	def requirements(deployments_in: Sequence[DeploymentCreate]) -> np.ndarray:
+		return np.array(
+			[(deployment_in.cpu_required, deployment_in.ram_required, deployment_in.gpu_required)
+			 for deployment_in in deployments_in],
+			dtype=np.float64
+		).reshape(-1, 3)
+
+	def can_hold(self, required: np.ndarray) -> np.ndarray:
+		"""(D, C) mask of the clusters that could hold each deployment if they were empty."""
+		return (self.limits[None, :, :] >= required[:, None, :]).all(axis=2)
+
+	def fits(self, required: np.ndarray) -> np.ndarray:
+		"""(D, C) mask of the clusters each deployment fits on right now."""
+		return (self.available[None, :, :] >= required[:, None, :]).all(axis=2)
+
+	def leftover(self, required: np.ndarray) -> np.ndarray:
+		"""(D, C, 3) free capacity left after placing each deployment, as a fraction of each limit."""
+		limits = self.limits[None, :, :]
+		with np.errstate(divide="ignore", invalid="ignore"):
+			fraction = (self.available[None, :, :] - required[:, None, :]) / limits
+		return np.where(limits != 0, fraction, 0.0)
+
+	def order(self, policy_name: str, required: np.ndarray):
+		"""
+		Cluster rows for each deployment in PlacementPolicy.rank order, and how many
+		of them could hold it: ((D, C) row indices, (D,) counts). Clusters it fits
+		on now come first, sorted by the policy's score, then the others by
+		leftover capacity; clusters that could never hold it come last.
+		"""
+		can_hold = self.can_hold(required)
+		fits = self.fits(required) & can_hold
+		leftover = self.leftover(required)
+		score = SCORE_KEYS[policy_name](self, required, leftover)
+		score += [np.zeros(fits.shape)] * (3 - len(score))
+		# Descending by (group, key...) where non-fitting clusters are keyed by their leftover
+		keys = [-np.where(fits, score_key, leftover[..., i]) for i, score_key in enumerate(score)]
+		group = np.where(fits, 0, np.where(can_hold, 1, 2))
+		# lexsort sorts by the last key first and is stable, like the scalar sorts
+		order = np.lexsort(keys[::-1] + [group], axis=-1)
+		return order, can_hold.sum(axis=1)
+
+	def rank(self, policy_name: str, deployment_in: DeploymentCreate, limit: Optional[int] = None) -> List:
+		"""The clusters that could hold the deployment, best first (PlacementPolicy.rank)."""
+		return self.rank_many(policy_name, [deployment_in], limit)[0]
+
+	def rank_many(self, policy_name: str, deployments_in: Sequence[DeploymentCreate],
+				  limit: Optional[int] = None, chunk_size: int = 2048) -> List[List]:
+		"""
+		Rank the clusters for every deployment in one pass per `chunk_size`
+		deployments (bounding the (chunk, C, 3) temporaries); at most `limit`
+		clusters are returned per deployment.
+		"""
+		if not self.clusters:
+			return [[] for _ in deployments_in]
+		ranked = []
+		for start in range(0, len(deployments_in), chunk_size):
+			required = self.requirements(deployments_in[start:start + chunk_size])
+			order, counts = self.order(policy_name, required)
+			if limit is not None:
+				counts = np.minimum(counts, limit)
+			for rows, count in zip(order.tolist(), counts.tolist()):
+				ranked.append([self.clusters[row] for row in rows[:count]])
+		return ranked
@@ -0,0 +1,350 @@
+import functools
+import heapq
+import json
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.scheduling.capacity_index import (ClusterCapacity,
+                                                IndexedDeployment)
+from app.core.scheduling.cluster_index import ClusterSnapshot
+from app.core.scheduling.fair_share_preemption import \
+    FairSharePreemptionStrategy
+from app.core.scheduling.metrics import priority_class
+from app.core.scheduling.placement_factory import PlacementPolicyFactory
+from app.core.scheduling.placement_policy import PlacementPolicy
+from app.core.scheduling.preemption_strategy import PreemptionStrategy
+from app.schemas.deploymentresponse import DeploymentCreate
+
+RESOURCES = ("cpu", "ram", "gpu")
+
+
+def read_trace(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+	"""
+	Parse a JSONL trace, one event per line; blank lines are skipped. An event
+	without a `time` happens at the time of the previous one. Raises ValueError
+	if time goes backwards.
+	"""
+	now = 0.0
+	for number, line in enumerate(lines, 1):
+		if not line.strip():
+			continue
+		event = json.loads(line)
+		at = float(event.get("time", now))
+		if at < now:
+			raise ValueError(f"Trace line {number}: time {at} is before {now}; events must be in time order.")
+		event["time"] = now = at
+		yield event
+
+
+def _summary(values: Sequence[float], scale: float = 1.0) -> Dict[str, float]:
+	"""Count, mean and nearest-rank percentiles of the values, multiplied by `scale`."""
+	if not values:
+		return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+	ordered = sorted(values)
+
+	def percentile(fraction: float) -> float:
+		return round(ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))] * scale, 3)
+
+	return {
+		"count": len(ordered),
+		"mean": round(sum(ordered) / len(ordered) * scale, 3),
+		"p50": percentile(0.50),
+		"p90": percentile(0.90),
+		"p99": percentile(0.99),
+		"max": round(ordered[-1] * scale, 3),
+	}
+
+
+class SimulatedDeployment:
+	"""A deployment of the trace that has arrived and not finished yet."""
+
+	__slots__ = ("id", "key", "deployment_in", "duration", "arrived", "started", "cluster_id")
+
+	def __init__(self, deployment_id: int, key, deployment_in: DeploymentCreate, duration: Optional[float],
+				 arrived: float):
+		self.id = deployment_id
+		self.key = key  # Id of the deployment in the trace
+		self.deployment_in = deployment_in
+		self.duration = duration
+		self.arrived = arrived
+		self.started: Optional[float] = None
+		self.cluster_id: Optional[int] = None  # Cluster it runs or is queued on
+
+
+class Simulator:
+	"""
+	Discrete-event replay of a trace against an in-memory model of the clusters,
+	making the same decisions as DeploymentService, for comparing preemption
+	strategies and placement policies offline.
+
+	Clusters are ClusterSnapshot rows with a ClusterCapacity index each, so any
+	PreemptionStrategy plans exactly as it does in production, without a session.
+	A deployment without a cluster_id is placed through the placement policy; one
+	that cannot be placed is queued on the best cluster that could ever hold it,
+	or rejected. Pending deployments of a cluster are retried, highest priority
+	first, whenever a deployment on it completes. Preempted deployments are not
+	requeued, as in the service. Simulated plans are not recorded in the scheduler
+	metrics of the process.
+
+	Trace events (JSONL, see `read_trace`), by `event`:
+	- cluster: `id`, `cpu_limit`, `ram_limit`, `gpu_limit` adds an empty cluster
+	- quota: `user_id`, `fair_share_quota` presets a fair share quota
+	- arrival: `id` and the DeploymentCreate fields (`cpu_required`, ...,
+	  `priority`, `user_id`, `cluster_id`), plus an optional `duration` in
+	  seconds after which a started deployment completes
+	- completion: `id` completes a running deployment or cancels a pending one
+	"""
+
+	def __init__(self, strategy: PreemptionStrategy, placement_policy: str = "best_fit",
+				 pending_limit: Optional[int] = None):
+		self.strategy = strategy
+		# The strategy's plan without the observe_plan wrapper
+		plan = type(strategy).plan
+		self._plan = functools.partial(getattr(plan, "__wrapped__", plan), strategy)
+		self.policy = PlacementPolicyFactory.get_placement_policy(placement_policy)
+		self.pending_limit = settings.PENDING_SCHEDULER_MAX_PER_TICK if pending_limit is None else pending_limit
+		self.clusters: Dict[int, ClusterSnapshot] = {}
+		self.capacities: Dict[int, ClusterCapacity] = {}
+		self.deployments: Dict[int, SimulatedDeployment] = {}
+		self.start: Optional[float] = None
+		self.now = 0.0
+		self._cluster_list: List[ClusterSnapshot] = []
+		self._pending: Dict[int, List[Tuple[int, int]]] = {}  # By cluster: sorted (-priority, id)
+		self._ids: Dict[Any, int] = {}  # Trace id -> SimulatedDeployment.id
+		self._completions: List[Tuple[float, int]] = []  # Heap of (time, id) of started deployments
+		self._next_id = 1
+		self._used = [0.0, 0.0, 0.0]
+		self._limits = [0.0, 0.0, 0.0]
+		self._used_area = [0.0, 0.0, 0.0]
+		self._limit_area = [0.0, 0.0, 0.0]
+		self.counts = Counter()
+		self.preemptions = Counter()
+		self.waits = array("d")
+		self.latencies = array("d")
+		self.wall_seconds = 0.0
+
+	def run(self, events: Iterable[Dict[str, Any]], drain: bool = True) -> Dict[str, Any]:
+		"""
+		Replay the events (in time order) and return the `report`. With `drain`,
+		deployments with a duration keep completing after the last event.
+		"""
+		handlers = {
+			"cluster": self.add_cluster,
+			"quota": self.set_quota,
+			"arrival": self.arrive,
+			"completion": self.complete,
+		}
+		wall = time.perf_counter()
+		for event in events:
+			handler = handlers.get(event.get("event"))
+			if handler is None:
+				raise ValueError(f"Unknown trace event: {event.get('event')!r}")
+			self._complete_until(event["time"])
+			handler(event)
+			self.counts["events"] += 1
+		if drain:
+			self._complete_until(float("inf"))
+		self.wall_seconds += time.perf_counter() - wall
+		return self.report()
+
+	def _advance(self, at: float):
+		if self.start is None:
+			self.start = self.now = at
+		elapsed = at - self.now
+		if elapsed > 0:
+			for i in range(3):
+				self._used_area[i] += self._used[i] * elapsed
+				self._limit_area[i] += self._limits[i] * elapsed
+			self.now = at
+
+	def _complete_until(self, at: float):
+		while self._completions and self._completions[0][0] <= at:
+			completes_at, deployment_id = heapq.heappop(self._completions)
+			record = self.deployments.get(deployment_id)
+			if record is None:  # Preempted or completed by the trace first
+				continue
+			self._advance(completes_at)
+			self._release(record, "completed")
+			self._schedule_pending(record.cluster_id)
+		if at != float("inf"):
+			self._advance(at)
+
+	def add_cluster(self, event: Dict[str, Any]):
+		cluster_id = int(event["id"])
+		if cluster_id in self.clusters:
+			raise ValueError(f"Cluster {cluster_id} is already defined.")
+		limits = tuple(float(event.get(f"{resource}_limit", 0)) for resource in RESOURCES)
+		cluster = ClusterSnapshot(cluster_id, event.get("organization_id"), limits, limits)
+		self.clusters[cluster_id] = cluster
+		self._cluster_list.append(cluster)
+		self.capacities[cluster_id] = ClusterCapacity(cluster_id, limits, limits)
+		self._pending[cluster_id] = []
+		for i in range(3):
+			self._limits[i] += limits[i]
+
+	def set_quota(self, event: Dict[str, Any]):
+		if isinstance(self.strategy, FairSharePreemptionStrategy):
+			self.strategy.set_quota(int(event["user_id"]), event.get("fair_share_quota"))
+
+	def arrive(self, event: Dict[str, Any]):
+		key = event["id"]
+		if key in self._ids:
+			raise ValueError(f"Deployment {key!r} arrived twice.")
+		deployment_in = DeploymentCreate(
+			name=str(key), docker_image=event.get("docker_image", ""),
+			cpu_required=event.get("cpu_required", 0), ram_required=event.get("ram_required", 0),
+			gpu_required=event.get("gpu_required", 0), priority=event.get("priority", 0),
+			cluster_id=event.get("cluster_id"), user_id=event.get("user_id")
+		)
+		duration = event.get("duration")
+		record = SimulatedDeployment(self._next_id, key, deployment_in,
+									 None if duration is None else float(duration), self.now)
+		self._next_id += 1
+		self.counts["arrived"] += 1
+
+		start = time.perf_counter()
+		cluster, schedule = self._decide(deployment_in)
+		self.latencies.append(time.perf_counter() - start)
+
+		if schedule is not None:
+			self._ids[key] = record.id
+			self.deployments[record.id] = record
+			self.counts["scheduled"] += 1
+			self._apply(record, cluster, schedule)
+		elif cluster is not None:
+			self._ids[key] = record.id
+			self.deployments[record.id] = record
+			self.counts["queued"] += 1
+			record.cluster_id = cluster.id
+			insort(self._pending[cluster.id], (-deployment_in.priority, record.id))
+		else:
+			self.counts["rejected"] += 1
+
+	def _decide(self, deployment_in: DeploymentCreate) -> Tuple[Optional[ClusterSnapshot], Optional[Dict[str, Any]]]:
+		"""
+		(cluster, schedule) of a feasible placement, else (cluster to queue on, None);
+		(None, None) means rejected. Mirrors DeploymentService.handle_deployment.
+		"""
+		if deployment_in.cluster_id is not None:
+			cluster = self.clusters.get(deployment_in.cluster_id)
+			if cluster is None:
+				return None, None
+			schedule = self._plan(None, cluster, deployment_in, self.capacities[cluster.id])
+			if schedule["feasible"]:
+				return cluster, schedule
+			return (cluster if PlacementPolicy.can_hold(cluster, deployment_in) else None), None
+
+		ranked = self.policy.rank(self._cluster_list, deployment_in)
+		for cluster in ranked[:settings.PLACEMENT_MAX_CANDIDATES]:
+			schedule = self._plan(None, cluster, deployment_in, self.capacities[cluster.id])
+			if schedule["feasible"]:
+				return cluster, schedule
+		return (ranked[0] if ranked else None), None
+
+	def _apply(self, record: SimulatedDeployment, cluster: ClusterSnapshot, schedule: Dict[str, Any]):
+		for victim in schedule["preempted_deployments"]:
+			self._release(self.deployments[victim.deployment_id], "preempted")
+		deployment_in = record.deployment_in
+		required = (deployment_in.cpu_required, deployment_in.ram_required, deployment_in.gpu_required)
+		cluster.cpu_available -= required[0]
+		cluster.ram_available -= required[1]
+		cluster.gpu_available -= required[2]
+		capacity = self.capacities[cluster.id]
+		capacity.add(IndexedDeployment(record.id, deployment_in.priority, *required, deployment_in.user_id))
+		capacity.set_available(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+		for i in range(3):
+			self._used[i] += required[i]
+
+		record.cluster_id = cluster.id
+		record.started = self.now
+		self.waits.append(self.now - record.arrived)
+		self.counts["started"] += 1
+		if record.duration is not None:
+			heapq.heappush(self._completions, (self.now + record.duration, record.id))
+
+	def _release(self, record: SimulatedDeployment, outcome: str):
+		"""Finish a deployment; a running one gives its resources back to its cluster."""
+		del self.deployments[record.id]
+		if self._ids.get(record.key) == record.id:
+			del self._ids[record.key]
+		self.counts[outcome] += 1
+		deployment_in = record.deployment_in
+		if outcome == "preempted":
+			self.preemptions[priority_class(deployment_in.priority)] += 1
+
+		if record.started is None:
+			queue = self._pending[record.cluster_id]
+			del queue[bisect_left(queue, (-deployment_in.priority, record.id))]
+			return
+		required = (deployment_in.cpu_required, deployment_in.ram_required, deployment_in.gpu_required)
+		cluster = self.clusters[record.cluster_id]
+		cluster.cpu_available += required[0]
+		cluster.ram_available += required[1]
+		cluster.gpu_available += required[2]
+		capacity = self.capacities[cluster.id]
+		capacity.remove(record.id)
+		capacity.set_available(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+		for i in range(3):
+			self._used[i] -= required[i]
+
+	def complete(self, event: Dict[str, Any]):
+		deployment_id = self._ids.get(event["id"])
+		if deployment_id is None:  # Rejected, preempted or already completed
+			self.counts["ignored_completions"] += 1
+			return
+		record = self.deployments[deployment_id]
+		if record.started is None:
+			self._release(record, "cancelled")
+			return
+		self._release(record, "completed")
+		self._schedule_pending(record.cluster_id)
+
+	def _schedule_pending(self, cluster_id: int):
+		"""Place the cluster's pending deployments that now fit, as DeploymentService.schedule_pending does."""
+		queue = self._pending[cluster_id]
+		if not queue:
+			return
+		cluster = self.clusters[cluster_id]
+		capacity = self.capacities[cluster_id]
+		for entry in queue[:self.pending_limit]:
+			record = self.deployments[entry[1]]
+			schedule = self._plan(None, cluster, record.deployment_in, capacity)
+			if not schedule["feasible"]:
+				continue
+			del queue[bisect_left(queue, entry)]
+			self._apply(record, cluster, schedule)
+
+	def report(self) -> Dict[str, Any]:
+		"""Outcome counts, time-weighted utilisation, wait times (seconds) and decision latency (ms)."""
+		counts = self.counts
+		span = self.now - self.start if self.start is not None else 0.0
+		deployments = {
+			outcome: counts[outcome]
+			for outcome in ("arrived", "scheduled", "queued", "rejected", "started", "completed", "preempted",
+							"cancelled", "ignored_completions")
+		}
+		deployments["running"] = sum(1 for record in self.deployments.values() if record.started is not None)
+		deployments["pending"] = sum(len(queue) for queue in self._pending.values())
+		return {
+			"strategy": self.strategy.name,
+			"placement_policy": self.policy.name,
+			"events": counts["events"],
+			"simulated_seconds": round(span, 3),
+			"wall_seconds": round(self.wall_seconds, 3),
+			"events_per_second": round(counts["events"] / self.wall_seconds) if self.wall_seconds else 0,
+			"deployments": deployments,
+			"utilisation": {
+				resource: round(used / limit, 4) if limit else 0.0
+				for resource, used, limit in zip(RESOURCES, self._used_area, self._limit_area)
+			},
+			"wait_seconds": _summary(self.waits),
+			"preemptions": {
+				"total": counts["preempted"],
+				"by_priority_class": dict(sorted(self.preemptions.items())),
+			},
+			"decision_latency_ms": _summary(self.latencies, scale=1000),
+		}
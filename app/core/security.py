@@ -1,5 +1,13 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
+from app.core.config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -19,3 +27,67 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
     """
     return pwd_context.hash(password)
+
+
+class PasswordHashingPool:
+    """
+    Dedicated, bounded executor for bcrypt work, so a burst of logins neither blocks
+    the event loop nor starves the shared threadpool used by other requests.
+
+    At most `workers` operations run at once and `max_queue` more may wait for a
+    worker; anything beyond that is rejected with 503 instead of queueing behind
+    the burst.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 executor_type: Optional[str] = None):
+        self.workers = settings.PASSWORD_HASH_WORKERS if workers is None else workers
+        self.max_queue = settings.PASSWORD_HASH_MAX_QUEUE if max_queue is None else max_queue
+        self.executor_type = executor_type or settings.PASSWORD_HASH_EXECUTOR
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many concurrent authentication requests. Please retry.",
+                    headers={"Retry-After": "1"}
+                )
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    def shutdown(self):
+        """Stop the workers; the pool is recreated on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hashing_pool = PasswordHashingPool()
@@ -0,0 +1,68 @@
+import secrets
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.session_store import SessionStore
+
+
+class ServerSessionMiddleware:
+    """
+    Session middleware keeping session data in a SessionStore. The cookie only
+    carries an opaque random id, so validating a session is one store lookup and
+    sessions can be revoked server-side. Same `request.session` interface as
+    Starlette's SessionMiddleware.
+
+    The id is rotated when the session's user changes (login), and the cookie's
+    Max-Age is refreshed on every response to follow the store's sliding expiry.
+    """
+
+    def __init__(self, app: ASGIApp, store: SessionStore, session_cookie: str = "session",
+                 max_age: Optional[int] = None, path: str = "/", same_site: str = "lax",
+                 https_only: bool = False):
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.max_age = store.max_age if max_age is None else max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        initial = await self.store.load(session_id) if session_id else None
+        if initial is None:
+            session_id = None
+        scope["session"] = dict(initial or {})
+        scope["session_store"] = self.store
+
+        async def send_wrapper(message: Message):
+            nonlocal session_id
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                headers = MutableHeaders(scope=message)
+                if session:
+                    if session_id is None or session.get("user_id") != initial.get("user_id"):
+                        if session_id is not None:
+                            await self.store.delete(session_id)
+                        session_id = secrets.token_urlsafe(32)
+                        await self.store.save(session_id, session)
+                    elif session != initial:
+                        await self.store.save(session_id, session)
+                    headers.append("Set-Cookie", f"{self.session_cookie}={session_id}; path={self.path}; "
+                                                 f"Max-Age={self.max_age}; {self.security_flags}")
+                elif session_id is not None:
+                    # The session has been cleared.
+                    await self.store.delete(session_id)
+                    headers.append("Set-Cookie", f"{self.session_cookie}=null; path={self.path}; "
+                                                 f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,199 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class SessionStore(ABC):
+    """
+    Abstract base class for server-side session storage. Sessions are keyed by an
+    opaque id and expire SESSION_MAX_AGE seconds after their last use.
+    """
+
+    def __init__(self, max_age: Optional[int] = None):
+        self.max_age = settings.SESSION_MAX_AGE if max_age is None else max_age
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the session data and extend its expiry, or None if it does not exist.
+        """
+        pass
+
+    @abstractmethod
+    async def save(self, session_id: str, data: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        pass
+
+    @abstractmethod
+    async def revoke_user(self, user_id: int) -> int:
+        """
+        Delete every session of a user. Returns the number of sessions removed.
+        """
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU store. Every session has the same lifetime and each use moves it
+    to the back, so the front of the map is always the next to expire: sweeping
+    pops expired sessions from the front, SESSION_SWEEP_BATCH_SIZE at a time, and
+    stops at the first live one.
+    """
+
+    def __init__(self, max_age: Optional[int] = None, max_size: Optional[int] = None,
+                 sweep_batch_size: Optional[int] = None):
+        super().__init__(max_age)
+        self.max_size = settings.SESSION_STORE_MAX_SIZE if max_size is None else max_size
+        self.sweep_batch_size = settings.SESSION_SWEEP_BATCH_SIZE if sweep_batch_size is None else sweep_batch_size
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._user_sessions: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._remove(session_id)
+                return None
+            self._sessions[session_id] = (now + self.max_age, entry[1])
+            self._sessions.move_to_end(session_id)
+            return dict(entry[1])
+
+    async def save(self, session_id: str, data: Dict[str, Any]):
+        now = time.monotonic()
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            if previous is not None:
+                self._unlink_user(session_id, previous[1])
+            self._sessions[session_id] = (now + self.max_age, dict(data))
+            self._sessions.move_to_end(session_id)
+            if data.get("user_id") is not None:
+                self._user_sessions.setdefault(data["user_id"], set()).add(session_id)
+            self._sweep(now)
+            while len(self._sessions) > self.max_size:
+                self._remove(next(iter(self._sessions)))
+
+    async def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    async def revoke_user(self, user_id: int) -> int:
+        with self._lock:
+            session_ids = list(self._user_sessions.get(user_id, ()))
+            for session_id in session_ids:
+                self._remove(session_id)
+            return len(session_ids)
+
+    def sweep(self) -> int:
+        """Remove up to one batch of expired sessions. Returns the number removed."""
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def _sweep(self, now: float) -> int:
+        removed = 0
+        while self._sessions and removed < self.sweep_batch_size:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            self._remove(session_id)
+            removed += 1
+        return removed
+
+    def _remove(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._unlink_user(session_id, entry[1])
+
+    def _unlink_user(self, session_id: str, data: Dict[str, Any]):
+        user_sessions = self._user_sessions.get(data.get("user_id"))
+        if user_sessions is not None:
+            user_sessions.discard(session_id)
+            if not user_sessions:
+                del self._user_sessions[data["user_id"]]
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store sessions in Redis (or anything speaking the same commands through an
+    asyncio client). Redis expires keys itself; GETEX slides the expiry on use. A
+    set per user tracks the user's sessions for bulk revocation.
+    """
+
+    def __init__(self, client=None, max_age: Optional[int] = None, prefix: str = "session:"):
+        super().__init__(max_age)
+        if client is None:
+            import redis.asyncio
+            client = redis.asyncio.Redis.from_url(settings.SESSION_REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.getex(self._key(session_id), ex=self.max_age)
+        return json.loads(raw) if raw is not None else None
+
+    async def save(self, session_id: str, data: Dict[str, Any]):
+        await self.client.set(self._key(session_id), json.dumps(data), ex=self.max_age)
+        if data.get("user_id") is not None:
+            user_key = self._user_key(data["user_id"])
+            await self.client.sadd(user_key, session_id)
+            await self.client.expire(user_key, self.max_age)
+
+    async def delete(self, session_id: str):
+        raw = await self.client.get(self._key(session_id))
+        await self.client.delete(self._key(session_id))
+        if raw is not None:
+            user_id = json.loads(raw).get("user_id")
+            if user_id is not None:
+                await self.client.srem(self._user_key(user_id), session_id)
+
+    async def revoke_user(self, user_id: int) -> int:
+        user_key = self._user_key(user_id)
+        session_ids = [
+            session_id.decode() if isinstance(session_id, bytes) else session_id
+            for session_id in await self.client.smembers(user_key)
+        ]
+        removed = await self.client.delete(*(self._key(session_id) for session_id in session_ids)) if session_ids else 0
+        await self.client.delete(user_key)
+        return removed
+
+
+class SessionStoreFactory:
+
+    @staticmethod
+    def get_session_store(backend: str) -> SessionStore:
+        """
+        Factory function to return the session store for a backend.
+
+        Args:
+            backend: The session backend (e.g., "memory", "redis").
+
+        Returns:
+            SessionStore instance.
+        """
+        stores = {
+            "memory": MemorySessionStore,
+            "redis": RedisSessionStore,
+        }
+        store_class = stores.get(backend, MemorySessionStore)
+        return store_class()
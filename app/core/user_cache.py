@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class UserSnapshot:
+    """
+    Detached copy of the authenticated user. Has the same attributes as the `User`
+    model that request handlers read, without being bound to a session.
+    """
+
+    __slots__ = ("id", "username", "email", "is_active", "organization_id")
+
+    def __init__(self, user_id: int, username: str, email: Optional[str], is_active: bool,
+                 organization_id: Optional[int]):
+        self.id = user_id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        self.organization_id = organization_id
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.username, user.email, user.is_active, user.organization_id)
+
+    def __repr__(self):
+        return f"<UserSnapshot(id={self.id}, username={self.username}, organization_id={self.organization_id})>"
+
+
+class UserCache:
+    """
+    Process-wide TTL + LRU cache of authenticated users keyed by the session's
+    user_id, so authenticated requests skip the user lookup.
+
+    Entries expire after USER_CACHE_TTL_SECONDS, which bounds how long a change
+    made by another worker stays invisible; changes made here invalidate the
+    entry directly. The least recently used entry is evicted beyond
+    USER_CACHE_MAX_SIZE.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl_seconds = settings.USER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_size = settings.USER_CACHE_MAX_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: User) -> UserSnapshot:
+        snapshot = UserSnapshot.from_user(user)
+        if self.max_size <= 0:
+            return snapshot
+        with self._lock:
+            self._entries[snapshot.id] = (time.monotonic(), snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+user_cache = UserCache()
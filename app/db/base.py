@@ -2,6 +2,7 @@
 from app.db.base_class import Base
 from app.models.cluster import Cluster  # noqa
 from app.models.deployment import Deployment  # noqa
+from app.models.deployment_dependency import DeploymentDependency  # noqa
 from app.models.organization import Organization  # noqa
 # Import all models here for Alembic
 from app.models.user import User  # noqa
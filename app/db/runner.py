@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+
+class SessionRunner(ABC):
+    """
+    Runs database work for a request without blocking the event loop. The work is
+    a plain function taking a synchronous `Session` as its first argument, so the
+    service layer is shared between the sync and the async database stack.
+    """
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        pass
+
+    @abstractmethod
+    async def offload(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Like `run`, for CPU-heavy work such as scheduling: always runs off the event loop."""
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+
+class SyncSessionRunner(SessionRunner):
+    """Run the work on the threadpool with a blocking `Session`."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def offload(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.run(fn, *args, **kwargs)
+
+    async def close(self):
+        self.session.close()
+
+
+class AsyncSessionRunner(SessionRunner):
+    """
+    Run the work through `AsyncSession.run_sync`: the function executes on the event
+    loop and every database round-trip is awaited on the async driver, so one worker
+    overlaps the I/O of many requests.
+
+    `offload` cannot go through `run_sync`, whose greenlet is bound to the loop, so it
+    runs the work on the threadpool with a blocking `Session` from
+    `sync_session_factory`, opened on first use and kept until `close` so returned
+    objects stay loadable; the placement and preemption search then never stalls the
+    other requests on the loop.
+    """
+
+    def __init__(self, session: AsyncSession, sync_session_factory: sessionmaker):
+        self.session = session
+        self.sync_session_factory = sync_session_factory
+        self.sync_session: Optional[Session] = None
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    async def offload(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if self.sync_session is None:
+            self.sync_session = self.sync_session_factory()
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await self.session.close()
+        if self.sync_session is not None:
+            self.sync_session.close()
@@ -1,7 +1,102 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import record_commit, record_statement
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_statement(time.perf_counter() - conn.info["query_start_time"].pop())
+
+
+def _handle_error(exception_context):
+    start_times = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if start_times:
+        record_statement(time.perf_counter() - start_times.pop())
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Attribute SQL statements, their time and commits to the request being served."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "commit", lambda conn: record_commit())
+    return engine
+
+
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """The application's engine, created on first use so importing the app neither loads the driver nor connects."""
+    global _engine
+    if _engine is None:
+        _engine = instrument_engine(create_engine(settings.DATABASE_URL, pool_pre_ping=True))
+    return _engine
+
+
+def __getattr__(name: str):
+    # `engine` is resolved lazily for code importing it from this module
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySessionMaker(sessionmaker):
+    """Session factory bound to the application's engine when the first session is created."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = LazySessionMaker(autocommit=False, autoflush=False)
+
+
+def warm_up_pool(connections: int):
+    """Open `connections` pooled connections up front so the first requests do not pay for connecting."""
+    opened = [get_engine().connect() for _ in range(connections)]
+    for connection in opened:
+        connection.close()
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a database URL to use the async driver of its dialect."""
+    scheme, separator, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def create_async_session_factory(url: str) -> async_sessionmaker:
+    async_engine = create_async_engine(url, pool_pre_ping=True)
+    instrument_engine(async_engine.sync_engine)
+    # Responses are serialized outside the session, where expired attributes cannot be reloaded
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_async_session_factory() -> async_sessionmaker:
+    """Async session factory, created on first use so the async drivers stay optional."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = create_async_session_factory(
+            settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+        )
+    return _async_session_factory
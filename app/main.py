@@ -1,17 +1,58 @@
-import sys
+import logging
+from contextlib import asynccontextmanager
 
-print(sys.path)
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.v1.api import api_router
 from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.deps import require_admin
+from app.core.metrics import RequestMetricsMiddleware, metrics
+from app.core.scheduling.cluster_index import cluster_index
+from app.core.scheduling.dependency_graph import dependency_graph
+from app.core.security import password_hashing_pool
+from app.core.session_middleware import ServerSessionMiddleware
+from app.core.session_store import SessionStoreFactory
+from app.core.user_cache import user_cache
+from app.db.session import SessionLocal, warm_up_pool
+from app.service.pending_scheduler import pending_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """
+    Fill the connection pool and prime the cluster index and dependency graph
+    before serving. The schema is managed by migrations (`alembic upgrade
+    head`), not created here.
+    """
+    try:
+        warm_up_pool(settings.DATABASE_POOL_WARMUP)
+        if settings.PRIME_CACHES_ON_STARTUP:
+            db = SessionLocal()
+            try:
+                cluster_index.prime(db)
+                dependency_graph.load(db)
+            finally:
+                db.close()
+    except Exception:
+        # Requests connect on demand; a database that is not up yet must not keep the app from starting
+        logger.exception("Startup warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(warm_up)
+    # Place queued deployments in the background as capacity frees up
+    if settings.PENDING_SCHEDULER_ENABLED:
+        pending_scheduler.start()
+    yield
+    await pending_scheduler.stop()
+    password_hashing_pool.shutdown()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Cluster Management API",
@@ -50,6 +91,9 @@ app = FastAPI(
     1. Available resources in the cluster
     2. Deployment priority
     3. Resource requirements
+
+    Deployments that cannot be placed yet are kept as `pending` and scheduled
+    in the background once capacity is freed.
     """,
     version="1.0.0",
     openapi_tags=[
@@ -71,7 +115,8 @@ app = FastAPI(
         }
     ],
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS and Session
@@ -83,12 +128,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.SECRET_KEY,
-    session_cookie=settings.SESSION_COOKIE_NAME,
-    max_age=settings.SESSION_MAX_AGE
-)
+if settings.SESSION_BACKEND == "cookie":
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.SECRET_KEY,
+        session_cookie=settings.SESSION_COOKIE_NAME,
+        max_age=settings.SESSION_MAX_AGE
+    )
+else:
+    if settings.SESSION_BACKEND == "memory" and settings.WEB_CONCURRENCY > 1:
+        # Every worker would keep its own sessions, logging users out at random
+        raise RuntimeError("SESSION_BACKEND=memory only works with a single worker; use cookie or redis")
+    app.add_middleware(
+        ServerSessionMiddleware,
+        store=SessionStoreFactory.get_session_store(settings.SESSION_BACKEND),
+        session_cookie=settings.SESSION_COOKIE_NAME,
+        max_age=settings.SESSION_MAX_AGE
+    )
+
+# Added last so it also times the session and CORS middlewares
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware, server_timing=settings.SERVER_TIMING_HEADER)
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -97,6 +157,17 @@ app.include_router(api_router, prefix="/api/v1")
 async def health_check():
     return {"status": "healthy"}
 
+# Operational data (user counts, routes, timings) is for operators only
+@app.get("/health/caches", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    """Hit/miss counters of the in-process caches."""
+    return {"user_cache": user_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def prometheus_metrics():
+    """Request and scheduler metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -8,7 +8,7 @@ from app.db.base_class import Base
 class Cluster(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    organization_id = Column(Integer, ForeignKey("organization.id"))
+    organization_id = Column(Integer, ForeignKey("organization.id"), index=True)
     
     # Resource limits
     cpu_limit = Column(Float)
@@ -19,11 +19,16 @@ class Cluster(Base):
     cpu_available = Column(Float)
     ram_available = Column(Float)
     gpu_available = Column(Float)
+
+    # Bumped on every update; concurrent read-modify-write of the resources fails with StaleDataError
+    version = Column(Integer, nullable=False)
     
     # Relationships
     organization = relationship("Organization", back_populates="clusters")
     deployments = relationship("Deployment", back_populates="cluster")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Cluster(name={self.name}, cpu_limit={self.cpu_limit}, ram_limit={self.ram_limit}, gpu_limit={self.gpu_limit})>"
 
@@ -1,16 +1,25 @@
 import enum
 
-from sqlalchemy import Column, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Enum, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 
 class DeploymentStatus(enum.Enum):
+    BLOCKED = "blocked"
     PENDING = "pending"
     RUNNING = "running"
     FAILED = "failed"
     COMPLETED = "completed"
+    PREEMPTED = "preempted"
+
+# Deployments in these states hold resources on their cluster. Pending
+# deployments are queued until the scheduler can place them; blocked ones wait
+# for the deployments they depend on to complete before they are queued.
+ACTIVE_STATUSES = (DeploymentStatus.RUNNING,)
+# Deployments in these states are finished and cannot change status again.
+FINAL_STATUSES = (DeploymentStatus.COMPLETED, DeploymentStatus.FAILED, DeploymentStatus.PREEMPTED)
 
 class Deployment(Base):
     id = Column(Integer, primary_key=True, index=True)
@@ -18,7 +27,11 @@ class Deployment(Base):
     cluster_id = Column(Integer, ForeignKey("cluster.id"))
     docker_image = Column(String)
     status = Column(Enum(DeploymentStatus))
-    priority = Column(Integer, default=0)
+    priority = Column(Integer, default=0, nullable=False)
+    # Replicas of a gang share a gang_id and are admitted, queued and preempted together
+    gang_id = Column(String, index=True, nullable=True)
+    # Submitting user; the tenant fair share scheduling accounts the deployment to
+    user_id = Column(Integer, ForeignKey("user.id"), index=True, nullable=True)
     
     # Resource requirements
     cpu_required = Column(Float)
@@ -28,6 +41,11 @@ class Deployment(Base):
     # Relationships
     cluster = relationship("Cluster", back_populates="deployments")
 
+    __table_args__ = (
+        # Backs per-cluster lookups by status (scheduling, listing filters) ordered by priority
+        Index("ix_deployment_cluster_status_priority", "cluster_id", "status", "priority"),
+    )
+
     def is_sufficient_resources(self):
         return (
                 self.cluster.cpu_available >= self.cpu_required and
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, ForeignKey, Integer
+
+from app.db.base_class import Base
+
+
+class DeploymentDependency(Base):
+    """An edge of the deployment DAG: `deployment_id` may only start once `depends_on_id` has completed."""
+    deployment_id = Column(Integer, ForeignKey("deployment.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id = Column(Integer, ForeignKey("deployment.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Float, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -8,6 +8,8 @@ class Organization(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     invite_code = Column(String, unique=True, index=True)
+    # Default largest dominant share of a cluster each member may hold (fair_share strategy); None is unlimited
+    fair_share_quota = Column(Float, nullable=True)
     
     # Relationships
     users = relationship("User", back_populates="organization")
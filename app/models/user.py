@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -11,6 +11,8 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     organization_id = Column(Integer, ForeignKey("organization.id"))
+    # Largest dominant share of a cluster the user may hold; overrides the organization's
+    fair_share_quota = Column(Float, nullable=True)
     
     # Relationships
     organization = relationship("Organization", back_populates="users")
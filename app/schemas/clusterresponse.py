@@ -15,12 +15,20 @@ class ClusterCreate(ClusterBase):
 class ClusterUpdate(ClusterBase):
     pass
 
+class ClusterUtilisation(BaseModel):
+    running_deployments: int
+    pending_deployments: int
+    cpu_percent: float
+    ram_percent: float
+    gpu_percent: float
+
 class ClusterResponse(ClusterBase):
     id: int
     organization_id: int
     cpu_available: float
     ram_available: float
     gpu_available: float
+    utilisation: Optional[ClusterUtilisation] = None  # Only with include=utilisation
 
     class Config:
         from_attributes = True
\ No newline at end of file
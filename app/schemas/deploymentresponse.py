@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 
 from app.models.deployment import DeploymentStatus
 
@@ -14,7 +15,12 @@ class DeploymentBase(BaseModel):
     priority: int = 0
 
 class DeploymentCreate(DeploymentBase):
-    cluster_id: int
+    cluster_id: Optional[int] = None  # Chosen by the scheduler when omitted
+    depends_on: List[int] = []  # Deployments that must complete before this one starts
+    user_id: SkipJsonSchema[Optional[int]] = None  # Owner; always set by the service from the authenticated user
+
+class DeploymentDependenciesUpdate(BaseModel):
+    depends_on: List[int] = Field(min_length=1)
 
 class DeploymentUpdate(DeploymentBase):
     pass
@@ -23,6 +29,64 @@ class DeploymentResponse(DeploymentBase):
     id: int
     cluster_id: int
     status: DeploymentStatus
+    gang_id: Optional[str] = None
+    user_id: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PlannedPreemption(BaseModel):
+    id: int
+    priority: int
+    cpu_required: float
+    ram_required: float
+    gpu_required: float
+
+class RemainingResources(BaseModel):
+    cpu: float
+    ram: float
+    gpu: float
+
+class FairnessReport(BaseModel):
+    user_id: Optional[int] = None
+    quota: Optional[float] = None
+    dominant_share_before: float
+    dominant_share_after: float
+    victim_dominant_shares: Dict[int, float] = {}  # By user id; 0 for deployments without an owner
+    tenants: int
+
+class DeploymentPlanResponse(BaseModel):
+    cluster_id: Optional[int] = None
+    feasible: bool
+    preempted_deployments: List[PlannedPreemption]
+    remaining_resources: Optional[RemainingResources] = None
+    fairness: Optional[FairnessReport] = None  # Only from the fair_share strategy
+
+class DeploymentBatchItemResult(BaseModel):
+    index: int
+    status: str
+    deployment: Optional[DeploymentResponse] = None
+    preempted_deployment_ids: List[int] = []
+    status_code: Optional[int] = None
+    detail: Optional[str] = None
+
+class DeploymentBatchResponse(BaseModel):
+    scheduled: int
+    queued: int
+    rejected: int
+    results: List[DeploymentBatchItemResult]
+
+class GangDeploymentCreate(DeploymentBase):
+    """A job of `replicas` identical deployments (resources are per replica), placed all-or-nothing."""
+    replicas: int = Field(ge=1)
+    cluster_ids: Optional[List[int]] = None  # Clusters the replicas may use; all of the organization's by default
+
+class GangDeploymentResponse(BaseModel):
+    gang_id: str
+    status: str
+    deployments: List[DeploymentResponse]
+    preempted_deployment_ids: List[int] = []
+
+class DeploymentReleaseResponse(BaseModel):
+    deployment: DeploymentResponse
+    scheduled: List[DeploymentResponse]
@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing_extensions import Annotated
+
+Quota = Annotated[float, Field(gt=0, le=1)]
 
 
 class OrganizationBase(BaseModel):
@@ -19,7 +22,16 @@ class OrganizationUpdate(OrganizationBase):
 class OrganizationResponse(OrganizationBase):
     id: int
     invite_code: str
+    fair_share_quota: Optional[float] = None
 
     class Config:
         from_attributes = True
 
+class FairShareQuotas(BaseModel):
+    """
+    Largest dominant share of a cluster (0 to 1) a member may hold under the
+    fair_share strategy: the organization's default and per-user overrides, by
+    user id. None removes a limit.
+    """
+    fair_share_quota: Optional[Quota] = None
+    user_quotas: Dict[int, Optional[Quota]] = {}
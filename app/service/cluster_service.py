@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.cluster import Cluster
+from app.models.deployment import Deployment, DeploymentStatus
+
+
+def _percent(used: float, limit: float) -> float:
+    return round(100.0 * used / limit, 2) if limit else 0.0
+
+
+class ClusterService:
+
+    def __init__(self, db: Session, current_user):
+        self.db = db
+        self.current_user = current_user
+
+    def list_clusters(self, cursor: Optional[str] = None, limit: Optional[int] = None,
+                      include_utilisation: bool = False) -> Tuple[List[Tuple[Cluster, Optional[Dict]]], Optional[str]]:
+        """
+        The organization's clusters ordered by id. Only paged, with keyset
+        pagination, when a `limit` or `cursor` is given, so that clients unaware of
+        pages still get every cluster. With `include_utilisation` every cluster comes with its running/pending
+        deployment counts and resource utilisation, aggregated in the same query.
+        Returns ([(cluster, utilisation)], next_cursor).
+        """
+        if not self.current_user.organization_id:
+            raise HTTPException(status_code=400, detail="User must belong to an organization to view clusters.")
+        paged = limit is not None or cursor is not None
+        limit = min(limit or settings.CLUSTER_PAGE_SIZE, settings.CLUSTER_PAGE_MAX_SIZE)
+        position = decode_cursor(cursor, "id")
+
+        if include_utilisation:
+            running = Deployment.status == DeploymentStatus.RUNNING
+            query = self.db.query(
+                Cluster,
+                func.count(case((running, Deployment.id))),
+                func.count(case((Deployment.status == DeploymentStatus.PENDING, Deployment.id))),
+                func.coalesce(func.sum(case((running, Deployment.cpu_required))), 0),
+                func.coalesce(func.sum(case((running, Deployment.ram_required))), 0),
+                func.coalesce(func.sum(case((running, Deployment.gpu_required))), 0)
+            ).outerjoin(Deployment, Deployment.cluster_id == Cluster.id).group_by(Cluster.id)
+        else:
+            query = self.db.query(Cluster)
+        query = query.filter(Cluster.organization_id == self.current_user.organization_id)
+        if position is not None:
+            query = query.filter(Cluster.id > position["id"])
+        query = query.order_by(Cluster.id)
+        rows = query.limit(limit + 1).all() if paged else query.all()
+
+        next_cursor = None
+        if paged and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"id": (rows[-1][0] if include_utilisation else rows[-1]).id})
+
+        if not include_utilisation:
+            return [(cluster, None) for cluster in rows], next_cursor
+        return [
+            (cluster, {
+                "running_deployments": running_count,
+                "pending_deployments": pending_count,
+                "cpu_percent": _percent(cpu_used, cluster.cpu_limit),
+                "ram_percent": _percent(ram_used, cluster.ram_limit),
+                "gpu_percent": _percent(gpu_used, cluster.gpu_limit)
+            })
+            for cluster, running_count, pending_count, cpu_used, ram_used, gpu_used in rows
+        ], next_cursor
@@ -1,12 +1,69 @@
-from typing import Type
+import asyncio
+import functools
+import logging
+import random
+import time
+import uuid
+from collections import Counter
+from itertools import islice
+from typing import List, Optional, Set, Type
 
 from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.util.concurrency import await_only, in_greenlet
 
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.scheduling.capacity_index import capacity_index
+from app.core.scheduling.cluster_index import cluster_index
+from app.core.scheduling.dependency_graph import dependency_graph
+from app.core.scheduling.metrics import (pending_deployments,
+                                         record_free_capacity,
+                                         record_placements, record_queued)
+from app.core.scheduling.placement_factory import PlacementPolicyFactory
+from app.core.scheduling.placement_policy import PlacementPolicy
 from app.core.scheduling.preemption_factory import PreemptionSchedulingFactory
+from app.core.scheduling.preemption_strategy import PreemptionStrategy
 from app.models.cluster import Cluster
-from app.models.deployment import Deployment, DeploymentStatus
-from app.schemas.deploymentresponse import DeploymentCreate
+from app.models.deployment import (ACTIVE_STATUSES, FINAL_STATUSES, Deployment,
+                                   DeploymentStatus)
+from app.models.deployment_dependency import DeploymentDependency
+from app.schemas.deploymentresponse import (DeploymentCreate,
+                                            GangDeploymentCreate)
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(seconds: float):
+    """Sleep between retries; under AsyncSession.run_sync this yields to the event loop instead of blocking it."""
+    if in_greenlet():
+        await_only(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
+def retry_on_conflict(method):
+    """
+    Re-run a DeploymentService operation when a concurrent update of a cluster row
+    is detected (the row's version changed between read and write). Retries use a
+    jittered exponential backoff; once CLUSTER_UPDATE_MAX_RETRIES is exhausted the
+    request fails with 409.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(settings.CLUSTER_UPDATE_MAX_RETRIES + 1):
+            try:
+                return method(self, *args, **kwargs)
+            except StaleDataError:
+                self.rollback()
+                if attempt == settings.CLUSTER_UPDATE_MAX_RETRIES:
+                    break
+                delay = settings.CLUSTER_UPDATE_RETRY_BACKOFF_MS * (2 ** attempt) * random.uniform(0.5, 1.5)
+                backoff(delay / 1000.0)
+        raise HTTPException(status_code=409, detail="Cluster was modified concurrently. Please retry.")
+    return wrapper
 
 
 class DeploymentService:
@@ -14,49 +71,222 @@ class DeploymentService:
     def __init__(self, db: Session, current_user):
         self.db = db
         self.current_user = current_user
+        # Deployments preempted on clusters other than the one being scheduled on
+        # (other replicas of a preempted gang), by cluster id, until committed
+        self.released_elsewhere = {}
+        # Deployments the dependency graph forgets once the transaction failing them commits
+        self.discarded = []
+        # Clusters a committed transaction freed capacity on or queued deployments for,
+        # for the caller to hand to the pending scheduler
+        self.retry_clusters: Set[int] = set()
+
+    def rollback(self):
+        self.db.rollback()
+        self.released_elsewhere = {}
+        self.discarded = []
 
-    def get_cluster(self, cluster_id: int):
-        """Fetch the cluster from the database."""
-        cluster = self.db.query(Cluster).filter(Cluster.id == cluster_id).first()
+    def get_cluster(self, cluster_id: int, for_update: bool = False):
+        """Fetch the cluster from the database, row-locked if requested and CLUSTER_ROW_LOCKING is on."""
+        query = self.db.query(Cluster).filter(Cluster.id == cluster_id)
+        if for_update and settings.CLUSTER_ROW_LOCKING:
+            query = query.with_for_update()
+        cluster = query.first()
         if not cluster:
             raise HTTPException(status_code=404, detail=f"Cluster with id {cluster_id} not found.")
         return cluster
 
+    def get_deployment(self, deployment_id: int) -> Deployment:
+        """Fetch the deployment from the database."""
+        deployment = self.db.query(Deployment).filter(Deployment.id == deployment_id).first()
+        if not deployment:
+            raise HTTPException(status_code=404, detail=f"Deployment with id {deployment_id} not found.")
+        return deployment
+
+    def list_deployments(self, status: Optional[DeploymentStatus] = None, cluster_id: Optional[int] = None,
+                         min_priority: Optional[int] = None, max_priority: Optional[int] = None,
+                         docker_image: Optional[str] = None, sort: str = "id", cursor: Optional[str] = None,
+                         limit: Optional[int] = None):
+        """
+        The deployments of the user's organization, ordered by id or by priority
+        (highest first). Only paged, with
+        keyset pagination, when a `limit` or `cursor` is given, so that clients
+        unaware of pages still get every deployment. Returns (deployments, next_cursor).
+        """
+        if sort not in ("id", "priority"):
+            raise HTTPException(status_code=400, detail="sort must be one of: id, priority.")
+        paged = limit is not None or cursor is not None
+        limit = min(limit or settings.DEPLOYMENT_PAGE_SIZE, settings.DEPLOYMENT_PAGE_MAX_SIZE)
+        position = decode_cursor(cursor, *(("priority", "id") if sort == "priority" else ("id",)))
+
+        query = self.db.query(Deployment).join(Cluster, Deployment.cluster_id == Cluster.id).filter(
+            Cluster.organization_id == self.current_user.organization_id
+        )
+        filters = []
+        if status is not None:
+            filters.append(Deployment.status == status)
+        if cluster_id is not None:
+            filters.append(Deployment.cluster_id == cluster_id)
+        if min_priority is not None:
+            filters.append(Deployment.priority >= min_priority)
+        if max_priority is not None:
+            filters.append(Deployment.priority <= max_priority)
+        if docker_image is not None:
+            filters.append(Deployment.docker_image == docker_image)
+        query = query.filter(*filters)
+
+        if sort == "priority":
+            # priority is NOT NULL (0005), so no row falls outside these comparisons
+            if position is not None:
+                query = query.filter(or_(
+                    Deployment.priority < position["priority"],
+                    and_(Deployment.priority == position["priority"], Deployment.id > position["id"])
+                ))
+            query = query.order_by(Deployment.priority.desc(), Deployment.id)
+        else:
+            if position is not None:
+                query = query.filter(Deployment.id > position["id"])
+            query = query.order_by(Deployment.id)
+
+        deployments = query.limit(limit + 1).all() if paged else query.all()
+        if not deployments and position is None and not filters:
+            if not self.db.query(Cluster.id).filter(Cluster.organization_id == self.current_user.organization_id).first():
+                raise HTTPException(status_code=404, detail="No clusters found for the user's organization.")
+            raise HTTPException(status_code=404, detail="No deployments found for the user's organization.")
+
+        next_cursor = None
+        if paged and len(deployments) > limit:
+            deployments = deployments[:limit]
+            last = deployments[-1]
+            next_cursor = encode_cursor({"priority": last.priority, "id": last.id} if sort == "priority" else {"id": last.id})
+        return deployments, next_cursor
+
     def check_user_permission(self, cluster: Type[Cluster]):
         """Ensure the user belongs to the same organization as the cluster."""
         if cluster.organization_id != self.current_user.organization_id:
             raise HTTPException(status_code=403, detail="User does not belong to the organization of the selected cluster.")
 
+    def owned(self, deployment_in: DeploymentCreate) -> DeploymentCreate:
+        """Attribute a submitted deployment to the requesting user, whatever the request body said."""
+        deployment_in.user_id = self.current_user.id
+        return deployment_in
+
     def get_preemption_schedule(self, preemption_strategy: str, cluster: Type[Cluster], deployment_in: DeploymentCreate):
         """Get the preemption schedule based on the selected strategy."""
         strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
         return strategy.preempt(db=self.db, cluster=cluster, deployment_in=deployment_in)
 
-    def apply_preemption(self, schedule: dict, cluster: Type[Cluster]):
-        """Preempt low priority deployments and update cluster resources."""
-        for preempted_deployment in schedule["preempted_deployments"]:
-            preempted_deployment.status = "Preempted"
-            cluster.cpu_available += preempted_deployment.cpu_required
-            cluster.ram_available += preempted_deployment.ram_required
-            cluster.gpu_available += preempted_deployment.gpu_required
-            self.db.commit()
+    def choose_cluster(self, deployment_in: DeploymentCreate, strategy: PreemptionStrategy, placement_policy: str,
+                       candidates: Optional[List[Cluster]] = None, capacity_for=None, allow_preemption: bool = True,
+                       engine=None):
+        """
+        Pick a cluster of the user's organization for a deployment submitted without
+        a cluster_id. Clusters are ranked by the placement policy using the in-memory
+        cluster index, then the best few are re-read and planned on until one is
+        feasible. Without `allow_preemption` only clusters it fits on as they are
+        qualify. A ScoringEngine over the candidates, kept up to date by the caller,
+        ranks them instead of the policy. Read only; returns (cluster, schedule).
+        """
+        policy = PlacementPolicyFactory.get_placement_policy(placement_policy)
+        if candidates is None:
+            organization_id = self.current_user.organization_id
+            if not organization_id:
+                raise HTTPException(status_code=400, detail="User must belong to an organization to schedule deployments.")
+            ranked = policy.rank(cluster_index.clusters(self.db, organization_id), deployment_in)
+            ranked_ids = [snapshot.id for snapshot in ranked[:settings.PLACEMENT_MAX_CANDIDATES]]
+            candidates = self.db.query(Cluster).filter(Cluster.id.in_(ranked_ids)).all() if ranked_ids else []
+            for cluster in candidates:
+                cluster_index.update(cluster)
+
+        if engine is not None:
+            ranked = engine.rank(policy.name, deployment_in, limit=settings.PLACEMENT_MAX_CANDIDATES)
+        else:
+            ranked = policy.rank(candidates, deployment_in)[:settings.PLACEMENT_MAX_CANDIDATES]
+        for cluster in ranked:
+            capacity = capacity_for(cluster) if capacity_for is not None else None
+            schedule = strategy.plan(self.db, cluster, deployment_in, capacity)
+            if schedule["feasible"] and (allow_preemption or not schedule["preempted_deployments"]):
+                return cluster, schedule
+
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Unable to place the deployment on any cluster of the organization. "
+                f"Requested: CPU={deployment_in.cpu_required}, RAM={deployment_in.ram_required}, GPU={deployment_in.gpu_required}."
+            )
+        )
+
+    def plan_deployment(self, deployment_in: DeploymentCreate, preemption_strategy: str, cluster_id: Optional[int],
+                        placement_policy: str = "best_fit"):
+        """Compute the schedule for a deployment without changing anything."""
+        deployment_in = self.owned(deployment_in)
+        strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+        if cluster_id is None:
+            try:
+                _, schedule = self.choose_cluster(deployment_in, strategy, placement_policy)
+            except HTTPException as exc:
+                if exc.status_code != 400:
+                    raise
+                return None
+            return schedule
+
+        cluster = self.get_cluster(cluster_id)
+        self.check_user_permission(cluster)
+        return strategy.plan(db=self.db, cluster=cluster, deployment_in=deployment_in)
+
+    def apply_preemption(self, schedule: dict, cluster: Type[Cluster]) -> List[Deployment]:
+        """
+        Preempt the planned victims and release their resources on the cluster.
+        A victim that is a gang replica takes the rest of its gang with it, on
+        whichever cluster each replica runs. Returns every preempted deployment.
+        """
+        victim_ids = [victim.deployment_id for victim in schedule["preempted_deployments"]]
+        if not victim_ids:
+            return []
+
+        victims = self.db.query(Deployment).filter(Deployment.id.in_(victim_ids)).all()
+        if len(victims) != len(victim_ids) or any(victim.status not in ACTIVE_STATUSES for victim in victims):
+            capacity_index.invalidate(cluster.id)
+            raise HTTPException(status_code=409, detail="Cluster state changed while scheduling. Please retry.")
+
+        gang_ids = {victim.gang_id for victim in victims if victim.gang_id}
+        if gang_ids:
+            victims += self.db.query(Deployment).filter(
+                Deployment.gang_id.in_(gang_ids),
+                Deployment.status.in_(ACTIVE_STATUSES),
+                Deployment.id.notin_(victim_ids)
+            ).all()
 
-    def create_new_deployment(self, deployment_in: DeploymentCreate, cluster) -> Deployment:
-        """Create and return a new deployment."""
+        for preempted_deployment in victims:
+            preempted_deployment.status = DeploymentStatus.PREEMPTED.name
+            owner = cluster
+            if preempted_deployment.cluster_id != cluster.id:
+                owner = self.get_cluster(preempted_deployment.cluster_id, for_update=True)
+                self.released_elsewhere.setdefault(owner.id, []).append(preempted_deployment.id)
+            owner.cpu_available += preempted_deployment.cpu_required
+            owner.ram_available += preempted_deployment.ram_required
+            owner.gpu_available += preempted_deployment.gpu_required
+        self.fail_dependents([victim.id for victim in victims])
+        return victims
+
+    def create_new_deployment(self, deployment_in: DeploymentCreate, cluster,
+                              status: DeploymentStatus = DeploymentStatus.RUNNING,
+                              gang_id: Optional[str] = None) -> Deployment:
+        """Create and return a new deployment (flushed, not committed)."""
         deployment = Deployment(
             name=deployment_in.name,
             cpu_required=deployment_in.cpu_required,
             ram_required=deployment_in.ram_required,
             gpu_required=deployment_in.gpu_required,
             cluster_id=cluster.id,
-            status=DeploymentStatus.PENDING.name,
+            status=status.name,
             priority=deployment_in.priority,
-            docker_image=deployment_in.docker_image
+            docker_image=deployment_in.docker_image,
+            gang_id=gang_id,
+            user_id=getattr(deployment_in, "user_id", None)
         )
 
         self.db.add(deployment)
-        self.db.commit()
-        self.db.refresh(deployment)
+        self.db.flush()
         return deployment
 
     def update_cluster_resources(self, deployment: Deployment, cluster: Type[Cluster]):
@@ -65,19 +295,714 @@ class DeploymentService:
         cluster.ram_available -= deployment.ram_required
         cluster.gpu_available -= deployment.gpu_required
 
-    def handle_deployment(self, deployment_in: DeploymentCreate, preemption_strategy: str, cluster_id: int):
-        """Main method to handle the entire deployment process."""
-        cluster = self.get_cluster(cluster_id)
-        self.check_user_permission(cluster)
-
-        schedule = self.get_preemption_schedule(preemption_strategy, cluster, deployment_in)
-        self.apply_preemption(schedule, cluster)
-
+    def stage_schedule(self, schedule: dict, cluster: Type[Cluster], deployment_in: DeploymentCreate):
+        """Apply a schedule to the session without committing; returns (deployment, victims)."""
+        victims = self.apply_preemption(schedule, cluster)
         deployment = self.create_new_deployment(deployment_in, cluster)
         self.update_cluster_resources(deployment, cluster)
+        return deployment, victims
+
+    def apply_schedule(self, schedule: dict, cluster: Type[Cluster], deployment_in: DeploymentCreate) -> Deployment:
+        """Commit a schedule: preempt its victims and place the new deployment in one transaction."""
+        try:
+            deployment, victims = self.stage_schedule(schedule, cluster, deployment_in)
+            cluster_id = cluster.id
+            available = (cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+            released_ids = [victim.id for victim in victims]
+            preempted_priorities = [victim.priority for victim in victims]
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
 
-        self.db.add(deployment)
-        self.db.commit()
         self.db.refresh(deployment)
+        self.record_committed(cluster_id, available, admitted=[deployment], released_ids=released_ids)
+        self.record_released_elsewhere()
+        record_placements([preempted_priorities])
+        return deployment
+
+    @staticmethod
+    def record_committed(cluster_id: int, available, admitted: List[Deployment] = (), released_ids: List[int] = ()):
+        """Propagate committed scheduling changes to the in-memory indexes."""
+        capacity_index.record(cluster_id, available, admitted=admitted, released_ids=released_ids)
+        cluster_index.set_available(cluster_id, available)
+        record_free_capacity(cluster_id, available)
+
+    def record_released_elsewhere(self):
+        """
+        Propagate the committed release of gang replicas on other clusters, and the
+        deployments the transaction failed, to the in-memory indexes.
+        """
+        released, self.released_elsewhere = self.released_elsewhere, {}
+        self.retry_clusters.update(released)
+        for cluster_id, released_ids in released.items():
+            cluster = self.get_cluster(cluster_id)
+            self.record_committed(cluster_id, (cluster.cpu_available, cluster.ram_available, cluster.gpu_available),
+                                  released_ids=released_ids)
+        self.record_discarded()
+
+    def record_discarded(self):
+        """Drop the deployments failed by a committed transaction from the dependency graph."""
+        discarded, self.discarded = self.discarded, []
+        if discarded:
+            dependency_graph.discard(discarded)
+
+    def queue_cluster(self, deployment_in: DeploymentCreate, placement_policy: str,
+                      candidates: Optional[List[Cluster]] = None, engine=None) -> Optional[Cluster]:
+        """The cluster a deployment without a cluster_id waits on: the best ranked one that could ever hold it."""
+        policy = PlacementPolicyFactory.get_placement_policy(placement_policy)
+        if engine is not None:
+            ranked = engine.rank(policy.name, deployment_in, limit=1)
+        else:
+            if candidates is None:
+                candidates = cluster_index.clusters(self.db, self.current_user.organization_id)
+            ranked = policy.rank(candidates, deployment_in)
+        if not ranked:
+            return None
+        return ranked[0] if isinstance(ranked[0], Cluster) else self.get_cluster(ranked[0].id)
+
+    def enqueue_deployment(self, deployment_in: DeploymentCreate, cluster: Type[Cluster]) -> Deployment:
+        """Persist a deployment as pending; the pending scheduler places it once capacity frees up."""
+        try:
+            deployment = self.create_new_deployment(deployment_in, cluster, status=DeploymentStatus.PENDING)
+            cluster_id = cluster.id
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self.db.refresh(deployment)
+        record_queued(cluster_id)
+        return deployment
+
+    def unmet_dependencies(self, depends_on: List[int]) -> List[int]:
+        """Check the upstream deployments of a deployment and return those that have not completed yet."""
+        upstream = self.db.query(Deployment).join(Cluster, Deployment.cluster_id == Cluster.id).filter(
+            Deployment.id.in_(set(depends_on)),
+            Cluster.organization_id == self.current_user.organization_id
+        ).all()
+        missing = set(depends_on) - {deployment.id for deployment in upstream}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Deployment with id {min(missing)} not found.")
+        for deployment in upstream:
+            if deployment.status in FINAL_STATUSES and deployment.status != DeploymentStatus.COMPLETED:
+                raise HTTPException(status_code=400, detail=f"Deployment {deployment.id} is {deployment.status.value} and will never complete.")
+        return sorted(deployment.id for deployment in upstream if deployment.status != DeploymentStatus.COMPLETED)
+
+    def upstream_closure(self, deployment_ids: List[int]) -> Set[int]:
+        """The given deployments and every deployment they depend on, directly or transitively."""
+        seen = frontier = set(deployment_ids)
+        while frontier:
+            frontier = {depends_on_id for depends_on_id, in self.db.query(DeploymentDependency.depends_on_id).filter(
+                DeploymentDependency.deployment_id.in_(frontier)
+            )} - seen
+            seen = seen | frontier
+        return seen
+
+    def block_deployment(self, deployment_in: DeploymentCreate, cluster_id: Optional[int], placement_policy: str,
+                         upstream_ids: List[int]) -> Deployment:
+        """
+        Persist a deployment as blocked on its uncompleted upstream deployments.
+        Once they have all completed it is queued on its cluster, or on the best
+        ranked one that could ever hold it when no cluster_id was given.
+        """
+        if cluster_id is None:
+            cluster = self.queue_cluster(deployment_in, placement_policy)
+        else:
+            cluster = self.get_cluster(cluster_id)
+            self.check_user_permission(cluster)
+            if not PlacementPolicy.can_hold(cluster, deployment_in):
+                cluster = None
+        if cluster is None:
+            raise HTTPException(status_code=400, detail=(
+                f"No cluster can hold the deployment. Requested: CPU={deployment_in.cpu_required}, "
+                f"RAM={deployment_in.ram_required}, GPU={deployment_in.gpu_required}."
+            ))
+
+        dependency_graph.ensure_loaded(self.db)
+        try:
+            deployment = self.create_new_deployment(deployment_in, cluster, status=DeploymentStatus.BLOCKED)
+            self.db.flush()
+            self.db.add_all([DeploymentDependency(deployment_id=deployment.id, depends_on_id=upstream_id)
+                             for upstream_id in upstream_ids])
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self.db.refresh(deployment)
+        dependency_graph.add(deployment.id, upstream_ids)
+        return deployment
+
+    def add_dependencies(self, deployment_id: int, depends_on: List[int]) -> Deployment:
+        """
+        Make a deployment that has not started yet wait for more upstream
+        deployments. Rejected when the new edges would close a cycle.
+        """
+        deployment = self.get_deployment(deployment_id)
+        self.check_user_permission(self.get_cluster(deployment.cluster_id))
+        if deployment.gang_id or deployment.status not in (DeploymentStatus.BLOCKED, DeploymentStatus.PENDING):
+            raise HTTPException(status_code=400, detail="Only blocked or pending deployments outside gangs can gain dependencies.")
+        if deployment_id in self.upstream_closure(depends_on):
+            raise HTTPException(status_code=400, detail="The dependencies would create a cycle.")
+
+        dependency_graph.ensure_loaded(self.db)
+        existing = {depends_on_id for depends_on_id, in self.db.query(DeploymentDependency.depends_on_id).filter(
+            DeploymentDependency.deployment_id == deployment_id
+        )}
+        upstream_ids = [upstream_id for upstream_id in self.unmet_dependencies(depends_on) if upstream_id not in existing]
+        if not upstream_ids:
+            return deployment
 
+        was_pending = deployment.status == DeploymentStatus.PENDING
+        try:
+            self.db.add_all([DeploymentDependency(deployment_id=deployment_id, depends_on_id=upstream_id)
+                             for upstream_id in upstream_ids])
+            deployment.status = DeploymentStatus.BLOCKED.name
+            cluster_id = deployment.cluster_id
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+        self.db.refresh(deployment)
+        dependency_graph.add(deployment_id, upstream_ids)
+        if was_pending:
+            pending_deployments.dec(cluster_id=str(cluster_id))
         return deployment
+
+    def fail_dependents(self, deployment_ids: List[int]) -> List[int]:
+        """
+        Fail, in the current transaction, the blocked deployments that depend on
+        deployments which will never complete, directly or transitively. They are
+        found with a recursive query, so deployments another worker blocked are
+        included; the dependency graph forgets them once the transaction commits
+        (record_discarded). Returns their ids.
+        """
+        blocked_dependents = select(DeploymentDependency.deployment_id.label("id")).join(
+            Deployment, Deployment.id == DeploymentDependency.deployment_id
+        ).where(Deployment.status == DeploymentStatus.BLOCKED)
+        doomed = blocked_dependents.where(
+            DeploymentDependency.depends_on_id.in_(deployment_ids)
+        ).cte("doomed", recursive=True)
+        doomed = doomed.union(blocked_dependents.join(doomed, DeploymentDependency.depends_on_id == doomed.c.id))
+        doomed_ids = sorted(deployment_id for deployment_id, in self.db.execute(select(doomed.c.id)))
+        if doomed_ids:
+            self.db.query(Deployment).filter(
+                Deployment.id.in_(doomed_ids),
+                Deployment.status == DeploymentStatus.BLOCKED
+            ).update({Deployment.status: DeploymentStatus.FAILED.name}, synchronize_session=False)
+        self.discarded.extend(list(deployment_ids) + doomed_ids)
+        return doomed_ids
+
+    def queue_ready(self, deployment_ids: List[int]) -> Set[int]:
+        """Queue blocked deployments whose dependencies have all completed; returns their clusters."""
+        if not deployment_ids:
+            return set()
+        try:
+            ready = self.db.query(Deployment).filter(
+                Deployment.id.in_(deployment_ids),
+                Deployment.status == DeploymentStatus.BLOCKED
+            ).all()
+            for deployment in ready:
+                deployment.status = DeploymentStatus.PENDING.name
+            queued_clusters = Counter(deployment.cluster_id for deployment in ready)
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+        for cluster_id, count in queued_clusters.items():
+            record_queued(cluster_id, count)
+        return set(queued_clusters)
+
+    @retry_on_conflict
+    def handle_deployment(self, deployment_in: DeploymentCreate, preemption_strategy: str, cluster_id: Optional[int],
+                          placement_policy: str = "best_fit", wait: bool = True):
+        """
+        Main method to handle the entire deployment process.
+
+        With `wait`, a deployment that cannot be placed right now but fits the
+        cluster's limits is queued as pending instead of being rejected. A
+        deployment with uncompleted dependencies is stored as blocked until they
+        complete; dependencies that have already completed are not recorded.
+        """
+        deployment_in = self.owned(deployment_in)
+        upstream_ids = self.unmet_dependencies(deployment_in.depends_on) if deployment_in.depends_on else []
+        if upstream_ids:
+            return self.block_deployment(deployment_in, cluster_id, placement_policy, upstream_ids)
+
+        if cluster_id is None:
+            strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+            try:
+                cluster, schedule = self.choose_cluster(deployment_in, strategy, placement_policy)
+            except HTTPException as exc:
+                cluster = self.queue_cluster(deployment_in, placement_policy) if wait and exc.status_code == 400 else None
+                if cluster is None:
+                    raise
+                return self.enqueue_deployment(deployment_in, cluster)
+            return self.apply_schedule(schedule, cluster, deployment_in)
+
+        cluster = self.get_cluster(cluster_id, for_update=True)
+        self.check_user_permission(cluster)
+
+        try:
+            schedule = self.get_preemption_schedule(preemption_strategy, cluster, deployment_in)
+        except HTTPException:
+            if not (wait and PlacementPolicy.can_hold(cluster, deployment_in)):
+                raise
+            return self.enqueue_deployment(deployment_in, cluster)
+        return self.apply_schedule(schedule, cluster, deployment_in)
+
+    @retry_on_conflict
+    def schedule_pending(self, cluster_id: int, preemption_strategy: str, limit: int) -> List[Deployment]:
+        """
+        Try to place the pending deployments of a cluster, highest priority first.
+
+        At most `limit` deployments are considered. Deployments that still do not
+        fit are skipped so smaller ones behind them can use the free capacity.
+        Everything admitted is committed in one transaction; returns the admitted
+        deployments.
+        """
+        try:
+            cluster = self.get_cluster(cluster_id, for_update=True)
+        except HTTPException:
+            return []
+        pending = self.db.query(Deployment).filter(
+            Deployment.cluster_id == cluster_id,
+            Deployment.status == DeploymentStatus.PENDING,
+            Deployment.gang_id.is_(None)  # Gangs are admitted as a whole by schedule_pending_gangs
+        ).order_by(Deployment.priority.desc(), Deployment.id.asc()).limit(limit).all()
+        if not pending:
+            return []
+
+        strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+        capacity = capacity_index.get(self.db, cluster).copy()
+        admitted = []
+        released_ids = []
+        preempted_priorities = []
+        try:
+            for deployment in pending:
+                schedule = strategy.plan(self.db, cluster, deployment, capacity)
+                if not schedule["feasible"]:
+                    continue
+                victims = self.apply_preemption(schedule, cluster)
+                deployment.status = DeploymentStatus.RUNNING.name
+                self.update_cluster_resources(deployment, cluster)
+                for victim in victims:
+                    capacity.remove(victim.id)
+                    released_ids.append(victim.id)
+                capacity.set_available(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+                admitted.append(deployment)
+                preempted_priorities.append([victim.priority for victim in victims])
+            available = (cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+            admitted_ids = [deployment.id for deployment in admitted]
+            self.db.commit()
+        except HTTPException:
+            # A victim changed under us; the capacity view was invalidated, retry next tick.
+            self.rollback()
+            return []
+        except Exception:
+            self.rollback()
+            raise
+
+        if admitted_ids:
+            self.db.query(Deployment).filter(Deployment.id.in_(admitted_ids)).all()
+        self.record_committed(cluster_id, available, admitted=admitted, released_ids=released_ids)
+        self.record_released_elsewhere()
+        record_placements(preempted_priorities)
+        pending_deployments.dec(len(admitted), cluster_id=str(cluster_id))
+        return admitted
+
+    @retry_on_conflict
+    def handle_batch(self, deployments_in: List[DeploymentCreate], preemption_strategy: str,
+                     placement_policy: str = "best_fit", wait: bool = True) -> List[dict]:
+        """
+        Schedule a batch of deployments and commit them in one transaction.
+
+        Items are placed highest priority first (scarcest resources first within a
+        priority) so that later, smaller items pack into what is left. Deployments
+        admitted by the batch are never preempted by later items of the same batch.
+        An item that cannot be placed is queued as pending (with `wait`) or reported
+        as rejected, without affecting the others. Items without a cluster_id are placed on the organization's
+        clusters as they stand at that point of the batch; with at least
+        VECTORIZED_PLACEMENT_MIN_CLUSTERS of them, they are ranked by one ScoringEngine
+        updated as items are staged. Returns one result per item, in request order.
+        """
+        deployments_in = [self.owned(deployment_in) for deployment_in in deployments_in]
+        strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+        cluster_ids = {deployment_in.cluster_id for deployment_in in deployments_in} - {None}
+        clusters = {cluster.id: cluster for cluster in self.db.query(Cluster).filter(Cluster.id.in_(cluster_ids))}
+        organization_clusters = None
+        if None in {deployment_in.cluster_id for deployment_in in deployments_in} and self.current_user.organization_id:
+            organization_clusters = self.db.query(Cluster).filter(
+                Cluster.organization_id == self.current_user.organization_id
+            ).all()
+            for cluster in organization_clusters:
+                clusters.setdefault(cluster.id, cluster)
+            organization_clusters = [clusters[cluster.id] for cluster in organization_clusters]
+        engine = None
+        if (organization_clusters and len(organization_clusters) >= settings.VECTORIZED_PLACEMENT_MIN_CLUSTERS
+                and PlacementPolicyFactory.get_placement_policy(placement_policy).vectorized):
+            from app.core.scheduling.scoring import ScoringEngine
+            engine = ScoringEngine(organization_clusters)
+        capacities = {}
+
+        def capacity_for(cluster: Cluster):
+            if cluster.id not in capacities:
+                capacities[cluster.id] = capacity_index.get(self.db, cluster).copy()
+            return capacities[cluster.id]
+
+        results = [None] * len(deployments_in)
+        preempted_priorities = []
+        queued_clusters = Counter()
+        order = sorted(
+            range(len(deployments_in)),
+            key=lambda i: (-deployments_in[i].priority, -deployments_in[i].gpu_required,
+                           -deployments_in[i].cpu_required, -deployments_in[i].ram_required, i)
+        )
+
+        try:
+            for i in order:
+                deployment_in = deployments_in[i]
+                try:
+                    if deployment_in.cluster_id is None:
+                        cluster, schedule = self.choose_cluster(
+                            deployment_in, strategy, placement_policy,
+                            candidates=organization_clusters or [], capacity_for=capacity_for, engine=engine
+                        )
+                    else:
+                        cluster = clusters.get(deployment_in.cluster_id)
+                        if cluster is None:
+                            raise HTTPException(status_code=404, detail=f"Cluster with id {deployment_in.cluster_id} not found.")
+                        self.check_user_permission(cluster)
+                        schedule = strategy.preempt(self.db, cluster, deployment_in, capacity=capacity_for(cluster))
+                    capacity = capacity_for(cluster)
+                    deployment, victims = self.stage_schedule(schedule, cluster, deployment_in)
+                except HTTPException as exc:
+                    queue_on = None
+                    if wait and exc.status_code == 400:
+                        if deployment_in.cluster_id is None:
+                            queue_on = self.queue_cluster(deployment_in, placement_policy, organization_clusters or [],
+                                                          engine=engine)
+                        elif PlacementPolicy.can_hold(cluster, deployment_in):
+                            queue_on = cluster
+                    if queue_on is None:
+                        results[i] = {"index": i, "status": "rejected", "status_code": exc.status_code, "detail": exc.detail}
+                    else:
+                        deployment = self.create_new_deployment(deployment_in, queue_on, status=DeploymentStatus.PENDING)
+                        results[i] = {"index": i, "status": "queued", "deployment": deployment}
+                        queued_clusters[queue_on.id] += 1
+                    continue
+
+                for victim in victims:
+                    capacity.remove(victim.id)
+                capacity.set_available(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+                if engine is not None:
+                    engine.update(cluster)
+                    for owner_id in self.released_elsewhere:
+                        if owner_id in clusters:
+                            engine.update(clusters[owner_id])
+                preempted_priorities.append([victim.priority for victim in victims])
+                results[i] = {
+                    "index": i,
+                    "status": "scheduled",
+                    "deployment": deployment,
+                    "preempted_deployment_ids": [victim.id for victim in victims]
+                }
+
+            scheduled = [result for result in results if result["status"] == "scheduled"]
+            changes = {
+                cluster_id: {"available": (capacity.cpu_available, capacity.ram_available, capacity.gpu_available),
+                             "admitted": [], "released_ids": []}
+                for cluster_id, capacity in capacities.items()
+            }
+            for result in scheduled:
+                change = changes[result["deployment"].cluster_id]
+                change["admitted"].append(result["deployment"])
+                change["released_ids"].extend(result["preempted_deployment_ids"])
+            created_ids = [result["deployment"].id for result in results if "deployment" in result]
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        if created_ids:
+            # Reload every new row with one query instead of a refresh per deployment.
+            self.db.query(Deployment).filter(Deployment.id.in_(created_ids)).all()
+        for cluster_id, change in changes.items():
+            self.record_committed(cluster_id, change["available"], admitted=change["admitted"],
+                                  released_ids=change["released_ids"])
+        self.record_released_elsewhere()
+        record_placements(preempted_priorities)
+        for cluster_id, count in queued_clusters.items():
+            record_queued(cluster_id, count)
+        return results
+
+    def gang_clusters(self, gang_in: GangDeploymentCreate) -> List[Cluster]:
+        """The clusters a gang may use: the requested ones, or every cluster of the user's organization."""
+        organization_id = self.current_user.organization_id
+        if not organization_id:
+            raise HTTPException(status_code=400, detail="User must belong to an organization to schedule deployments.")
+        if not gang_in.cluster_ids:
+            return self.db.query(Cluster).filter(Cluster.organization_id == organization_id).order_by(Cluster.id).all()
+
+        clusters = self.db.query(Cluster).filter(Cluster.id.in_(gang_in.cluster_ids)).order_by(Cluster.id).all()
+        missing = set(gang_in.cluster_ids) - {cluster.id for cluster in clusters}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Cluster with id {min(missing)} not found.")
+        for cluster in clusters:
+            self.check_user_permission(cluster)
+        return clusters
+
+    def stage_gang(self, replicas_in: List[DeploymentCreate], clusters: List[Cluster], strategy: PreemptionStrategy,
+                   placement_policy: str, gang_id: str, allow_preemption: bool,
+                   pending: Optional[List[Deployment]] = None) -> List[tuple]:
+        """
+        Stage every replica of a gang, each on the best of `clusters` given the
+        replicas placed before it; replicas never preempt each other. `pending`
+        rows, when given, are admitted instead of creating new ones. Raises
+        HTTPException when a replica cannot be placed. Returns one
+        (deployment, victims) pair per replica.
+        """
+        capacities = {}
+
+        def capacity_for(cluster: Cluster):
+            if cluster.id not in capacities:
+                capacities[cluster.id] = capacity_index.get(self.db, cluster).copy()
+            return capacities[cluster.id]
+
+        placements = []
+        for i, replica_in in enumerate(replicas_in):
+            cluster, schedule = self.choose_cluster(replica_in, strategy, placement_policy, candidates=clusters,
+                                                    capacity_for=capacity_for, allow_preemption=allow_preemption)
+            victims = self.apply_preemption(schedule, cluster)
+            if pending is None:
+                deployment = self.create_new_deployment(replica_in, cluster, gang_id=gang_id)
+            else:
+                deployment = pending[i]
+                deployment.cluster_id = cluster.id
+                deployment.status = DeploymentStatus.RUNNING.name
+            self.update_cluster_resources(deployment, cluster)
+
+            capacity = capacity_for(cluster)
+            for victim in victims:
+                capacity.remove(victim.id)
+            capacity.set_available(cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+            placements.append((deployment, victims))
+        return placements
+
+    def place_gang(self, replicas_in: List[DeploymentCreate], clusters: List[Cluster], strategy: PreemptionStrategy,
+                   placement_policy: str, gang_id: str, pending: Optional[List[Deployment]] = None):
+        """
+        Stage a whole gang, first on free capacity only and, when that is not
+        enough, again with preemption. If neither places every replica the session
+        is rolled back, so nothing is placed or preempted, and None is returned.
+        """
+        for allow_preemption in (False, True):
+            try:
+                return self.stage_gang(replicas_in, clusters, strategy, placement_policy, gang_id,
+                                       allow_preemption, pending=pending)
+            except HTTPException as exc:
+                self.rollback()
+                if exc.status_code != 400:
+                    raise
+        return None
+
+    def commit_gang(self, clusters: List[Cluster], placements: List[tuple]):
+        """Commit a placed gang and propagate it to the in-memory indexes and metrics."""
+        by_id = {cluster.id: cluster for cluster in clusters}
+        try:
+            changes = {}
+            for deployment, victims in placements:
+                change = changes.setdefault(deployment.cluster_id, {"admitted": [], "released_ids": []})
+                change["admitted"].append(deployment)
+                change["released_ids"].extend(victim.id for victim in victims)
+            available = {
+                cluster_id: (by_id[cluster_id].cpu_available, by_id[cluster_id].ram_available,
+                             by_id[cluster_id].gpu_available)
+                for cluster_id in changes
+            }
+            deployment_ids = [deployment.id for deployment, _ in placements]
+            preempted_priorities = [[victim.priority for victim in victims] for _, victims in placements]
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        self.db.query(Deployment).filter(Deployment.id.in_(deployment_ids)).all()
+        for cluster_id, change in changes.items():
+            self.record_committed(cluster_id, available[cluster_id], admitted=change["admitted"],
+                                  released_ids=change["released_ids"])
+        self.record_released_elsewhere()
+        record_placements(preempted_priorities)
+
+    @retry_on_conflict
+    def handle_gang(self, gang_in: GangDeploymentCreate, preemption_strategy: str,
+                    placement_policy: str = "best_fit", wait: bool = True) -> dict:
+        """
+        Schedule a gang of `replicas` identical deployments all-or-nothing: every
+        replica is admitted in one transaction, across one or more clusters, with
+        preemption planned for the gang as a whole, or none is. A gang that cannot
+        be placed now is queued entirely (with `wait`) when the clusters could ever
+        hold it, otherwise rejected.
+        """
+        clusters = self.gang_clusters(gang_in)
+        replicas_in = [
+            DeploymentCreate(name=f"{gang_in.name}-{i}", docker_image=gang_in.docker_image,
+                             cpu_required=gang_in.cpu_required, ram_required=gang_in.ram_required,
+                             gpu_required=gang_in.gpu_required, priority=gang_in.priority,
+                             user_id=self.current_user.id)
+            for i in range(gang_in.replicas)
+        ]
+        holds = [(cluster, PlacementPolicy.replicas_held(cluster, gang_in)) for cluster in clusters]
+        if sum(held for _, held in holds) < gang_in.replicas:
+            raise HTTPException(status_code=400, detail=(
+                f"The clusters cannot hold {gang_in.replicas} replicas of CPU={gang_in.cpu_required}, "
+                f"RAM={gang_in.ram_required}, GPU={gang_in.gpu_required} even when empty."
+            ))
+
+        strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+        gang_id = uuid.uuid4().hex
+        placements = self.place_gang(replicas_in, clusters, strategy, placement_policy, gang_id)
+        if placements is not None:
+            self.commit_gang(clusters, placements)
+            return {
+                "gang_id": gang_id,
+                "status": "scheduled",
+                "deployments": [deployment for deployment, _ in placements],
+                "preempted_deployment_ids": [victim.id for _, victims in placements for victim in victims]
+            }
+        if not wait:
+            raise HTTPException(status_code=400, detail=(
+                f"Unable to place all {gang_in.replicas} replicas of the gang. Requested per replica: "
+                f"CPU={gang_in.cpu_required}, RAM={gang_in.ram_required}, GPU={gang_in.gpu_required}."
+            ))
+
+        # Queue every replica, spread over clusters that can each hold their share when empty
+        try:
+            deployments = []
+            queued_clusters = Counter()
+            remaining = iter(replicas_in)
+            for cluster, held in holds:
+                for replica_in in islice(remaining, held):
+                    deployments.append(self.create_new_deployment(replica_in, cluster, status=DeploymentStatus.PENDING,
+                                                                  gang_id=gang_id))
+                    queued_clusters[cluster.id] += 1
+            deployment_ids = [deployment.id for deployment in deployments]
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        self.db.query(Deployment).filter(Deployment.id.in_(deployment_ids)).all()
+        for cluster_id, count in queued_clusters.items():
+            record_queued(cluster_id, count)
+        return {"gang_id": gang_id, "status": "queued", "deployments": deployments}
+
+    def schedule_pending_gangs(self, preemption_strategy: str, limit: int) -> List[Deployment]:
+        """
+        Try to admit up to `limit` queued gangs, highest priority first, oldest
+        first within a priority. A gang is admitted as a whole, in its own
+        transaction, on any cluster of the organization it was queued in, or stays
+        queued. Returns the admitted deployments.
+        """
+        strategy = PreemptionSchedulingFactory.get_preemption_strategy(preemption_strategy)
+        gang_ids = [gang_id for gang_id, in self.db.query(Deployment.gang_id).filter(
+            Deployment.status == DeploymentStatus.PENDING,
+            Deployment.gang_id.isnot(None)
+        ).group_by(Deployment.gang_id).order_by(
+            func.max(Deployment.priority).desc(), func.min(Deployment.id)
+        ).limit(limit)]
+
+        admitted = []
+        for gang_id in gang_ids:
+            pending = self.db.query(Deployment).filter(
+                Deployment.gang_id == gang_id,
+                Deployment.status == DeploymentStatus.PENDING
+            ).order_by(Deployment.id).all()
+            organization_id = self.db.query(Cluster.organization_id).filter(Cluster.id == pending[0].cluster_id).scalar()
+            clusters = self.db.query(Cluster).filter(Cluster.organization_id == organization_id).order_by(Cluster.id).all()
+            replicas_in = [
+                DeploymentCreate(name=deployment.name, docker_image=deployment.docker_image,
+                                 cpu_required=deployment.cpu_required, ram_required=deployment.ram_required,
+                                 gpu_required=deployment.gpu_required, priority=deployment.priority,
+                                 user_id=deployment.user_id)
+                for deployment in pending
+            ]
+            queued_clusters = Counter(deployment.cluster_id for deployment in pending)
+            try:
+                placements = self.place_gang(replicas_in, clusters, strategy, "best_fit", gang_id, pending=pending)
+                if placements is None:
+                    continue
+                self.commit_gang(clusters, placements)
+            except (HTTPException, StaleDataError):
+                # A victim or cluster changed under us; the gang stays queued until the next pass.
+                self.rollback()
+                continue
+            for cluster_id, count in queued_clusters.items():
+                pending_deployments.dec(count, cluster_id=str(cluster_id))
+            admitted.extend(deployment for deployment, _ in placements)
+        return admitted
+
+    @retry_on_conflict
+    def release_deployment(self, deployment_id: int, status: Optional[DeploymentStatus] = None):
+        """
+        Finish a deployment with `status`, or delete it when `status` is None.
+
+        A running deployment's resources are returned to its cluster in the same
+        transaction, after which the cluster's pending deployments are tried
+        straight away. That attempt is best effort: the release is committed by
+        then, so a failure is logged and left to the pending scheduler. Completing a deployment queues the dependents it was the
+        last blocker of; failing or deleting it fails its blocked dependents.
+        Returns (deployment, deployments placed into the freed space); a deleted
+        deployment is returned detached.
+        """
+        deployment = self.get_deployment(deployment_id)
+        cluster = self.get_cluster(deployment.cluster_id, for_update=True)
+        self.check_user_permission(cluster)
+        if status is not None and deployment.status in FINAL_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Deployment is already {deployment.status.value}.")
+
+        holds_resources = deployment.status in ACTIVE_STATUSES
+        was_pending = deployment.status == DeploymentStatus.PENDING
+        try:
+            if holds_resources:
+                cluster.cpu_available = min(cluster.cpu_limit, cluster.cpu_available + deployment.cpu_required)
+                cluster.ram_available = min(cluster.ram_limit, cluster.ram_available + deployment.ram_required)
+                cluster.gpu_available = min(cluster.gpu_limit, cluster.gpu_available + deployment.gpu_required)
+            if status != DeploymentStatus.COMPLETED:
+                self.fail_dependents([deployment_id])
+            if status is None:
+                # Keep the loaded object usable for the response once the row is gone.
+                self.db.expunge(deployment)
+                self.db.query(Deployment).filter(Deployment.id == deployment_id).delete(synchronize_session=False)
+            else:
+                deployment.status = status.name
+            cluster_id = cluster.id
+            available = (cluster.cpu_available, cluster.ram_available, cluster.gpu_available)
+            self.db.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        if status is not None:
+            self.db.refresh(deployment)
+        self.record_discarded()
+        if was_pending:
+            pending_deployments.dec(cluster_id=str(cluster_id))
+        ready_clusters = set()
+        if status == DeploymentStatus.COMPLETED:
+            ready_clusters = self.queue_ready(dependency_graph.complete(deployment_id))
+        if holds_resources:
+            self.record_committed(cluster_id, available, released_ids=[deployment_id])
+            ready_clusters.add(cluster_id)
+        # Whatever is not placed below (past RESCHEDULE_ON_RELEASE_LIMIT, or after a failure) is the scheduler's
+        self.retry_clusters.update(ready_clusters)
+
+        scheduled = []
+        for ready_cluster_id in sorted(ready_clusters):
+            try:
+                scheduled += self.schedule_pending(ready_cluster_id, settings.PENDING_SCHEDULER_PREEMPTION_STRATEGY,
+                                                   settings.RESCHEDULE_ON_RELEASE_LIMIT)
+            except Exception:
+                # Reporting the failure would make the client retry a release that already happened
+                self.rollback()
+                logger.exception("Scheduling pending deployments of cluster %s after a release failed", ready_cluster_id)
+        return deployment, scheduled
@@ -0,0 +1,59 @@
+import json
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.cluster import Cluster
+from app.models.deployment import Deployment
+
+DEPLOYMENT_EXPORT_COLUMNS = (
+    Deployment.id, Deployment.name, Deployment.cluster_id, Deployment.docker_image, Deployment.status,
+    Deployment.priority, Deployment.cpu_required, Deployment.ram_required, Deployment.gpu_required,
+    Deployment.gang_id, Deployment.user_id
+)
+CLUSTER_EXPORT_COLUMNS = (
+    Cluster.id, Cluster.name, Cluster.organization_id, Cluster.cpu_limit, Cluster.ram_limit, Cluster.gpu_limit,
+    Cluster.cpu_available, Cluster.ram_available, Cluster.gpu_available
+)
+
+
+class ExportService:
+    """
+    Stream an organization's clusters or deployments as NDJSON, one object per line.
+
+    Rows are read as plain tuples in batches of EXPORT_BATCH_SIZE through a
+    server-side cursor (`yield_per`) and each batch is written out before the
+    next is fetched, so memory stays flat regardless of table size. The export
+    owns its session: it outlives the request's dependencies while the response
+    is being streamed.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, batch_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.batch_size = settings.EXPORT_BATCH_SIZE if batch_size is None else batch_size
+
+    def export_deployments(self, organization_id: int) -> Iterator[bytes]:
+        statement = select(*DEPLOYMENT_EXPORT_COLUMNS).join(Cluster, Deployment.cluster_id == Cluster.id).where(
+            Cluster.organization_id == organization_id
+        ).order_by(Deployment.id)
+        return self.stream(statement)
+
+    def export_clusters(self, organization_id: int) -> Iterator[bytes]:
+        statement = select(*CLUSTER_EXPORT_COLUMNS).where(Cluster.organization_id == organization_id).order_by(Cluster.id)
+        return self.stream(statement)
+
+    def stream(self, statement) -> Iterator[bytes]:
+        db = self.session_factory()
+        try:
+            result = db.execute(statement.execution_options(yield_per=self.batch_size))
+            keys = list(result.keys())
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps({key: getattr(value, "value", value) for key, value in zip(keys, row)}) + "\n"
+                    for row in rows
+                ).encode()
+        finally:
+            db.close()
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import threading
+from typing import Optional, Set
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.scheduling.dependency_graph import dependency_graph
+from app.core.scheduling.metrics import set_pending_counts
+from app.db.session import SessionLocal
+from app.models.deployment import Deployment, DeploymentStatus
+from app.service.deployment_service import DeploymentService
+
+logger = logging.getLogger(__name__)
+
+
+class PendingScheduler:
+    """
+    Background loop that places pending deployments once capacity frees up.
+
+    Pending deployments are the queue: they live in the `deployment` table, so
+    nothing is lost on restart. Code that frees capacity calls `notify` with the
+    cluster id, which wakes the loop for that cluster immediately; every
+    `tick_seconds` all clusters with pending deployments are retried as well, to
+    pick up changes made by other workers. Each pass considers at most
+    `max_per_tick` deployments per cluster.
+
+    Every pass also queues the blocked deployments the dependency graph reports
+    as ready; full scans reload the graph from the database first.
+    """
+
+    def __init__(self, session_factory=SessionLocal, tick_seconds: Optional[float] = None,
+                 max_per_tick: Optional[int] = None, preemption_strategy: Optional[str] = None):
+        self.session_factory = session_factory
+        self.tick_seconds = settings.PENDING_SCHEDULER_TICK_SECONDS if tick_seconds is None else tick_seconds
+        self.max_per_tick = settings.PENDING_SCHEDULER_MAX_PER_TICK if max_per_tick is None else max_per_tick
+        self.preemption_strategy = preemption_strategy or settings.PENDING_SCHEDULER_PREEMPTION_STRATEGY
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, cluster_id: int):
+        """Signal that capacity was freed on a cluster. Safe to call from any thread."""
+        with self._lock:
+            self._dirty.add(cluster_id)
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def run_once(self, full_scan: bool = False) -> int:
+        """Run one scheduling pass; returns the number of deployments placed."""
+        with self._lock:
+            cluster_ids, self._dirty = self._dirty, set()
+
+        admitted = 0
+        db = self.session_factory()
+        try:
+            service = DeploymentService(db, current_user=None)
+            if full_scan:
+                dependency_graph.load(db)
+            # Deployments whose dependencies completed join the queue of their cluster
+            cluster_ids |= service.queue_ready(dependency_graph.pop_ready())
+            if full_scan:
+                pending_counts = dict(db.query(Deployment.cluster_id, func.count(Deployment.id)).filter(
+                    Deployment.status == DeploymentStatus.PENDING
+                ).group_by(Deployment.cluster_id).all())
+                set_pending_counts(pending_counts)
+                cluster_ids |= set(pending_counts)
+            if cluster_ids:
+                # Gangs go first, so capacity freed for them is not taken piecemeal by single deployments
+                admitted += len(service.schedule_pending_gangs(self.preemption_strategy, self.max_per_tick))
+            for cluster_id in sorted(cluster_ids):
+                if cluster_id is not None:
+                    admitted += len(service.schedule_pending(cluster_id, self.preemption_strategy, self.max_per_tick))
+            # Gang replicas preempted on other clusters freed capacity there
+            retry_clusters = service.retry_clusters
+        finally:
+            db.close()
+        for cluster_id in retry_clusters:
+            self.notify(cluster_id)
+        return admitted
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            full_scan = False
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.tick_seconds)
+            except asyncio.TimeoutError:
+                full_scan = True
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.run_once, full_scan)
+            except Exception:
+                logger.exception("Pending deployment scheduling pass failed")
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        self._wakeup = None
+
+
+pending_scheduler = PendingScheduler()
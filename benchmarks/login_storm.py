@@ -0,0 +1,129 @@
+"""
+Login storm benchmark.
+
+Starts the API under uvicorn, fires a burst of concurrent logins and, at the
+same time, probes unrelated endpoints (`GET /health` and an authenticated
+`GET /api/v1/clusters/`) at a steady rate. Reports the latency percentiles of
+the probes during the storm next to an idle baseline, plus the login status
+codes (503 marks logins shed by the password hashing pool). Prints a JSON report.
+
+Usage:
+    python -m benchmarks.login_storm --logins 400 --concurrency 64
+    python -m benchmarks.login_storm --hash-workers 8 --hash-max-queue 16 --hash-executor process
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark_login_storm.db")
+    parser.add_argument("--logins", type=int, default=400, help="Number of logins in the storm")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent login clients")
+    parser.add_argument("--probe-interval-ms", type=float, default=20, help="Delay between probe requests")
+    parser.add_argument("--baseline-probes", type=int, default=100, help="Probe requests sent before the storm")
+    parser.add_argument("--hash-workers", type=int, help="PASSWORD_HASH_WORKERS override")
+    parser.add_argument("--hash-max-queue", type=int, help="PASSWORD_HASH_MAX_QUEUE override")
+    parser.add_argument("--hash-executor", choices=["thread", "process"], help="PASSWORD_HASH_EXECUTOR override")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.database_url.startswith("sqlite:///./") and os.path.exists(args.database_url[len("sqlite:///"):]):
+        os.remove(args.database_url[len("sqlite:///"):])
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["PENDING_SCHEDULER_ENABLED"] = "false"
+    for name, value in (("PASSWORD_HASH_WORKERS", args.hash_workers), ("PASSWORD_HASH_MAX_QUEUE", args.hash_max_queue),
+                        ("PASSWORD_HASH_EXECUTOR", args.hash_executor)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    # The application reads its settings at import time.
+    import httpx
+
+    from app.core.config import settings
+    from app.core.security import get_password_hash
+    from app.db.base import Base
+    from app.db.session import SessionLocal, get_engine
+    from app.main import app
+    from app.models.organization import Organization
+    from app.models.user import User
+    from benchmarks.common import latency_summary, serve
+
+    Base.metadata.create_all(bind=get_engine())
+    suffix = uuid.uuid4().hex[:8]
+    username = f"storm-{suffix}"
+    db = SessionLocal()
+    organization = Organization(name=username, invite_code=username)
+    db.add(organization)
+    db.flush()
+    db.add(User(username=username, email=f"{username}@example.com", hashed_password=get_password_hash("password"),
+                is_active=True, organization_id=organization.id))
+    db.commit()
+    db.close()
+
+    with serve(app) as server_url:
+        response = httpx.post(f"{server_url}/api/v1/auth/login", json={"username": username, "password": "password"})
+        response.raise_for_status()
+        cookies = dict(response.cookies)
+
+        def probe(client: httpx.Client, latencies: Dict[str, List[float]]):
+            for name, path in (("health", "/health"), ("clusters", "/api/v1/clusters/")):
+                start = time.perf_counter()
+                client.get(path)
+                latencies[name].append((time.perf_counter() - start) * 1000)
+
+        baseline = {"health": [], "clusters": []}
+        with httpx.Client(base_url=server_url, cookies=cookies, timeout=60) as client:
+            for _ in range(args.baseline_probes):
+                probe(client, baseline)
+                time.sleep(args.probe_interval_ms / 1000)
+
+        during_storm = {"health": [], "clusters": []}
+        storm_done = threading.Event()
+
+        def probe_during_storm():
+            with httpx.Client(base_url=server_url, cookies=cookies, timeout=60) as client:
+                while not storm_done.is_set():
+                    probe(client, during_storm)
+                    time.sleep(args.probe_interval_ms / 1000)
+
+        def login(_: int) -> int:
+            with httpx.Client(base_url=server_url, timeout=120) as client:
+                return client.post("/api/v1/auth/login", json={"username": username, "password": "password"}).status_code
+
+        prober = threading.Thread(target=probe_during_storm)
+        prober.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            statuses = Counter(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - start
+        storm_done.set()
+        prober.join()
+
+    report = {
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "hash_executor": settings.PASSWORD_HASH_EXECUTOR,
+        "hash_workers": settings.PASSWORD_HASH_WORKERS,
+        "hash_max_queue": settings.PASSWORD_HASH_MAX_QUEUE,
+        "storm_seconds": round(elapsed, 3),
+        "login_status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "baseline": {name: latency_summary(values) for name, values in baseline.items()},
+        "during_storm": {name: latency_summary(values) for name, values in during_storm.items()},
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Placement scoring benchmark.
+
+Ranks synthetic deployments against synthetic clusters with every vectorized
+placement policy, once through the scalar `PlacementPolicy.rank_scalar` (one
+deployment at a time, as below VECTORIZED_PLACEMENT_MIN_CLUSTERS) and once
+through `ScoringEngine.rank_many`, and reports:
+
+- scalar_ms / vectorized_ms: total time to rank every deployment
+- per_deployment_us: the same per deployment
+- speedup: scalar_ms / vectorized_ms
+- identical: whether both paths produced exactly the same rankings
+
+Exits non-zero if any ranking differs. No database is involved.
+
+Usage:
+    python -m benchmarks.placement_scoring --deployments 10000 --clusters 100
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deployments", type=int, default=10000)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--policies", default="best_fit,worst_fit,gpu_affinity")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="Deployments scored per vectorized pass")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    from app.core.scheduling.cluster_index import ClusterSnapshot
+    from app.core.scheduling.placement_factory import PlacementPolicyFactory
+    from app.core.scheduling.scoring import ScoringEngine
+    from app.schemas.deploymentresponse import DeploymentCreate
+
+    rng = random.Random(args.seed)
+    clusters = []
+    for cluster_id in range(1, args.clusters + 1):
+        limits = (rng.choice((16, 32, 64)), rng.choice((32, 64, 128)), rng.choice((0, 0, 4, 8)))
+        # Partly used clusters, so both the fitting and the non-fitting groups are exercised
+        available = tuple(round(limit * rng.uniform(0, 1), 2) for limit in limits)
+        clusters.append(ClusterSnapshot(cluster_id, 1, limits, available))
+    deployments_in = [
+        DeploymentCreate(name="d", docker_image="abc", cpu_required=round(rng.uniform(0.5, 16), 2),
+                         ram_required=round(rng.uniform(1, 32), 2), gpu_required=rng.choice((0, 0, 0, 1, 2)))
+        for _ in range(args.deployments)
+    ]
+
+    cases: List[Dict] = []
+    for name in args.policies.split(","):
+        policy = PlacementPolicyFactory.get_placement_policy(name)
+
+        start = time.perf_counter()
+        scalar = [policy.rank_scalar(clusters, deployment_in) for deployment_in in deployments_in]
+        scalar_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        vectorized = ScoringEngine(clusters).rank_many(name, deployments_in, chunk_size=args.chunk_size)
+        vectorized_ms = (time.perf_counter() - start) * 1000
+
+        identical = all(
+            [cluster.id for cluster in expected] == [cluster.id for cluster in ranked]
+            for expected, ranked in zip(scalar, vectorized)
+        )
+        cases.append({
+            "policy": name,
+            "scalar_ms": round(scalar_ms, 1),
+            "vectorized_ms": round(vectorized_ms, 1),
+            "per_deployment_us": {
+                "scalar": round(scalar_ms * 1000 / args.deployments, 2),
+                "vectorized": round(vectorized_ms * 1000 / args.deployments, 2),
+            },
+            "speedup": round(scalar_ms / vectorized_ms, 1) if vectorized_ms else None,
+            "identical": identical,
+        })
+
+    report = {
+        "deployments": args.deployments,
+        "clusters": args.clusters,
+        "chunk_size": args.chunk_size,
+        "seed": args.seed,
+        "cases": cases,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0 if all(case["identical"] for case in cases) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Scheduler decision benchmark.
+
+For every cluster size and resource/priority distribution, seeds one nearly
+full cluster with synthetic running deployments and then, for each strategy
+registered in PreemptionSchedulingFactory, measures:
+
+- index_load_ms: building the cluster's capacity index from the database
+- plan_latency_ms: `strategy.plan` against the warm index (pure decision)
+- decision_latency_ms: `DeploymentService.handle_deployment` end to end
+- commits_per_decision, preemptions_per_decision and placement_success_rate
+
+The JSON report has stable keys and ordering so two runs can be diffed; pass
+`--baseline` to print p50/p99 ratios against an earlier report.
+
+Usage:
+    python -m benchmarks.scheduler_decisions --sizes 100,1000,10000 --output scheduler.json
+    python -m benchmarks.scheduler_decisions --sizes 100000 --decisions 100 --baseline scheduler.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+Sample = Tuple[int, float, float, float]  # priority, cpu, ram, gpu
+
+
+def uniform(rng: random.Random) -> Sample:
+    return rng.randint(0, 9), rng.uniform(0.5, 4), rng.uniform(1, 8), rng.choice((0, 0, 1))
+
+
+def skewed(rng: random.Random) -> Sample:
+    """Mostly small, low priority deployments with a long tail of large ones."""
+    return (min(9, int(rng.expovariate(0.7))), min(32.0, rng.lognormvariate(0, 0.8)),
+            min(64.0, rng.lognormvariate(1, 0.8)), 1 if rng.random() < 0.1 else 0)
+
+
+def bimodal(rng: random.Random) -> Sample:
+    """Many tiny batch jobs next to a few large, high priority services."""
+    if rng.random() < 0.9:
+        return rng.randint(0, 3), rng.uniform(0.1, 0.5), rng.uniform(0.1, 1), 0
+    return rng.randint(6, 9), rng.uniform(8, 16), rng.uniform(16, 64), rng.choice((1, 2, 4))
+
+
+DISTRIBUTIONS: Dict[str, Callable[[random.Random], Sample]] = {
+    "uniform": uniform,
+    "skewed": skewed,
+    "bimodal": bimodal,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark_scheduler.db")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated running deployment counts")
+    parser.add_argument("--distributions", default=",".join(DISTRIBUTIONS))
+    parser.add_argument("--strategies", help="Comma-separated strategies (default: all registered)")
+    parser.add_argument("--decisions", type=int, default=200, help="Scheduling decisions measured per case")
+    parser.add_argument("--headroom", type=float, default=1.0,
+                        help="Free capacity left on the cluster, in mean deployment sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    return parser.parse_args()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report: Dict, baseline: Dict):
+    """Print p50/p99 ratios (current / baseline) of every case present in both reports."""
+    def key(case):
+        return case["size"], case["distribution"], case["strategy"]
+
+    previous = {key(case): case for case in baseline["cases"]}
+    print(f"{'case':<36} {'metric':<20} {'p50':>8} {'p99':>8}", file=sys.stderr)
+    for case in report["cases"]:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        for metric in ("plan_latency_ms", "decision_latency_ms"):
+            ratios = [case[metric][p] / old[metric][p] if old[metric][p] else float("nan") for p in ("p50_ms", "p99_ms")]
+            name = "/".join(str(part) for part in key(case))
+            print(f"{name:<36} {metric:<20} {ratios[0]:>7.2f}x {ratios[1]:>7.2f}x", file=sys.stderr)
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+
+    # The application reads its settings at import time.
+    from fastapi import HTTPException
+    from sqlalchemy import create_engine, event, insert
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.config import settings
+    from app.core.scheduling.capacity_index import capacity_index
+    from app.core.scheduling.cluster_index import cluster_index
+    from app.core.scheduling.preemption_factory import \
+        PreemptionSchedulingFactory
+    from app.db.base import Base
+    from app.models.cluster import Cluster
+    from app.models.deployment import Deployment, DeploymentStatus
+    from app.models.organization import Organization
+    from app.models.user import User
+    from app.schemas.deploymentresponse import DeploymentCreate
+    from app.service.deployment_service import DeploymentService
+    from benchmarks.common import latency_summary
+
+    engine = create_engine(args.database_url)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    distributions = args.distributions.split(",")
+    strategies = args.strategies.split(",") if args.strategies else list(PreemptionSchedulingFactory.strategies)
+
+    def seed(size: int, sample: Callable[[random.Random], Sample], rng: random.Random):
+        """
+        Fresh schema with one organization, user and a cluster full of running
+        deployments, leaving `headroom` mean deployment sizes free so a share of
+        the requests needs preemption at every size.
+        """
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        capacity_index.clear()
+        cluster_index.clear()
+        rows = [sample(rng) for _ in range(size)]
+        used = [sum(row[i] for row in rows) for i in (1, 2, 3)]
+        limits = [value + args.headroom * value / size for value in used]
+        db = Session()
+        organization = Organization(name="benchmark", invite_code="benchmark")
+        db.add(organization)
+        db.flush()
+        user = User(username="benchmark", email="benchmark@example.com", hashed_password="-", is_active=True,
+                    organization_id=organization.id)
+        cluster = Cluster(name="benchmark", organization_id=organization.id,
+                          cpu_limit=limits[0], ram_limit=limits[1], gpu_limit=limits[2],
+                          cpu_available=limits[0] - used[0], ram_available=limits[1] - used[1],
+                          gpu_available=limits[2] - used[2])
+        db.add_all([user, cluster])
+        db.flush()
+        db.execute(insert(Deployment), [
+            {"name": f"seed-{i}", "cluster_id": cluster.id, "docker_image": "benchmark",
+             "status": DeploymentStatus.RUNNING, "priority": priority,
+             "cpu_required": cpu, "ram_required": ram, "gpu_required": gpu}
+            for i, (priority, cpu, ram, gpu) in enumerate(rows)
+        ])
+        db.commit()
+        return db, user, cluster
+
+    cases = []
+    for size in sizes:
+        for distribution in distributions:
+            sample = DISTRIBUTIONS[distribution]
+            requests_rng = random.Random(args.seed + 1)
+            requests = []
+            for i in range(args.decisions):
+                _, cpu, ram, gpu = sample(requests_rng)
+                requests.append(DeploymentCreate(name=f"request-{i}", docker_image="benchmark", cpu_required=cpu,
+                                                 ram_required=ram, gpu_required=gpu,
+                                                 priority=requests_rng.randint(0, 10)))
+            for strategy_name in strategies:
+                db, user, cluster = seed(size, sample, random.Random(args.seed))
+                strategy = PreemptionSchedulingFactory.get_preemption_strategy(strategy_name)
+
+                start = time.perf_counter()
+                capacity = capacity_index.get(db, cluster)
+                index_load_ms = (time.perf_counter() - start) * 1000
+
+                plan_latencies: List[float] = []
+                for deployment_in in requests:
+                    start = time.perf_counter()
+                    strategy.plan(db, cluster, deployment_in, capacity)
+                    plan_latencies.append((time.perf_counter() - start) * 1000)
+
+                commits = []
+                event.listen(db, "after_commit", lambda session: commits.append(1))
+                decision_latencies: List[float] = []
+                placed = 0
+                service = DeploymentService(db, user)
+                for deployment_in in requests:
+                    deployment_in = deployment_in.model_copy(update={"cluster_id": cluster.id})
+                    start = time.perf_counter()
+                    try:
+                        service.handle_deployment(deployment_in, strategy_name, cluster.id, wait=False)
+                        placed += 1
+                    except HTTPException:
+                        db.rollback()
+                    decision_latencies.append((time.perf_counter() - start) * 1000)
+                preempted = db.query(Deployment).filter(Deployment.status == DeploymentStatus.PREEMPTED).count()
+                db.close()
+
+                cases.append({
+                    "size": size,
+                    "distribution": distribution,
+                    "strategy": strategy_name,
+                    "decisions": len(requests),
+                    "index_load_ms": round(index_load_ms, 2),
+                    "plan_latency_ms": latency_summary(plan_latencies),
+                    "decision_latency_ms": latency_summary(decision_latencies),
+                    "commits_per_decision": round(len(commits) / len(requests), 3),
+                    "preemptions_per_decision": round(preempted / len(requests), 3),
+                    "placement_success_rate": round(placed / len(requests), 3),
+                })
+                print(f"{size:>7} {distribution:<8} {strategy_name:<10} "
+                      f"plan p99={cases[-1]['plan_latency_ms']['p99_ms']}ms "
+                      f"decision p99={cases[-1]['decision_latency_ms']['p99_ms']}ms "
+                      f"placed={cases[-1]['placement_success_rate']}", file=sys.stderr)
+
+    report = {
+        "benchmark": "scheduler_decisions",
+        "schema_version": 1,
+        "environment": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split("://")[0],
+            "preemption_solver_time_limit_ms": settings.PREEMPTION_SOLVER_TIME_LIMIT_MS,
+        },
+        "parameters": {
+            "sizes": sizes,
+            "distributions": distributions,
+            "strategies": strategies,
+            "decisions": args.decisions,
+            "headroom": args.headroom,
+            "seed": args.seed,
+        },
+        "cases": cases,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
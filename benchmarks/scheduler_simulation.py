@@ -0,0 +1,108 @@
+"""
+Scheduler simulation.
+
+Replays a trace of cluster, arrival and completion events (JSONL, see
+app.core.scheduling.simulator) through the discrete-event Simulator once per
+preemption strategy, and reports utilisation, wait times, preemption counts
+and decision latency side by side. No database is involved.
+
+Without `--trace`, a synthetic trace is generated from a distribution of
+benchmarks.scheduler_decisions: Poisson arrivals offering `--load` times the
+clusters' capacity in their scarcest resource, with log-normal durations.
+`--write-trace` saves it for later replays.
+
+Usage:
+    python -m benchmarks.scheduler_simulation --trace day.jsonl --strategies priority,fair_share
+    python -m benchmarks.scheduler_simulation --arrivals 1000000 --clusters 20 --write-trace synthetic.jsonl
+"""
+import argparse
+import json
+import math
+import random
+import sys
+from typing import Any, Dict, Iterator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="JSONL trace to replay")
+    parser.add_argument("--strategies", help="Comma-separated strategies (default: all registered)")
+    parser.add_argument("--placement-policy", default="best_fit")
+    parser.add_argument("--arrivals", type=int, default=100000, help="Deployments in the synthetic trace")
+    parser.add_argument("--clusters", type=int, default=10, help="Clusters in the synthetic trace")
+    parser.add_argument("--users", type=int, default=20, help="Users submitting the synthetic deployments")
+    parser.add_argument("--distribution", default="uniform")
+    parser.add_argument("--load", type=float, default=0.9, help="Offered load as a share of capacity")
+    parser.add_argument("--mean-duration", type=float, default=600, help="Mean deployment duration in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--write-trace", help="Also write the synthetic trace to this file")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+
+def synthetic_trace(args) -> Iterator[Dict[str, Any]]:
+    """The same events for the same arguments, generated lazily."""
+    from benchmarks.scheduler_decisions import DISTRIBUTIONS
+
+    sample = DISTRIBUTIONS[args.distribution]
+    rng = random.Random(args.seed)
+    capacity = [0.0, 0.0, 0.0]
+    for cluster_id in range(1, args.clusters + 1):
+        limits = rng.choice(((64, 256, 8), (128, 512, 16), (96, 384, 0)))
+        capacity = [total + limit for total, limit in zip(capacity, limits)]
+        yield {"time": 0.0, "event": "cluster", "id": cluster_id, "cpu_limit": limits[0], "ram_limit": limits[1],
+               "gpu_limit": limits[2]}
+
+    demand_rng = random.Random(args.seed + 1)
+    samples = [sample(demand_rng)[1:] for _ in range(1000)]
+    demand = [sum(values) / len(values) for values in zip(*samples)]  # Mean cpu, ram, gpu per deployment
+    # Arrivals per second that keep the scarcest resource `load` busy
+    rate = args.load * min(total / need for total, need in zip(capacity, demand) if need) / args.mean_duration
+    sigma = 1.0
+    mu = math.log(args.mean_duration) - sigma ** 2 / 2
+    now = 0.0
+    for i in range(args.arrivals):
+        now += rng.expovariate(rate)
+        priority, cpu, ram, gpu = sample(rng)
+        yield {
+            "time": round(now, 3), "event": "arrival", "id": i, "cpu_required": round(cpu, 3),
+            "ram_required": round(ram, 3), "gpu_required": gpu, "priority": priority,
+            "user_id": rng.randint(1, args.users), "duration": round(rng.lognormvariate(mu, sigma), 3)
+        }
+
+
+def main() -> int:
+    args = parse_args()
+
+    from app.core.scheduling.preemption_factory import \
+        PreemptionSchedulingFactory
+    from app.core.scheduling.simulator import Simulator, read_trace
+
+    strategies = args.strategies.split(",") if args.strategies else list(PreemptionSchedulingFactory.strategies)
+    if args.write_trace:
+        with open(args.write_trace, "w") as file:
+            for event in synthetic_trace(args):
+                file.write(json.dumps(event) + "\n")
+
+    runs = []
+    for name in strategies:
+        simulator = Simulator(PreemptionSchedulingFactory.get_preemption_strategy(name), args.placement_policy)
+        if args.trace:
+            with open(args.trace) as file:
+                runs.append(simulator.run(read_trace(file)))
+        else:
+            runs.append(simulator.run(synthetic_trace(args)))
+        print(f"{name}: {runs[-1]['events']} events in {runs[-1]['wall_seconds']}s", file=sys.stderr)
+
+    report = {"trace": args.trace or {"synthetic": vars(args)}, "runs": runs}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
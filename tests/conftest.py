@@ -1,9 +1,20 @@
-from typing import Generator
+from typing import Dict, Generator
 
 import pytest
 from fastapi.testclient import TestClient
 
-from app.core.deps import get_db
+from app.core.config import settings
+from app.core.deps import get_db, get_session_factory, get_session_runner
+from app.core.scheduling.capacity_index import capacity_index
+from app.core.scheduling.cluster_index import cluster_index
+from app.core.scheduling.dependency_graph import dependency_graph
+from app.core.user_cache import user_cache
+
+# Tests drive the pending scheduler explicitly
+settings.PENDING_SCHEDULER_ENABLED = False
+# Server-side sessions, so session revocation can be tested; read when the app is built
+settings.SESSION_BACKEND = "memory"
+
 from app.main import app
 
 # Use in-memory SQLite for tests
@@ -12,14 +23,20 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.db.base import Base
+from app.db.runner import SyncSessionRunner
+from app.db.session import instrument_engine
 
 # Test setup
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = instrument_engine(create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}))
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="function")
 def db() -> Generator:
     Base.metadata.create_all(bind=engine)
+    capacity_index.clear()
+    cluster_index.clear()
+    dependency_graph.clear()
+    user_cache.clear()
     db_session = TestingSessionLocal()
     yield db_session
     with engine.connect() as connection:
@@ -29,6 +46,13 @@ def db() -> Generator:
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def admin_headers(monkeypatch) -> Dict[str, str]:
+    """Headers authorizing the operator endpoints."""
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "test-admin-token")
+    return {"Authorization": "Bearer test-admin-token"}
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator:
 	def override_get_db():
@@ -38,8 +62,17 @@ def client() -> Generator:
 		finally:
 			db.close()
 
+	async def override_get_session_runner():
+		runner = SyncSessionRunner(TestingSessionLocal())
+		try:
+			yield runner
+		finally:
+			await runner.close()
+
 	# Override the dependency
 	app.dependency_overrides[get_db] = override_get_db
+	app.dependency_overrides[get_session_runner] = override_get_session_runner
+	app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
 
 	# Provide the test client
 	with TestClient(app) as c:
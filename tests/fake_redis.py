@@ -0,0 +1,70 @@
+import time
+from typing import Dict, Optional, Set, Tuple, Union
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the subset of the `redis.asyncio` client used by
+    RedisSessionStore, including key expiry.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[Union[bytes, Set[bytes]], Optional[float]]] = {}
+
+    def _get(self, key: str):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.values[key]
+            return None
+        return entry[0]
+
+    def _deadline(self, ex: Optional[int]) -> Optional[float]:
+        return time.monotonic() + ex if ex is not None else None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._get(key)
+
+    async def getex(self, key: str, ex: Optional[int] = None) -> Optional[bytes]:
+        value = self._get(key)
+        if value is not None and ex is not None:
+            self.values[key] = (value, self._deadline(ex))
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        self.values[key] = (value.encode(), self._deadline(ex))
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._get(key) is not None:
+                del self.values[key]
+                removed += 1
+        return removed
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        value = self._get(key)
+        if value is None:
+            return False
+        self.values[key] = (value, self._deadline(seconds))
+        return True
+
+    async def sadd(self, key: str, *members: str) -> int:
+        current = self._get(key)
+        if current is None:
+            current = set()
+            self.values[key] = (current, None)
+        added = {member.encode() for member in members} - current
+        current |= added
+        return len(added)
+
+    async def srem(self, key: str, *members: str) -> int:
+        current = self._get(key) or set()
+        removed = {member.encode() for member in members} & current
+        current -= removed
+        return len(removed)
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        return set(self._get(key) or ())
@@ -1,7 +1,13 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from starlette.testclient import TestClient
 
-from app.core.security import get_password_hash
+from app.core.security import (PasswordHashingPool, get_password_hash,
+                               password_hashing_pool)
 from app.models.user import User as UserModel
 
 
@@ -86,3 +92,38 @@ def test_logout(client: TestClient, db: Session):
 	assert response.status_code == 200
 	assert response.json() == {"message": "Successfully logged out"}
 	assert "session" not in response.cookies
+
+
+def test_password_hashing_pool_rejects_when_saturated():
+	pool = PasswordHashingPool(workers=1, max_queue=1)
+	release = threading.Event()
+
+	async def scenario():
+		running = asyncio.ensure_future(pool.run(release.wait))
+		queued = asyncio.ensure_future(pool.run(release.wait))
+		await asyncio.sleep(0.05)
+		assert pool.in_flight == 2
+		with pytest.raises(HTTPException) as exc_info:
+			await pool.run(release.wait)
+		release.set()
+		await asyncio.gather(running, queued)
+		return exc_info.value
+
+	error = asyncio.run(scenario())
+	assert error.status_code == 503
+	assert error.headers == {"Retry-After": "1"}
+	assert pool.in_flight == 0
+	pool.shutdown()
+
+
+def test_login_returns_503_when_hashing_pool_is_saturated(client: TestClient, db: Session, monkeypatch):
+	create_user(db, "testuser", "testuser@example.com", "password123")
+	monkeypatch.setattr(password_hashing_pool, "max_queue", -password_hashing_pool.workers)
+
+	response = client.post("/api/v1/auth/login", json={
+		"username": "testuser",
+		"password": "password123"
+	})
+
+	assert response.status_code == 503
+	assert response.headers["retry-after"] == "1"
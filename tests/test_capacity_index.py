@@ -0,0 +1,91 @@
+import random
+
+from sqlalchemy.orm import Session
+
+from app.core.scheduling import capacity_index
+from app.core.scheduling.capacity_index import (CapacityIndex,
+                                                ClusterCapacity,
+                                                IndexedDeployment)
+from app.models.deployment import Deployment, DeploymentStatus
+from tests.test_cluster import create_cluster
+from tests.test_organization import create_organization
+
+
+def test_first_covering_returns_lowest_priority_match():
+    capacity = ClusterCapacity(1, (100, 100, 100), (0, 0, 0))
+    capacity.add(IndexedDeployment(1, 5, 8, 8, 8))
+    capacity.add(IndexedDeployment(2, 1, 2, 2, 2))
+    capacity.add(IndexedDeployment(3, 3, 8, 1, 8))
+    capacity.add(IndexedDeployment(4, 3, 8, 8, 8))
+
+    assert capacity.first_covering(4, 4, 4).deployment_id == 4
+    assert capacity.first_covering(1, 1, 1).deployment_id == 2
+    assert capacity.first_covering(9, 0, 0) is None
+
+    capacity.remove(4)
+    assert capacity.first_covering(4, 4, 4).deployment_id == 1
+    assert [entry.deployment_id for entry in capacity.by_priority()] == [2, 3, 1]
+    assert capacity.totals_below(5) == (10, 3, 10)
+    assert capacity.count_below(5) == 2
+    assert capacity.count_below(1) == 0
+    assert capacity.totals() == (18, 11, 18)
+
+
+def test_first_covering_visits_two_nodes_per_level_for_one_shape(monkeypatch):
+    # Deployments sized from one shape: a single deployment holds every maximum of its subtree
+    rng = random.Random(7)
+    capacity = ClusterCapacity(1, (10 ** 6, 10 ** 6, 10 ** 6), (0, 0, 0))
+    for i in range(2000):
+        size = rng.randint(1, 64)
+        capacity.add(IndexedDeployment(i + 1, rng.randint(0, 100), size, 2 * size, size // 8))
+
+    def height(node):
+        return 0 if node is None else 1 + max(height(node.left), height(node.right))
+
+    visited = []
+    original = capacity_index._first_covering
+
+    def counting_first_covering(node, *args):
+        visited.append(node)
+        return original(node, *args)
+
+    monkeypatch.setattr(capacity_index, "_first_covering", counting_first_covering)
+    bound = 2 * height(capacity._root) + 1
+    for _ in range(200):
+        size = rng.randint(1, 70)
+        visited.clear()
+        capacity.first_covering(size, 2 * size, size // 8, below_priority=rng.choice([None, 50]))
+        assert len(visited) <= bound
+
+
+def test_first_covering_when_the_maxima_come_from_different_deployments():
+    # Every subtree holds both a CPU-heavy and a RAM-heavy deployment, so pruning by maximum never applies
+    capacity = ClusterCapacity(1, (10 ** 4, 10 ** 4, 0), (0, 0, 0))
+    for i in range(1000):
+        capacity.add(IndexedDeployment(i + 1, i, 8 if i % 2 else 1, 1 if i % 2 else 8, 0))
+    capacity.add(IndexedDeployment(1001, 500, 8, 8, 0))
+
+    assert capacity.first_covering(4, 4, 0).deployment_id == 1001
+    assert capacity.first_covering(4, 4, 0, below_priority=500) is None
+    capacity.remove(1001)
+    assert capacity.first_covering(4, 4, 0) is None
+
+
+def test_check_and_resync(db: Session):
+    organization = create_organization(db, name="Test Organization", invite_code="INVITE123")
+    cluster = create_cluster(db, name="Test Cluster", organization_id=organization.id, cpu_limit=30, ram_limit=40, gpu_limit=40)
+    deployment = Deployment(name="A", cpu_required=4, ram_required=8, gpu_required=1, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.RUNNING.name)
+    db.add(deployment)
+    db.commit()
+
+    index = CapacityIndex()
+    capacity = index.get(db, cluster)
+    assert len(capacity) == 1
+    assert index.check(db, cluster) == []
+
+    deployment.status = DeploymentStatus.COMPLETED.name
+    db.commit()
+    assert index.check(db, cluster) == [f"cluster {cluster.id}: deployment {deployment.id} is indexed but not active"]
+
+    index.resync(db, cluster)
+    assert index.check(db, cluster) == []
@@ -1,8 +1,12 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.cluster import Cluster
+from app.models.deployment import Deployment, DeploymentStatus
 from tests.test_organization import (create_organization, create_user,
                                      login_user)
 
@@ -100,3 +104,68 @@ def test_list_clusters_without_organization(client: TestClient, db: Session):
     assert response.status_code == 400
     data = response.json()
     assert data["detail"] == "User must belong to an organization to view clusters."
+
+
+def test_export_clusters_streams_ndjson(client: TestClient, db: Session, create_test_data):
+    """
+    Test for exporting the organization's clusters as NDJSON
+    """
+    organization, user = create_test_data()
+    other_organization = create_organization(db, name="Other Organization", invite_code="OTHER123")
+    create_cluster(db, name="Cluster A", organization_id=organization.id, cpu_limit=16, ram_limit=32, gpu_limit=4)
+    create_cluster(db, name="Cluster B", organization_id=organization.id, cpu_limit=8, ram_limit=16, gpu_limit=2)
+    create_cluster(db, name="Cluster C", organization_id=other_organization.id, cpu_limit=8, ram_limit=16, gpu_limit=2)
+    cookies = login_user(client, username="testuser", password="password123")
+
+    response = client.get("/api/v1/clusters/export", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["Cluster A", "Cluster B"]
+    assert rows[0]["cpu_limit"] == 16
+    assert rows[0]["gpu_available"] == 4
+
+
+def test_list_clusters_paginated_with_utilisation(client: TestClient, db: Session, create_test_data, monkeypatch):
+    """
+    Test for paging through clusters with utilisation aggregates
+    """
+    organization, user = create_test_data()
+    cluster_a = create_cluster(db, name="Cluster A", organization_id=organization.id, cpu_limit=10, ram_limit=20, gpu_limit=0)
+    create_cluster(db, name="Cluster B", organization_id=organization.id, cpu_limit=8, ram_limit=16, gpu_limit=2)
+    create_cluster(db, name="Cluster C", organization_id=organization.id, cpu_limit=8, ram_limit=16, gpu_limit=2)
+    for status, cpu in ((DeploymentStatus.RUNNING, 2), (DeploymentStatus.RUNNING, 3), (DeploymentStatus.PENDING, 4),
+                        (DeploymentStatus.COMPLETED, 5)):
+        db.add(Deployment(name=f"{status.value}-{cpu}", cluster_id=cluster_a.id, docker_image="abc", priority=0,
+                          cpu_required=cpu, ram_required=cpu, gpu_required=0, status=status.name))
+    db.commit()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    response = client.get("/api/v1/clusters/", params={"limit": 2, "include": "utilisation"}, cookies=cookies)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [cluster["name"] for cluster in first_page] == ["Cluster A", "Cluster B"]
+    assert first_page[0]["utilisation"] == {
+        "running_deployments": 2,
+        "pending_deployments": 1,
+        "cpu_percent": 50.0,
+        "ram_percent": 25.0,
+        "gpu_percent": 0.0
+    }
+    assert first_page[1]["utilisation"]["running_deployments"] == 0
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/v1/clusters/", params={"limit": 2, "cursor": cursor}, cookies=cookies)
+    assert [cluster["name"] for cluster in response.json()] == ["Cluster C"]
+    assert response.json()[0]["utilisation"] is None
+    assert "X-Next-Cursor" not in response.headers
+
+    # Without a limit or cursor, clients unaware of pages get every cluster
+    monkeypatch.setattr(settings, "CLUSTER_PAGE_SIZE", 2)
+    response = client.get("/api/v1/clusters/", cookies=cookies)
+    assert [cluster["name"] for cluster in response.json()] == ["Cluster A", "Cluster B", "Cluster C"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/api/v1/clusters/", params={"include": "deployments"}, cookies=cookies)
+    assert response.status_code == 400
@@ -1,9 +1,20 @@
+import json
+
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.pagination import encode_cursor
+from app.core.scheduling.metrics import pending_deployments
+from app.core.scheduling.dependency_graph import dependency_graph
 from app.models.cluster import Cluster
 from app.models.deployment import Deployment, DeploymentStatus
+from app.service.deployment_service import DeploymentService
+from app.service.export_service import ExportService
+from app.service.pending_scheduler import PendingScheduler, pending_scheduler
+from tests.conftest import TestingSessionLocal
 from tests.test_cluster import create_cluster
 from tests.test_organization import (create_organization, create_user,
                                      login_user)
@@ -50,7 +61,7 @@ def test_create_deployment(client: TestClient, db: Session, setup_test_data):
     assert data["cpu_required"] == payload["cpu_required"]
     assert data["ram_required"] == payload["ram_required"]
     assert data["gpu_required"] == payload["gpu_required"]
-    assert data["status"] == DeploymentStatus.PENDING.value
+    assert data["status"] == DeploymentStatus.RUNNING.value
 
     deployment = db.query(Deployment).filter_by(name="Test Deployment").first()
     assert deployment is not None
@@ -124,3 +135,691 @@ def test_list_deployments_no_deployments(client: TestClient, db: Session, setup_
     assert response.status_code == 404
     data = response.json()
     assert data["detail"] == "No deployments found for the user's organization."
+
+def test_create_deployment_preempts_lowest_priority(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a deployment which does not fit preempts the lowest priority deployment that frees enough
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    low = Deployment(name="Low", cpu_required=10, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.RUNNING.name)
+    small = Deployment(name="Small", cpu_required=2, ram_required=2, gpu_required=2, cluster_id=cluster.id, docker_image='abc', priority=0, status=DeploymentStatus.RUNNING.name)
+    high = Deployment(name="High", cpu_required=15, ram_required=15, gpu_required=15, cluster_id=cluster.id, docker_image='abc', priority=5, status=DeploymentStatus.RUNNING.name)
+    db.add_all([low, small, high])
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 3, 13, 13
+    db.commit()
+
+    payload = {
+        "name": "Urgent",
+        "cpu_required": 10,
+        "ram_required": 10,
+        "gpu_required": 10,
+        "priority": 10,
+        "docker_image": "abc",
+        "cluster_id": cluster.id
+    }
+
+    response = client.post("/api/v1/deployments/", json=payload, cookies=cookies)
+    assert response.status_code == 200
+
+    db.expire_all()
+    assert db.get(Deployment, low.id).status == DeploymentStatus.PREEMPTED
+    assert db.get(Deployment, small.id).status == DeploymentStatus.RUNNING
+    assert db.get(Deployment, high.id).status == DeploymentStatus.RUNNING
+    assert db.get(Cluster, cluster.id).cpu_available == 3
+
+def test_create_deployment_min_cost_preempts_several(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that the min_cost strategy preempts several small lower priority deployments together
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    first = Deployment(name="First", cpu_required=5, ram_required=5, gpu_required=5, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.RUNNING.name)
+    second = Deployment(name="Second", cpu_required=5, ram_required=5, gpu_required=5, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.RUNNING.name)
+    high = Deployment(name="High", cpu_required=8, ram_required=8, gpu_required=8, cluster_id=cluster.id, docker_image='abc', priority=9, status=DeploymentStatus.RUNNING.name)
+    db.add_all([first, second, high])
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 0, 10, 10
+    db.commit()
+
+    payload = {
+        "name": "Urgent",
+        "cpu_required": 10,
+        "ram_required": 10,
+        "gpu_required": 10,
+        "priority": 5,
+        "docker_image": "abc",
+        "cluster_id": cluster.id
+    }
+
+    response = client.post("/api/v1/deployments/", params={"preemption_strategy": "priority", "wait": False}, json=payload, cookies=cookies)
+    assert response.status_code == 400
+
+    response = client.post("/api/v1/deployments/", params={"preemption_strategy": "min_cost"}, json=payload, cookies=cookies)
+    assert response.status_code == 200
+
+    db.expire_all()
+    assert db.get(Deployment, first.id).status == DeploymentStatus.PREEMPTED
+    assert db.get(Deployment, second.id).status == DeploymentStatus.PREEMPTED
+    assert db.get(Deployment, high.id).status == DeploymentStatus.RUNNING
+    assert db.get(Cluster, cluster.id).cpu_available == 0
+
+def test_plan_deployment_is_read_only(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that planning a deployment reports the victims without preempting them
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    low = Deployment(name="Low", cpu_required=10, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.RUNNING.name)
+    db.add(low)
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 5, 30, 30
+    db.commit()
+
+    payload = {
+        "name": "Urgent",
+        "cpu_required": 10,
+        "ram_required": 10,
+        "gpu_required": 10,
+        "priority": 10,
+        "docker_image": "abc",
+        "cluster_id": cluster.id
+    }
+
+    response = client.post("/api/v1/deployments/plan", json=payload, cookies=cookies)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["feasible"] is True
+    assert [victim["id"] for victim in data["preempted_deployments"]] == [low.id]
+    assert data["remaining_resources"] == {"cpu": 5, "ram": 30, "gpu": 30}
+
+    db.expire_all()
+    assert db.get(Deployment, low.id).status == DeploymentStatus.RUNNING
+    assert db.get(Cluster, cluster.id).cpu_available == 5
+    assert db.query(Deployment).count() == 1
+
+    payload["cpu_required"] = 100
+    response = client.post("/api/v1/deployments/plan", json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["feasible"] is False
+
+def test_create_deployment_batch(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a batch is scheduled highest priority first and reported per item
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    def item(name, cpu, priority, cluster_id=cluster.id):
+        return {"name": name, "cpu_required": cpu, "ram_required": 1, "gpu_required": 1,
+                "priority": priority, "docker_image": "abc", "cluster_id": cluster_id}
+
+    payload = [
+        item("Low", 20, 1),
+        item("High", 20, 5),
+        item("Small", 10, 1),
+        item("Missing", 1, 1, cluster_id=cluster.id + 100),
+    ]
+
+    response = client.post("/api/v1/deployments/batch", json=payload, cookies=cookies)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["scheduled"] == 2
+    assert data["queued"] == 1
+    assert data["rejected"] == 1
+    assert [result["status"] for result in data["results"]] == ["queued", "scheduled", "scheduled", "rejected"]
+    assert data["results"][0]["deployment"]["status"] == DeploymentStatus.PENDING.value
+    assert data["results"][1]["deployment"]["name"] == "High"
+    assert data["results"][3]["status_code"] == 404
+
+    db.expire_all()
+    assert db.query(Deployment).count() == 3
+    assert db.get(Cluster, cluster.id).cpu_available == 0
+
+def test_create_deployment_without_cluster_uses_placement_policy(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that the scheduler picks the cluster when cluster_id is omitted
+    """
+    organization, user, cluster = setup_test_data()
+    small = create_cluster(db, name="Small Cluster", organization_id=organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    cookies = login_user(client, username="testuser", password="password123")
+
+    payload = {
+        "name": "Placed",
+        "cpu_required": 8,
+        "ram_required": 8,
+        "gpu_required": 8,
+        "priority": 1,
+        "docker_image": "abc"
+    }
+
+    response = client.post("/api/v1/deployments/", params={"placement_policy": "best_fit"}, json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["cluster_id"] == small.id
+
+    response = client.post("/api/v1/deployments/", params={"placement_policy": "worst_fit"}, json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["cluster_id"] == cluster.id
+
+    payload["cpu_required"] = 50
+    response = client.post("/api/v1/deployments/plan", json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["feasible"] is False
+
+def test_batch_ranks_many_clusters_with_the_scoring_engine(client: TestClient, db: Session, setup_test_data,
+                                                           monkeypatch):
+    """
+    Test that a batch over many clusters is placed through one ScoringEngine that follows the staged capacity
+    """
+    from app.core.config import settings
+    from app.core.scheduling.scoring import ScoringEngine
+
+    organization, user, cluster = setup_test_data()
+    small = create_cluster(db, name="Small Cluster", organization_id=organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    cookies = login_user(client, username="testuser", password="password123")
+    monkeypatch.setattr(settings, "VECTORIZED_PLACEMENT_MIN_CLUSTERS", 2)
+    updated = []
+    update = ScoringEngine.update
+    monkeypatch.setattr(ScoringEngine, "update", lambda engine, c: updated.append(c.id) or update(engine, c))
+
+    def item(name, cpu):
+        return {"name": name, "cpu_required": cpu, "ram_required": 8, "gpu_required": 8, "priority": 1,
+                "docker_image": "abc"}
+
+    response = client.post("/api/v1/deployments/batch", params={"placement_policy": "best_fit"},
+                           json=[item("First", 8), item("Second", 7), item("Huge", 50)], cookies=cookies)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    # Best fit packs the first item onto the small cluster; the second no longer fits there
+    assert [result["deployment"]["cluster_id"] for result in results[:2]] == [small.id, cluster.id]
+    assert results[2]["status"] == "rejected"
+    assert updated == [small.id, cluster.id]
+
+def test_pending_deployment_is_scheduled_when_capacity_frees(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a deployment which does not fit is queued and placed by the pending scheduler later
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    running = Deployment(name="Running", cpu_required=25, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=9, status=DeploymentStatus.RUNNING.name)
+    db.add(running)
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 5, 30, 30
+    db.commit()
+
+    payload = {
+        "name": "Waiting",
+        "cpu_required": 10,
+        "ram_required": 10,
+        "gpu_required": 10,
+        "priority": 1,
+        "docker_image": "abc",
+        "cluster_id": cluster.id
+    }
+
+    response = client.post("/api/v1/deployments/", json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["status"] == DeploymentStatus.PENDING.value
+    waiting_id = response.json()["id"]
+
+    scheduler = PendingScheduler(session_factory=TestingSessionLocal)
+    assert scheduler.run_once(full_scan=True) == 0
+
+    running.status = DeploymentStatus.COMPLETED.name
+    cluster.cpu_available = 30
+    db.commit()
+    scheduler.notify(cluster.id)
+    assert scheduler.run_once() == 1
+
+    db.expire_all()
+    assert db.get(Deployment, waiting_id).status == DeploymentStatus.RUNNING
+    assert db.get(Cluster, cluster.id).cpu_available == 20
+
+def test_complete_and_delete_deployment_release_resources(client: TestClient, db: Session, setup_test_data,
+                                                          monkeypatch):
+    """
+    Test that completing or deleting a running deployment releases its resources and schedules pending work
+    """
+    notified = []
+    monkeypatch.setattr(pending_scheduler, "notify", notified.append)
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    running = Deployment(name="Running", cpu_required=20, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=5, status=DeploymentStatus.RUNNING.name)
+    other = Deployment(name="Other", cpu_required=10, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=5, status=DeploymentStatus.RUNNING.name)
+    waiting = Deployment(name="Waiting", cpu_required=15, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=1, status=DeploymentStatus.PENDING.name)
+    db.add_all([running, other, waiting])
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 0, 20, 20
+    db.commit()
+
+    response = client.post(f"/api/v1/deployments/{running.id}/complete", cookies=cookies)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deployment"]["status"] == DeploymentStatus.COMPLETED.value
+    assert [deployment["id"] for deployment in data["scheduled"]] == [waiting.id]
+    assert notified == [cluster.id]
+
+    response = client.post(f"/api/v1/deployments/{running.id}/fail", cookies=cookies)
+    assert response.status_code == 400
+
+    other_id = other.id
+    response = client.delete(f"/api/v1/deployments/{other_id}", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["deployment"]["name"] == "Other"
+
+    db.expire_all()
+    assert db.get(Deployment, other_id) is None
+    assert db.get(Deployment, waiting.id).status == DeploymentStatus.RUNNING
+    assert db.get(Cluster, cluster.id).cpu_available == 15
+
+def test_release_succeeds_when_rescheduling_afterwards_fails(client: TestClient, db: Session, setup_test_data,
+                                                             monkeypatch):
+    """
+    Test that a committed release is reported even if placing pending work afterwards conflicts, and that
+    releasing a pending deployment shrinks the queue depth gauge
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+    payload = {"name": "Big", "cpu_required": 20, "ram_required": 10, "gpu_required": 10, "priority": 5,
+               "docker_image": "abc", "cluster_id": cluster.id}
+    running = client.post("/api/v1/deployments/", json=payload, cookies=cookies).json()
+    payload.update(name="Waiting", priority=1)
+    waiting = client.post("/api/v1/deployments/", json=payload, cookies=cookies).json()
+    assert waiting["status"] == DeploymentStatus.PENDING.value
+    queued = pending_deployments.value(cluster_id=str(cluster.id))
+
+    def conflict(*args, **kwargs):
+        raise HTTPException(status_code=409, detail="Cluster was modified concurrently. Please retry.")
+
+    monkeypatch.setattr(DeploymentService, "schedule_pending", conflict)
+    response = client.post(f"/api/v1/deployments/{running['id']}/complete", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["deployment"]["status"] == DeploymentStatus.COMPLETED.value
+    assert response.json()["scheduled"] == []
+
+    assert client.delete(f"/api/v1/deployments/{waiting['id']}", cookies=cookies).status_code == 200
+    assert pending_deployments.value(cluster_id=str(cluster.id)) == queued - 1
+
+def test_concurrent_cluster_update_is_retried(client: TestClient, db: Session, setup_test_data, monkeypatch):
+    """
+    Test that a deployment whose cluster was changed concurrently is rescheduled instead of overcommitting
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+    original = DeploymentService.get_preemption_schedule
+    calls = []
+
+    def schedule_with_concurrent_writer(self, preemption_strategy, target, deployment_in):
+        calls.append(deployment_in.name)
+        schedule = original(self, preemption_strategy, target, deployment_in)
+        if len(calls) == 1:
+            other = TestingSessionLocal()
+            other_cluster = other.get(Cluster, target.id)
+            other_cluster.cpu_available -= 25
+            other.commit()
+            other.close()
+        return schedule
+
+    monkeypatch.setattr(DeploymentService, "get_preemption_schedule", schedule_with_concurrent_writer)
+
+    payload = {
+        "name": "Contended",
+        "cpu_required": 10,
+        "ram_required": 1,
+        "gpu_required": 1,
+        "priority": 1,
+        "docker_image": "abc",
+        "cluster_id": cluster.id
+    }
+
+    response = client.post("/api/v1/deployments/", json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["status"] == DeploymentStatus.PENDING.value
+    assert len(calls) == 2
+
+    db.expire_all()
+    assert db.get(Cluster, cluster.id).cpu_available == 5
+
+def test_list_deployments_keyset_pagination_and_filters(client: TestClient, db: Session, setup_test_data, monkeypatch):
+    """
+    Pages follow the X-Next-Cursor header without gaps or repeats, for both orders, and filters narrow the listing
+    """
+    organization, user, cluster = setup_test_data()
+    other_cluster = create_cluster(db, name="Other Cluster", organization_id=organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    foreign_organization = create_organization(db, name="Foreign Organization", invite_code="FOREIGN1")
+    foreign_cluster = create_cluster(db, name="Foreign Cluster", organization_id=foreign_organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    cookies = login_user(client, username="testuser", password="password123")
+
+    for i in range(7):
+        db.add(Deployment(name=f"Deployment {i}", cpu_required=1, ram_required=1, gpu_required=0,
+                          cluster_id=cluster.id if i % 2 == 0 else other_cluster.id,
+                          docker_image="web" if i < 4 else "worker", priority=i % 3,
+                          status=DeploymentStatus.RUNNING.name if i % 2 == 0 else DeploymentStatus.PENDING.name))
+    db.add(Deployment(name="Foreign", cpu_required=1, ram_required=1, gpu_required=0, cluster_id=foreign_cluster.id,
+                      docker_image="web", priority=5, status=DeploymentStatus.RUNNING.name))
+    db.commit()
+
+    def collect(params):
+        names, cursor = [], None
+        while True:
+            response = client.get("/api/v1/deployments/", params={**params, **({"cursor": cursor} if cursor else {})}, cookies=cookies)
+            assert response.status_code == 200
+            assert len(response.json()) <= params.get("limit", 100)
+            names += [deployment["name"] for deployment in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return names
+
+    assert collect({"limit": 3}) == [f"Deployment {i}" for i in range(7)]
+    assert collect({"limit": 2, "sort": "priority"}) == [
+        "Deployment 2", "Deployment 5", "Deployment 1", "Deployment 4", "Deployment 0", "Deployment 3", "Deployment 6"
+    ]
+    fourth = db.query(Deployment).filter(Deployment.name == "Deployment 4").one()
+    assert collect({"cursor": encode_cursor({"id": fourth.id})}) == ["Deployment 5", "Deployment 6"]
+    assert collect({"status": "running", "cluster_id": cluster.id}) == ["Deployment 0", "Deployment 2", "Deployment 4", "Deployment 6"]
+    assert collect({"min_priority": 1, "max_priority": 1, "docker_image": "worker"}) == ["Deployment 4"]
+    assert collect({"docker_image": "missing"}) == []
+
+    # Without a limit or cursor, clients unaware of pages get every deployment
+    monkeypatch.setattr(settings, "DEPLOYMENT_PAGE_SIZE", 2)
+    response = client.get("/api/v1/deployments/", cookies=cookies)
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+
+    for cursor in ("not-a-cursor", encode_cursor({"id": "3"}), encode_cursor({"id": [3]})):
+        response = client.get("/api/v1/deployments/", params={"cursor": cursor}, cookies=cookies)
+        assert response.status_code == 400
+    response = client.get("/api/v1/deployments/", params={"sort": "priority", "cursor": encode_cursor({"priority": None, "id": 3})}, cookies=cookies)
+    assert response.status_code == 400
+    response = client.get("/api/v1/deployments/", params={"sort": "name"}, cookies=cookies)
+    assert response.status_code == 400
+
+def test_export_deployments_streams_ndjson_in_batches(client: TestClient, db: Session, setup_test_data):
+    """
+    The export covers every deployment of the organization and is produced one batch per chunk
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+    for i in range(5):
+        db.add(Deployment(name=f"Deployment {i}", cpu_required=1, ram_required=1, gpu_required=0, cluster_id=cluster.id,
+                          docker_image="abc", priority=i, status=DeploymentStatus.RUNNING.name, user_id=user.id))
+    db.commit()
+
+    response = client.get("/api/v1/deployments/export", cookies=cookies)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == [f"Deployment {i}" for i in range(5)]
+    assert set(rows[0]) == {"id", "name", "cluster_id", "docker_image", "status", "priority",
+                            "cpu_required", "ram_required", "gpu_required", "gang_id", "user_id"}
+    assert rows[0]["gang_id"] is None
+    assert rows[0]["user_id"] == user.id
+    assert rows[0]["status"] == DeploymentStatus.RUNNING.value
+    assert rows[4]["priority"] == 4
+
+    chunks = list(ExportService(TestingSessionLocal, batch_size=2).export_deployments(cluster.organization_id))
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+def gang_payload(name, replicas, cpu, priority=1, **extra):
+    return {"name": name, "replicas": replicas, "cpu_required": cpu, "ram_required": 1, "gpu_required": 1,
+            "priority": priority, "docker_image": "abc", **extra}
+
+def test_gang_is_placed_across_clusters_all_or_nothing(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a gang spans clusters when needed and is rejected as a whole when it can never fit
+    """
+    organization, user, cluster = setup_test_data()
+    small = create_cluster(db, name="Small Cluster", organization_id=organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    cookies = login_user(client, username="testuser", password="password123")
+
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Trainer", 4, 9), cookies=cookies)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "scheduled"
+    assert sorted(deployment["cluster_id"] for deployment in data["deployments"]) == [cluster.id] * 3 + [small.id]
+    assert {deployment["gang_id"] for deployment in data["deployments"]} == {data["gang_id"]}
+
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Huge", 2, 20, cluster_ids=[small.id]), cookies=cookies)
+    assert response.status_code == 400
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Lost", 1, 1, cluster_ids=[small.id + 100]), cookies=cookies)
+    assert response.status_code == 404
+
+    db.expire_all()
+    assert db.query(Deployment).count() == 4
+    assert db.get(Cluster, cluster.id).cpu_available == 3
+    assert db.get(Cluster, small.id).cpu_available == 1
+
+def test_gang_is_queued_whole_and_admitted_together(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a gang which does not fit yet is queued entirely and placed by the pending scheduler in one go
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    running = Deployment(name="Running", cpu_required=25, ram_required=10, gpu_required=10, cluster_id=cluster.id, docker_image='abc', priority=9, status=DeploymentStatus.RUNNING.name)
+    db.add(running)
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 5, 30, 30
+    db.commit()
+
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Workers", 2, 4), cookies=cookies)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "queued"
+    assert [deployment["status"] for deployment in data["deployments"]] == [DeploymentStatus.PENDING.value] * 2
+
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Impatient", 2, 4), params={"wait": False}, cookies=cookies)
+    assert response.status_code == 400
+
+    scheduler = PendingScheduler(session_factory=TestingSessionLocal)
+    assert scheduler.run_once(full_scan=True) == 0
+
+    running.status = DeploymentStatus.COMPLETED.name
+    cluster.cpu_available = 30
+    db.commit()
+    scheduler.notify(cluster.id)
+    assert scheduler.run_once() == 2
+
+    db.expire_all()
+    gang = db.query(Deployment).filter(Deployment.gang_id == data["gang_id"]).all()
+    assert [deployment.status for deployment in gang] == [DeploymentStatus.RUNNING] * 2
+    assert db.get(Cluster, cluster.id).cpu_available == 22
+
+def test_preempting_a_gang_replica_preempts_the_whole_gang(client: TestClient, db: Session, setup_test_data,
+                                                           monkeypatch):
+    """
+    Test that preempting one replica of a gang also preempts and releases its replicas on other clusters
+    """
+    notified = []
+    monkeypatch.setattr(pending_scheduler, "notify", notified.append)
+    organization, user, cluster = setup_test_data()
+    small = create_cluster(db, name="Small Cluster", organization_id=organization.id, cpu_limit=10, ram_limit=10, gpu_limit=10)
+    cookies = login_user(client, username="testuser", password="password123")
+
+    response = client.post("/api/v1/deployments/gang", json=gang_payload("Batch", 2, 10), cookies=cookies)
+    assert response.status_code == 200
+    gang = response.json()
+    assert sorted(deployment["cluster_id"] for deployment in gang["deployments"]) == sorted([cluster.id, small.id])
+
+    payload = {"name": "Filler", "cpu_required": 20, "ram_required": 1, "gpu_required": 1, "priority": 5,
+               "docker_image": "abc", "cluster_id": cluster.id}
+    assert client.post("/api/v1/deployments/", json=payload, cookies=cookies).status_code == 200
+    payload.update(name="Urgent", cpu_required=10, priority=9)
+    response = client.post("/api/v1/deployments/", json=payload, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["status"] == DeploymentStatus.RUNNING.value
+    # The capacity freed on the other cluster wakes the pending scheduler for it
+    assert notified == [small.id]
+
+    db.expire_all()
+    statuses = {deployment.cluster_id: deployment.status
+                for deployment in db.query(Deployment).filter(Deployment.gang_id == gang["gang_id"])}
+    assert statuses == {cluster.id: DeploymentStatus.PREEMPTED, small.id: DeploymentStatus.PREEMPTED}
+    assert db.get(Cluster, small.id).cpu_available == 10
+
+    # The released replica is gone from the in-memory view of the other cluster as well
+    payload.update(name="Refill", cpu_required=10, priority=0, cluster_id=small.id)
+    response = client.post("/api/v1/deployments/plan", json=payload, cookies=cookies)
+    assert response.json()["preempted_deployments"] == []
+    assert response.json()["remaining_resources"] == {"cpu": 0, "ram": 9, "gpu": 9}
+
+def test_dependent_deployments_start_in_dag_order(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a deployment waits for its dependencies, starts when the last one completes and fails with them
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    def create(name, depends_on=()):
+        payload = {"name": name, "cpu_required": 5, "ram_required": 5, "gpu_required": 5, "priority": 1,
+                   "docker_image": "abc", "cluster_id": cluster.id, "depends_on": list(depends_on)}
+        response = client.post("/api/v1/deployments/", json=payload, cookies=cookies)
+        assert response.status_code == 200
+        return response.json()
+
+    extract, clean = create("Extract"), create("Clean")
+    load = create("Load", depends_on=[extract["id"], clean["id"]])
+    report = create("Report", depends_on=[load["id"]])
+    assert load["status"] == report["status"] == DeploymentStatus.BLOCKED.value
+
+    response = client.post(f"/api/v1/deployments/{extract['id']}/complete", cookies=cookies)
+    assert response.json()["scheduled"] == []
+    response = client.post(f"/api/v1/deployments/{clean['id']}/complete", cookies=cookies)
+    assert [deployment["name"] for deployment in response.json()["scheduled"]] == ["Load"]
+    assert response.json()["scheduled"][0]["status"] == DeploymentStatus.RUNNING.value
+
+    # Completed dependencies are already satisfied
+    assert create("Audit", depends_on=[extract["id"]])["status"] == DeploymentStatus.RUNNING.value
+
+    response = client.post(f"/api/v1/deployments/{load['id']}/fail", cookies=cookies)
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Deployment, report["id"]).status == DeploymentStatus.FAILED
+
+    payload = {"name": "Orphan", "cpu_required": 1, "ram_required": 1, "gpu_required": 1, "docker_image": "abc",
+               "cluster_id": cluster.id, "depends_on": [load["id"]]}
+    assert client.post("/api/v1/deployments/", json=payload, cookies=cookies).status_code == 400
+    payload["depends_on"] = [load["id"] + 100]
+    assert client.post("/api/v1/deployments/", json=payload, cookies=cookies).status_code == 404
+
+def test_dependency_cycles_are_rejected_and_graph_survives_restart(client: TestClient, db: Session, setup_test_data):
+    """
+    Test cycle detection when adding dependencies, and that a reloaded graph queues ready deployments
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    def create(name, depends_on=()):
+        payload = {"name": name, "cpu_required": 5, "ram_required": 5, "gpu_required": 5, "priority": 1,
+                   "docker_image": "abc", "cluster_id": cluster.id, "depends_on": list(depends_on)}
+        return client.post("/api/v1/deployments/", json=payload, cookies=cookies).json()
+
+    root = create("Root")
+    first = create("First", depends_on=[root["id"]])
+    second = create("Second", depends_on=[first["id"]])
+
+    for deployment_id, depends_on in ((first["id"], [second["id"]]), (first["id"], [first["id"]])):
+        response = client.post(f"/api/v1/deployments/{deployment_id}/dependencies", json={"depends_on": depends_on}, cookies=cookies)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "The dependencies would create a cycle."
+
+    response = client.post(f"/api/v1/deployments/{second['id']}/dependencies", json={"depends_on": [root["id"]]}, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["status"] == DeploymentStatus.BLOCKED.value
+
+    # Root completes behind the process's back; the next full scan rebuilds the graph from the database
+    db.get(Deployment, root["id"]).status = DeploymentStatus.COMPLETED.name
+    db.commit()
+    dependency_graph.clear()
+    assert PendingScheduler(session_factory=TestingSessionLocal).run_once(full_scan=True) == 1
+
+    db.expire_all()
+    assert db.get(Deployment, first["id"]).status == DeploymentStatus.RUNNING
+    assert db.get(Deployment, second["id"]).status == DeploymentStatus.BLOCKED
+
+def test_failed_dependencies_fail_dependents_only_once_committed(client: TestClient, db: Session, setup_test_data):
+    """
+    Test that a rolled back failure leaves the graph intact, and that a reload fails dependents of dead deployments
+    """
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    def create(name, depends_on=()):
+        payload = {"name": name, "cpu_required": 5, "ram_required": 5, "gpu_required": 5, "priority": 1,
+                   "docker_image": "abc", "cluster_id": cluster.id, "depends_on": list(depends_on)}
+        return client.post("/api/v1/deployments/", json=payload, cookies=cookies).json()
+
+    upstream = create("Upstream")
+    downstream = create("Downstream", depends_on=[upstream["id"]])
+    last = create("Last", depends_on=[downstream["id"]])
+
+    service = DeploymentService(db, user)
+    assert service.fail_dependents([upstream["id"]]) == [downstream["id"], last["id"]]
+    service.rollback()
+    response = client.post(f"/api/v1/deployments/{upstream['id']}/complete", cookies=cookies)
+    assert [deployment["name"] for deployment in response.json()["scheduled"]] == ["Downstream"]
+
+    # Downstream is preempted behind the process's back; the reloaded graph fails what waits on it
+    db.get(Deployment, downstream["id"]).status = DeploymentStatus.PREEMPTED.name
+    db.commit()
+    orphan = create("Orphan", depends_on=[last["id"]])
+    dependency_graph.clear()
+    assert PendingScheduler(session_factory=TestingSessionLocal).run_once(full_scan=True) == 0
+
+    db.expire_all()
+    assert db.get(Deployment, last["id"]).status == DeploymentStatus.FAILED
+    assert db.get(Deployment, orphan["id"]).status == DeploymentStatus.FAILED
+    assert dependency_graph.pop_ready() == []
+
+def test_fair_share_preempts_the_most_over_served_user(client: TestClient, db: Session, setup_test_data, monkeypatch):
+    """
+    Test that fair share preemption ignores other users' priorities, reports dominant shares and enforces quotas
+    """
+    organization, user, cluster = setup_test_data()
+    other = create_user(db, username="otheruser", email="otheruser@example.com", password="password123")
+    other.organization_id = organization.id
+    db.commit()
+    cookies = login_user(client, username="testuser", password="password123")
+
+    def submit(name, cpu, priority, cookies, **params):
+        payload = {"name": name, "cpu_required": cpu, "ram_required": 1, "gpu_required": 1, "priority": priority,
+                   "docker_image": "abc", "cluster_id": cluster.id}
+        return client.post("/api/v1/deployments/", params=params, json=payload, cookies=cookies)
+
+    hog = [submit(f"Hog {i}", 12, 100, cookies).json() for i in range(2)]
+    other_cookies = login_user(client, username="otheruser", password="password123")
+    assert submit("Modest", 6, 0, other_cookies).json()["user_id"] == other.id
+
+    payload = {"name": "Fair", "cpu_required": 6, "ram_required": 1, "gpu_required": 1, "priority": 0,
+               "docker_image": "abc", "cluster_id": cluster.id}
+    response = client.post("/api/v1/deployments/plan", json=payload, cookies=other_cookies)
+    assert response.json()["feasible"] is False
+    response = client.post("/api/v1/deployments/plan", params={"preemption_strategy": "fair_share"}, json=payload, cookies=other_cookies)
+    plan = response.json()
+    assert plan["feasible"] is True
+    assert [victim["id"] for victim in plan["preempted_deployments"]] == [hog[0]["id"]]
+    assert plan["fairness"]["dominant_share_before"] == pytest.approx(0.2)
+    assert plan["fairness"]["dominant_share_after"] == pytest.approx(0.4)
+    assert plan["fairness"]["victim_dominant_shares"] == {str(user.id): pytest.approx(0.4)}
+
+    response = submit("Fair", 6, 0, other_cookies, preemption_strategy="fair_share")
+    assert response.json()["status"] == DeploymentStatus.RUNNING.value
+    db.expire_all()
+    assert db.get(Deployment, hog[0]["id"]).status == DeploymentStatus.PREEMPTED
+
+    quotas = {"fair_share_quota": 0.5, "user_quotas": {other.id: 0.3}}
+    response = client.put("/api/v1/organizations/fair-share", json=quotas, cookies=other_cookies)
+    assert response.status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "operator-secret")
+    response = client.put("/api/v1/organizations/fair-share", json=quotas, cookies=other_cookies,
+                          headers={"Authorization": "Bearer not-the-secret"})
+    assert response.status_code == 403
+    response = client.put("/api/v1/organizations/fair-share", json=quotas, cookies=other_cookies,
+                          headers={"Authorization": "Bearer operator-secret"})
+    assert response.json() == {"fair_share_quota": 0.5, "user_quotas": {str(other.id): 0.3}}
+    payload["cpu_required"] = 1
+    response = client.post("/api/v1/deployments/plan", params={"preemption_strategy": "fair_share"}, json=payload, cookies=other_cookies)
+    assert response.json()["feasible"] is False
+    assert response.json()["fairness"]["quota"] == 0.3
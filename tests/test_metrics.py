@@ -0,0 +1,118 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.metrics import (MetricsRegistry, RequestMetricsMiddleware,
+                              http_request_db_commits,
+                              http_request_db_statements, http_requests_total)
+from app.core.scheduling import metrics as scheduler_metrics
+from app.models.deployment import Deployment, DeploymentStatus
+from tests.conftest import TestingSessionLocal
+from tests.test_deployment import setup_test_data  # noqa: F401
+from tests.test_organization import login_user
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+    histogram = registry.histogram("job_seconds", "Job time.", buckets=(0.1, 1))
+    counter.inc(kind="batch")
+    counter.inc(2, kind="batch")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert registry.counter("jobs_total", "Jobs.", ("kind",)) is counter
+    output = registry.render()
+    assert "# TYPE jobs_total counter" in output
+    assert 'jobs_total{kind="batch"} 3' in output
+    assert 'job_seconds_bucket{le="0.1"} 1' in output
+    assert 'job_seconds_bucket{le="1"} 2' in output
+    assert 'job_seconds_bucket{le="+Inf"} 3' in output
+    assert "job_seconds_count 3" in output
+    assert "job_seconds_sum 3.55" in output
+
+
+def test_metrics_count_statements_and_commits_per_route(client: TestClient, db: Session, setup_test_data,
+                                                        admin_headers):
+    organization, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+    labels = {"method": "POST", "route": "/api/v1/deployments/"}
+    requests_before = http_request_db_commits.count(**labels)
+    commits_before = http_request_db_commits.sum(**labels)
+
+    response = client.post("/api/v1/deployments/", json={
+        "name": "Measured", "cpu_required": 1, "ram_required": 1, "gpu_required": 0, "priority": 1,
+        "docker_image": "abc", "cluster_id": cluster.id
+    }, cookies=cookies)
+    assert response.status_code == 200
+
+    assert http_request_db_commits.count(**labels) == requests_before + 1
+    assert http_request_db_commits.sum(**labels) > commits_before
+    assert http_request_db_statements.sum(**labels) > 0
+    assert http_requests_total.value(status="200", **labels) >= 1
+
+    assert client.get("/metrics").status_code == 403
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_db_commits_count{method="POST",route="/api/v1/deployments/"}' in response.text
+
+
+def test_server_timing_header_reports_database_work(db: Session):
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, server_timing=True)
+
+    @app.get("/query")
+    def query():
+        # Sync endpoint: runs in the threadpool like the application's database work
+        session = TestingSessionLocal()
+        try:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+            session.commit()
+        finally:
+            session.close()
+        return {}
+
+    response = TestClient(app).get("/query")
+
+    assert response.status_code == 200
+    assert 'desc="2 statements, 1 commits"' in response.headers["server-timing"]
+    assert response.headers["server-timing"].startswith("app;dur=")
+
+
+def test_scheduler_metrics_record_preemption(client: TestClient, db: Session, setup_test_data, admin_headers):
+    _, user, cluster = setup_test_data()
+    cookies = login_user(client, username="testuser", password="password123")
+    db.add_all([
+        Deployment(name="Low", cpu_required=10, ram_required=10, gpu_required=10, cluster_id=cluster.id,
+                   docker_image="abc", priority=1, status=DeploymentStatus.RUNNING.name),
+        Deployment(name="High", cpu_required=17, ram_required=17, gpu_required=17, cluster_id=cluster.id,
+                   docker_image="abc", priority=12, status=DeploymentStatus.RUNNING.name),
+    ])
+    cluster.cpu_available, cluster.ram_available, cluster.gpu_available = 3, 13, 13
+    db.commit()
+    plans_before = scheduler_metrics.plan_duration_seconds.count(strategy="priority", outcome="preempts")
+    considered_before = scheduler_metrics.victims_considered.sum(strategy="priority")
+    preempted_before = scheduler_metrics.placements_total.value(outcome="preempted")
+    class_before = scheduler_metrics.preemptions_total.value(priority_class="1")
+
+    response = client.post("/api/v1/deployments/", json={
+        "name": "Urgent", "cpu_required": 10, "ram_required": 10, "gpu_required": 10, "priority": 5,
+        "docker_image": "abc", "cluster_id": cluster.id
+    }, cookies=cookies)
+    assert response.status_code == 200
+
+    assert scheduler_metrics.plan_duration_seconds.count(strategy="priority", outcome="preempts") == plans_before + 1
+    # Only the priority 1 deployment ranks below the new one
+    assert scheduler_metrics.victims_considered.sum(strategy="priority") == considered_before + 1
+    assert scheduler_metrics.placements_total.value(outcome="preempted") == preempted_before + 1
+    assert scheduler_metrics.preemptions_total.value(priority_class="1") == class_before + 1
+    assert scheduler_metrics.cluster_free_capacity.value(cluster_id=str(cluster.id), resource="cpu") == 3
+    assert 'scheduler_preemptions_total{priority_class="1"}' in client.get("/metrics", headers=admin_headers).text
+
+
+def test_priority_class_is_bounded():
+    assert [scheduler_metrics.priority_class(p) for p in (-3, 0, 9, 10, 250)] == ["<0", "0", "9", "10+", "10+"]
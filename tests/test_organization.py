@@ -94,3 +94,25 @@ def test_join_organization_already_member(client: TestClient, db: Session):
 
 	assert response.status_code == 400
 	assert response.json() == {"detail": "User is already a member of an organization"}
+
+
+def test_join_organization_invalidates_cached_user(client: TestClient, db: Session, admin_headers):
+	create_user(db, "testuser", "testuser@example.com", "password123")
+	cookies = login_user(client, "testuser", "password123")
+	organization = create_organization(db, "Test Organization", "invite123")
+
+	response = client.get("/api/v1/clusters/", cookies=cookies)
+	assert response.status_code == 400
+
+	client.post(f"/api/v1/organizations/{organization.invite_code}/join", json={}, cookies=cookies)
+
+	response = client.get("/api/v1/clusters/", cookies=cookies)
+	assert response.status_code == 200
+	response = client.get("/api/v1/clusters/", cookies=cookies)
+	assert response.status_code == 200
+
+	assert client.get("/health/caches").status_code == 403
+	stats = client.get("/health/caches", headers=admin_headers).json()["user_cache"]
+	assert stats["misses"] == 2
+	assert stats["hits"] == 2
+	assert stats["size"] == 1
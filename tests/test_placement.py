@@ -0,0 +1,62 @@
+import random
+
+from app.core.scheduling.cluster_index import ClusterSnapshot
+from app.core.scheduling.placement_factory import PlacementPolicyFactory
+from app.schemas.deploymentresponse import DeploymentCreate
+
+
+def _deployment(cpu: float, ram: float, gpu: float) -> DeploymentCreate:
+	return DeploymentCreate(name="d", docker_image="abc", cpu_required=cpu, ram_required=ram, gpu_required=gpu)
+
+
+def _clusters():
+	return [
+		ClusterSnapshot(1, 1, (32, 64, 0), (32, 64, 0)),
+		ClusterSnapshot(2, 1, (32, 64, 8), (8, 16, 8)),
+		ClusterSnapshot(3, 1, (32, 64, 8), (32, 64, 2)),
+		ClusterSnapshot(4, 1, (4, 4, 0), (4, 4, 0)),
+	]
+
+
+def test_best_and_worst_fit_rank_fitting_clusters_first():
+	deployment_in = _deployment(4, 8, 0)
+
+	best = PlacementPolicyFactory.get_placement_policy("best_fit").rank(_clusters(), deployment_in)
+	worst = PlacementPolicyFactory.get_placement_policy("worst_fit").rank(_clusters(), deployment_in)
+
+	assert [cluster.id for cluster in best] == [2, 1, 3]
+	assert [cluster.id for cluster in worst][0] == 1
+
+
+def test_gpu_affinity():
+	policy = PlacementPolicyFactory.get_placement_policy("gpu_affinity")
+
+	assert policy.rank(_clusters(), _deployment(2, 2, 2))[0].id == 3
+	assert policy.rank(_clusters(), _deployment(2, 2, 0))[0].id in (1, 4)
+	assert [cluster.id for cluster in policy.rank(_clusters(), _deployment(2, 2, 4))] == [2, 3]
+
+
+def test_vectorized_ranking_matches_the_scalar_one():
+	from app.core.scheduling.scoring import ScoringEngine
+
+	rng = random.Random(7)
+	clusters = []
+	for cluster_id in range(1, 61):
+		limits = (rng.choice((0, 8, 32)), rng.choice((0, 16, 64)), rng.choice((0, 0, 4, 8)))
+		available = tuple(rng.choice((0, limit, rng.uniform(0, limit))) for limit in limits)
+		clusters.append(ClusterSnapshot(cluster_id, 1, limits, available))
+	deployments_in = [
+		_deployment(rng.choice((0, 1, 4, rng.uniform(0, 16))), rng.choice((0, 2, rng.uniform(0, 32))),
+					rng.choice((0, 0, 1, 4)))
+		for _ in range(200)
+	]
+	engine = ScoringEngine(clusters)
+
+	for name in ("best_fit", "worst_fit", "gpu_affinity"):
+		policy = PlacementPolicyFactory.get_placement_policy(name)
+		expected = [[cluster.id for cluster in policy.rank_scalar(clusters, d)] for d in deployments_in]
+
+		ranked = engine.rank_many(name, deployments_in, chunk_size=64)
+		assert [[cluster.id for cluster in row] for row in ranked] == expected
+		# Above the threshold PlacementPolicy.rank itself goes through the engine
+		assert [cluster.id for cluster in policy.rank(clusters, deployments_in[0])] == expected[0]
@@ -0,0 +1,98 @@
+import gc
+import time
+
+from app.core.scheduling.capacity_index import (ClusterCapacity,
+                                                IndexedDeployment)
+from app.core.scheduling.cluster_index import ClusterSnapshot
+from app.core.scheduling.fair_share_preemption import \
+    FairSharePreemptionStrategy
+from app.core.scheduling.min_cost_preemption import (MinCostPreemptionStrategy,
+                                                     select_victims)
+from app.schemas.deploymentresponse import DeploymentCreate
+
+
+def test_select_victims_combines_small_deployments():
+	candidates = [
+		IndexedDeployment(1, 0, 3, 3, 0),
+		IndexedDeployment(2, 0, 3, 3, 0),
+		IndexedDeployment(3, 2, 10, 10, 0),
+		IndexedDeployment(4, 0, 1, 1, 0),
+	]
+	victims, optimal = select_victims(candidates, (6, 6, 0), (20, 20, 1), time.perf_counter() + 1)
+
+	assert optimal
+	assert sorted(victim.deployment_id for victim in victims) == [1, 2]
+
+
+def test_select_victims_infeasible():
+	candidates = [IndexedDeployment(1, 0, 3, 3, 0)]
+	victims, _ = select_victims(candidates, (6, 6, 0), (20, 20, 1), time.perf_counter() + 1)
+
+	assert victims is None
+
+
+def test_select_victims_respects_deadline():
+	candidates = [IndexedDeployment(i, i % 7, 1 + i % 5, 1 + i % 3, i % 2) for i in range(5000)]
+	start = time.perf_counter()
+	victims, _ = select_victims(candidates, (40, 30, 10), (10000, 10000, 10000), start + 0.05)
+
+	assert victims is not None
+	# The greedy cover is interrupted too; only a linear pass runs past the deadline
+	assert time.perf_counter() - start < 0.1
+
+
+def test_min_cost_plan_stays_within_its_time_limit_on_large_clusters():
+	capacity = ClusterCapacity(1, (10 ** 6, 10 ** 6, 10 ** 4), (0, 0, 0))
+	for i in range(20000):
+		capacity.add(IndexedDeployment(i + 1, i % 9, 0.5 + i % 4, 1 + i % 8, i % 3 == 0))
+	cluster = ClusterSnapshot(1, 1, (10 ** 6, 10 ** 6, 10 ** 4), (0, 0, 0))
+	strategy = MinCostPreemptionStrategy(time_limit_ms=50)
+
+	for required in ((40, 30, 10), (2000, 4000, 300)):
+		deployment_in = DeploymentCreate(name="big", docker_image="abc", cpu_required=required[0],
+										 ram_required=required[1], gpu_required=required[2], priority=9)
+		# A full collection of the test process's heap would otherwise land in the timed call
+		gc.collect()
+		start = time.perf_counter()
+		schedule = strategy.plan(None, cluster, deployment_in, capacity)
+
+		assert time.perf_counter() - start < 0.05
+		assert schedule["feasible"]
+		freed = [sum(getattr(victim, resource) for victim in schedule["preempted_deployments"])
+				 for resource in ("cpu", "ram", "gpu")]
+		assert all(f + 1e-6 >= r for f, r in zip(freed, required))
+		assert schedule["candidates_considered"] == capacity.count_below(9)
+
+
+def test_tenant_shares_are_maintained_incrementally():
+	capacity = ClusterCapacity(1, (10, 20, 0), (10, 20, 0))
+	capacity.add(IndexedDeployment(1, 5, 4, 2, 0, user_id=7))
+	tenants = capacity.tenants()
+	capacity.add(IndexedDeployment(2, 1, 1, 12, 0, user_id=8))
+	capacity.add(IndexedDeployment(3, 0, 2, 2, 0, user_id=7))
+
+	assert list(tenants.by_share()) == [(0.6, 7), (0.6, 8)]
+	assert [entry.deployment_id for entry in tenants.deployments(7)] == [3, 1]
+
+	capacity.remove(3)
+	capacity.remove(2)
+	assert list(tenants.by_share()) == [(0.4, 7)]
+	assert tenants.usage(8) == (0.0, 0.0, 0.0)
+	assert capacity.copy().tenants().usage(7) == (4, 2, 0)
+
+
+def test_fair_share_never_preempts_deployments_without_an_owner():
+	capacity = ClusterCapacity(1, (10, 10, 0), (0, 0, 0))
+	capacity.add(IndexedDeployment(1, 0, 6, 6, 0))  # No owner
+	capacity.add(IndexedDeployment(2, 0, 2, 2, 0, user_id=8))
+	capacity.add(IndexedDeployment(3, 0, 2, 2, 0, user_id=8))
+	cluster = ClusterSnapshot(1, 1, (10, 10, 0), (0, 0, 0))
+	strategy = FairSharePreemptionStrategy()
+
+	deployment_in = DeploymentCreate(name="fair", docker_image="abc", cpu_required=2, ram_required=2,
+									 gpu_required=0, user_id=7)
+	schedule = strategy.plan(None, cluster, deployment_in, capacity)
+	assert [victim.deployment_id for victim in schedule["preempted_deployments"]] == [2]
+
+	deployment_in.cpu_required = 5
+	assert not strategy.plan(None, cluster, deployment_in, capacity)["feasible"]
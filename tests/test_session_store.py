@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from app.core import session_store as session_store_module
+from app.core.session_store import MemorySessionStore, RedisSessionStore
+from tests.fake_redis import FakeRedis
+from tests.test_organization import create_user
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemorySessionStore(max_age=60, max_size=100, sweep_batch_size=2)
+    return RedisSessionStore(FakeRedis(), max_age=60)
+
+
+def test_session_store_round_trip_and_revoke_user(store):
+    async def scenario():
+        await store.save("a", {"user_id": 1})
+        await store.save("b", {"user_id": 1})
+        await store.save("c", {"user_id": 2})
+        assert await store.load("a") == {"user_id": 1}
+
+        assert await store.revoke_user(1) == 2
+        assert await store.load("a") is None
+        assert await store.load("b") is None
+        assert await store.load("c") == {"user_id": 2}
+
+        await store.delete("c")
+        assert await store.load("c") is None
+
+    asyncio.run(scenario())
+
+
+def test_memory_session_store_slides_expiry_and_sweeps_in_batches(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store_module.time, "monotonic", lambda: now[0])
+    store = MemorySessionStore(max_age=60, max_size=100, sweep_batch_size=2)
+
+    async def scenario():
+        for session_id in ("a", "b", "c", "d"):
+            await store.save(session_id, {"user_id": 1})
+        now[0] += 50
+        assert await store.load("a") is not None  # Extends "a" to 1110
+
+        now[0] += 20
+        assert store.sweep() == 2
+        assert len(store) == 2
+        assert store.sweep() == 1
+        assert len(store) == 1
+        assert store.sweep() == 0
+        assert await store.load("a") is not None
+
+        now[0] += 61
+        assert await store.load("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_memory_session_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_age=60, max_size=2)
+
+    async def scenario():
+        await store.save("a", {"user_id": 1})
+        await store.save("b", {"user_id": 2})
+        await store.load("a")
+        await store.save("c", {"user_id": 3})
+        assert await store.load("b") is None
+        assert await store.load("a") is not None
+        assert await store.revoke_user(2) == 0
+
+    asyncio.run(scenario())
+
+
+def test_logout_all_revokes_every_session(client: TestClient, db: Session):
+    create_user(db, "testuser", "testuser@example.com", "password123")
+    credentials = {"username": "testuser", "password": "password123"}
+    client.cookies.clear()
+    first = client.post("/api/v1/auth/login", json=credentials).cookies
+    client.cookies.clear()
+    second = client.post("/api/v1/auth/login", json=credentials).cookies
+    client.cookies.clear()
+    assert first["session"] != second["session"]
+    assert len(first["session"]) < 64
+
+    response = client.post("/api/v1/auth/logout-all", cookies=second)
+    assert response.status_code == 200
+    # The store outlives the per-test database, so earlier tests' sessions of user 1 count too
+    assert response.json()["revoked_sessions"] >= 2
+
+    assert client.post("/api/v1/auth/logout-all", cookies=first).status_code == 401
+    assert client.post("/api/v1/auth/logout-all", cookies=second).status_code == 401
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from app.core.scheduling import metrics as scheduler_metrics
+from app.core.scheduling.fair_share_preemption import \
+    FairSharePreemptionStrategy
+from app.core.scheduling.priority_preemption import PriorityPreemptionStrategy
+from app.core.scheduling.simulator import Simulator, read_trace
+
+
+def _trace(*events):
+    return read_trace(json.dumps(event) for event in events)
+
+
+def test_simulator_replays_preemption_queueing_and_completion():
+    plans_before = scheduler_metrics.plan_duration_seconds.count(strategy="priority", outcome="preempts")
+
+    report = Simulator(PriorityPreemptionStrategy()).run(_trace(
+        {"time": 0, "event": "cluster", "id": 1, "cpu_limit": 8, "ram_limit": 8, "gpu_limit": 0},
+        {"time": 0, "event": "arrival", "id": "low", "cpu_required": 6, "ram_required": 1, "gpu_required": 0,
+         "priority": 1, "duration": 100},
+        {"time": 10, "event": "arrival", "id": "high", "cpu_required": 6, "ram_required": 1, "gpu_required": 0,
+         "priority": 5},
+        {"time": 20, "event": "arrival", "id": "queued", "cpu_required": 4, "ram_required": 1, "gpu_required": 0,
+         "duration": 10},
+        {"time": 30, "event": "arrival", "id": "too big", "cpu_required": 9, "ram_required": 1, "gpu_required": 0},
+        {"time": 50, "event": "completion", "id": "high"},
+        {"time": 55, "event": "completion", "id": "low"},
+    ))
+
+    deployments = report["deployments"]
+    assert (deployments["scheduled"], deployments["queued"], deployments["rejected"]) == (2, 1, 1)
+    assert (deployments["completed"], deployments["preempted"], deployments["ignored_completions"]) == (2, 1, 1)
+    assert report["preemptions"]["by_priority_class"] == {"1": 1}
+    # "queued" waits from 20 until "high" completes at 50, then runs until 60
+    assert report["wait_seconds"]["max"] == 30
+    assert report["simulated_seconds"] == 60
+    assert report["utilisation"]["cpu"] == pytest.approx((6 * 50 + 4 * 10) / (8 * 60), abs=1e-4)
+    assert report["decision_latency_ms"]["count"] == 4
+    # Simulated decisions stay out of the process's scheduler metrics
+    assert scheduler_metrics.plan_duration_seconds.count(strategy="priority", outcome="preempts") == plans_before
+
+
+def test_simulator_applies_preset_fair_share_quotas():
+    report = Simulator(FairSharePreemptionStrategy()).run(_trace(
+        {"time": 0, "event": "cluster", "id": 1, "cpu_limit": 10, "ram_limit": 10, "gpu_limit": 0},
+        {"time": 0, "event": "quota", "user_id": 7, "fair_share_quota": 0.5},
+        {"time": 1, "event": "arrival", "id": "a", "cpu_required": 4, "ram_required": 1, "gpu_required": 0,
+         "user_id": 7},
+        {"time": 2, "event": "arrival", "id": "b", "cpu_required": 4, "ram_required": 1, "gpu_required": 0,
+         "user_id": 7},
+        {"time": 3, "event": "arrival", "id": "c", "cpu_required": 4, "ram_required": 1, "gpu_required": 0,
+         "user_id": 8},
+    ))
+
+    # "b" would take user 7 to 80% of the cluster's CPU, so it waits despite the free capacity
+    assert report["deployments"]["queued"] == 1
+    assert report["deployments"]["pending"] == 1
+    assert report["deployments"]["running"] == 2
+
+
+def test_trace_must_be_in_time_order():
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_trace(['{"time": 5, "event": "completion", "id": 1}', '{"time": 4, "event": "completion", "id": 2}']))
@@ -0,0 +1,33 @@
+from app.core.user_cache import UserCache
+from app.models.user import User
+
+
+def make_user(user_id: int, organization_id=None) -> User:
+    return User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                is_active=True, organization_id=organization_id)
+
+
+def test_user_cache_evicts_least_recently_used():
+    cache = UserCache(ttl_seconds=60, max_size=2)
+    cache.put(make_user(1))
+    cache.put(make_user(2))
+    assert cache.get(1).username == "user1"
+
+    cache.put(make_user(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_user_cache_expires_and_invalidates():
+    cache = UserCache(ttl_seconds=-1, max_size=10)
+    cache.put(make_user(1))
+    assert cache.get(1) is None
+
+    cache = UserCache(ttl_seconds=60, max_size=10)
+    cache.put(make_user(1, organization_id=7))
+    assert cache.get(1).organization_id == 7
+    cache.invalidate(1)
+    assert cache.get(1) is None